@@ -38,15 +38,18 @@ def load_company(app: OrchestratorCore) -> None:
     # Todo: add some workflows
     # import company.workflows  # noqa: F401  Side-effects
     from company.api.api_v1.api import api_router
+    from company.api.api_v1.endpoints import translations
+    from company.services.translations import translation_bundles
+    from company.utils.templates import precompile_templates
 
     app.include_router(api_router, prefix="/api")
+    translations.include_router(app, prefix="/api/translations")
+
+    precompile_templates()
+    translation_bundles.preload()
 
 
 def load_company_cli(app: Typer) -> None:
-    pass
-    # import company.products  # noqa: F401  Side-effects
-    # import company.schedules  # noqa: F401  Side-effects
-    # import company.workflows  # noqa: F401  Side-effects
+    from company.cli import app as company_app
 
-    # Todo: implement a CLI command
-    # app.add_typer(company.app, name="company")
+    app.add_typer(company_app, name="company")
@@ -18,9 +18,15 @@ from fastapi.routing import APIRouter
 
 from orchestrator.security import opa_security_default
 
-from company.api.api_v1.endpoints import user
+from company.api.api_v1.endpoints import admin, steps, user
 
 api_router = APIRouter()
 api_router.include_router(
     user.router, prefix="/company/user/preferences", tags=["COMPANY", "USER"], dependencies=[Depends(opa_security_default)]
 )
+api_router.include_router(
+    steps.router, prefix="/company/steps", tags=["COMPANY", "STEPS"], dependencies=[Depends(opa_security_default)]
+)
+api_router.include_router(
+    admin.router, prefix="/company/admin", tags=["COMPANY", "ADMIN"], dependencies=[Depends(opa_security_default)]
+)
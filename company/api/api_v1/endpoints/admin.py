@@ -0,0 +1,95 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module that implements admin endpoints for inspecting a running worker."""
+
+import asyncio
+import os
+from dataclasses import asdict
+from http import HTTPStatus
+
+import structlog
+from fastapi.param_functions import Depends, Query
+from fastapi.routing import APIRouter
+from starlette.concurrency import run_in_threadpool
+
+from orchestrator.api.error_handling import raise_status
+
+from company.api.compression import compression_stats
+from company.api.security import admin_security
+from company.schemas import CompressionStatsSchema, ProfileSchema, TemplateRenderStatsSchema
+from company.settings import profiler_settings
+from company.utils.profiler import SamplingProfiler
+from company.utils.templates import render_stats
+
+logger = structlog.get_logger(__name__)
+
+router = APIRouter(dependencies=[Depends(admin_security)])
+
+_profiler_lock = asyncio.Lock()
+
+
+@router.get("/profiler", response_model=ProfileSchema)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    interval: float = Query(0.01, gt=0, description="Seconds between samples"),
+    allocations: bool = Query(False, description="Also report the top allocation sites, this slows the worker down"),
+    pid: int | None = Query(None, description="Only profile when the request reaches this worker process"),
+) -> dict:
+    """Profile the worker that handles this request and return its stacks in collapsed (flamegraph) format.
+
+    Every worker is a separate process, pass `pid` and retry on 421 to profile a specific one.
+    """
+    if not profiler_settings.PROFILER_ENABLED:
+        raise_status(HTTPStatus.NOT_FOUND, "The profiler is disabled")
+    if pid is not None and pid != os.getpid():
+        raise_status(HTTPStatus.MISDIRECTED_REQUEST, f"This is worker {os.getpid()}, not {pid}")
+    if seconds > profiler_settings.PROFILER_MAX_SECONDS:
+        raise_status(HTTPStatus.BAD_REQUEST, f"Profile at most {profiler_settings.PROFILER_MAX_SECONDS} seconds")
+    if _profiler_lock.locked():
+        raise_status(HTTPStatus.CONFLICT, "This worker is already being profiled")
+
+    async with _profiler_lock:
+        profiler = SamplingProfiler(
+            max(interval, profiler_settings.PROFILER_MIN_INTERVAL), allocation_frames=1 if allocations else None
+        )
+        logger.info("Starting profiler", pid=os.getpid(), seconds=seconds, allocations=allocations)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = await run_in_threadpool(profiler.stop)
+
+    top_allocations = None
+    if profile.allocations is not None:
+        top_allocations = [asdict(allocation) for allocation in profile.allocations]
+    return {
+        "pid": os.getpid(),
+        "duration": profile.duration,
+        "samples": profile.samples,
+        "collapsed": profile.collapsed(),
+        "allocations": top_allocations,
+    }
+
+
+@router.get("/templates", response_model=list[TemplateRenderStatsSchema])
+def template_render_stats() -> list[dict]:
+    """Return the render timings of the templates of the worker that handles this request, slowest first."""
+    stats = [{"template": name, **asdict(stats)} for name, stats in render_stats().items()]
+    return sorted(stats, key=lambda stat: stat["total_time"], reverse=True)
+
+
+@router.get("/compression", response_model=CompressionStatsSchema)
+def response_compression_stats() -> dict:
+    """Return how many responses the worker that handles this request compressed and how many bytes that saved."""
+    return compression_stats.snapshot()
@@ -0,0 +1,57 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module that implements workflow step timing related API endpoints."""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi.param_functions import Depends, Query
+from fastapi.routing import APIRouter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from company.db import ProcessStepTimingTable
+from company.db.database import get_async_session
+from company.schemas import StepTimingSummarySchema
+
+router = APIRouter()
+
+
+@router.get("/slowest", response_model=list[StepTimingSummarySchema])
+async def slowest_steps(
+    hours: int = Query(24, ge=1, le=24 * 31, description="Only include steps executed in the last N hours"),
+    workflow_name: str | None = None,
+    limit: int = Query(20, ge=1, le=500),
+    session: AsyncSession = Depends(get_async_session),
+) -> list[dict]:
+    wall_time_p95 = func.percentile_cont(0.95).within_group(ProcessStepTimingTable.wall_time)
+    stmt = (
+        select(
+            ProcessStepTimingTable.workflow_name,
+            ProcessStepTimingTable.step_name,
+            func.count().label("executions"),
+            func.avg(ProcessStepTimingTable.wall_time).label("wall_time_avg"),
+            wall_time_p95.label("wall_time_p95"),
+            func.max(ProcessStepTimingTable.wall_time).label("wall_time_max"),
+            func.avg(ProcessStepTimingTable.cpu_time).label("cpu_time_avg"),
+            func.avg(ProcessStepTimingTable.db_queries).label("db_queries_avg"),
+            func.avg(ProcessStepTimingTable.external_calls).label("external_calls_avg"),
+        )
+        .where(ProcessStepTimingTable.executed_at >= datetime.now(timezone.utc) - timedelta(hours=hours))
+        .group_by(ProcessStepTimingTable.workflow_name, ProcessStepTimingTable.step_name)
+    )
+    if workflow_name:
+        stmt = stmt.where(ProcessStepTimingTable.workflow_name == workflow_name)
+    stmt = stmt.order_by(wall_time_p95.desc()).limit(limit)
+
+    return [dict(row) for row in (await session.execute(stmt)).mappings()]
@@ -0,0 +1,59 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module that serves the translations from prebuilt bundles, in place of the core translations endpoint."""
+
+from http import HTTPStatus
+
+from fastapi import FastAPI, Header, Path, Query
+from fastapi.routing import APIRouter
+from starlette.responses import Response
+
+from orchestrator.api.api_v1.endpoints.translations import get_translations as core_get_translations
+
+from company.api.compression import negotiate_encoding
+from company.services.translations import translation_bundles
+from company.settings import translation_settings
+
+router = APIRouter()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def include_router(app: FastAPI, prefix: str) -> None:
+    """Serve the translations of ``app`` from this module instead of the core translations endpoint."""
+    app.router.routes[:] = [
+        route for route in app.router.routes if getattr(route, "endpoint", None) is not core_get_translations
+    ]
+    app.include_router(router, prefix=prefix, tags=["COMPANY", "Translations"])
+
+
+@router.get("/{language}", response_model=dict)
+def get_translations(
+    language: str = Path(..., regex="^[a-z]+-[A-Z]+$"),
+    version: str | None = Query(None, description="Version of the bundle, a matching version is cached forever"),
+    if_none_match: str | None = Header(None),
+    accept_encoding: str = Header(""),
+) -> Response:
+    bundle = translation_bundles.get(language)
+    if version == bundle.version:
+        cache_control = IMMUTABLE
+    else:
+        cache_control = f"public, max-age={translation_settings.TRANSLATIONS_MAX_AGE}, must-revalidate"
+    headers = {"ETag": bundle.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if if_none_match and bundle.etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    if negotiate_encoding(accept_encoding, ["gzip"]):
+        return Response(bundle.gzipped, media_type="application/json", headers=headers | {"Content-Encoding": "gzip"})
+    return Response(bundle.body, media_type="application/json", headers=headers)
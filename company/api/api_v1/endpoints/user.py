@@ -16,14 +16,17 @@
 from http import HTTPStatus
 
 import structlog
-from fastapi.param_functions import Body
+from fastapi.param_functions import Body, Depends, Query
 from fastapi.routing import APIRouter
 from pydantic.types import Json
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from orchestrator.api.models import create_or_update
+from orchestrator.api.error_handling import raise_status
 
-from company.db import UserPreferenceTable
-from company.schemas import UserPreferenceSchema
+from company.db import UserPreferenceDomain, UserPreferenceTable
+from company.db.database import get_async_session
+from company.schemas import UserPreferenceListSchema, UserPreferenceSchema
+from company.services.user_preferences import async_upsert_user_preference, query_statement
 
 logger = structlog.get_logger(__name__)
 
@@ -31,16 +34,40 @@ logger = structlog.get_logger(__name__)
 router = APIRouter()
 
 
+@router.get("/{domain}", response_model=UserPreferenceListSchema)
+async def query_preferences(
+    domain: str,
+    contains: Json | None = Query(None, description='Document the preferences must contain: {"onboarding": true}'),
+    has_key: list[str] = Query([], description="Top level key the preferences must have, can be repeated"),
+    after: str | None = Query(None, description="Cursor: the next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+    if domain not in UserPreferenceDomain.__members__:
+        raise_status(HTTPStatus.NOT_FOUND, f"Unknown user preference domain: {domain}")
+    if contains is not None and not isinstance(contains, dict):
+        raise_status(HTTPStatus.UNPROCESSABLE_ENTITY, "contains should be a JSON object")
+
+    stmt = query_statement(domain, contains=contains, has_keys=has_key, after=after).limit(limit + 1)
+    rows = (await session.execute(stmt)).scalars().all()
+
+    items = [{"user_name": row.user_name, "domain": domain, "preferences": row.preferences} for row in rows[:limit]]
+    next_cursor = items[-1]["user_name"] if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
 @router.get("/{domain}/{user_name}", response_model=UserPreferenceSchema)
-def get_preferences(domain: str, user_name: str) -> dict:
-    if query_result := UserPreferenceTable.query.get((domain, user_name)):
+async def get_preferences(domain: str, user_name: str, session: AsyncSession = Depends(get_async_session)) -> dict:
+    if query_result := await session.get(UserPreferenceTable, (domain, user_name)):
         return {"user_name": query_result.user_name, "domain": domain, "preferences": query_result.preferences}
     return {"user_name": user_name, "domain": domain, "preferences": {}}
 
 
 @router.put("/{domain}/{user_name}", status_code=HTTPStatus.NO_CONTENT)
-def update_preferences(domain: str, user_name: str, request_data: Json = Body(...)) -> None:
+async def update_preferences(
+    domain: str, user_name: str, request_data: Json = Body(...), session: AsyncSession = Depends(get_async_session)
+) -> None:
     user_pref = UserPreferenceSchema(
         **{"user_name": user_name, "domain": domain, "preferences": request_data.get("preferences")}  # type: ignore
     )
-    create_or_update(UserPreferenceTable, user_pref)
+    await async_upsert_user_preference(session, user_pref)
@@ -0,0 +1,188 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Response compression with gzip, brotli or zstd, whichever the client prefers and is installed.
+
+Only complete (non streaming) responses above a minimum size with a compressible content type are compressed, and
+the compression itself runs in the threadpool so big bodies do not block the event loop. Streaming responses are
+passed through untouched, so a slow producer is not delayed until its whole body has been buffered. What compression
+saves is counted per worker in ``compression_stats``, exposed by the ``/company/admin/compression`` endpoint.
+"""
+
+import gzip
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+COMPRESSIBLE_SUFFIXES = ("+json", "+xml")
+
+
+@dataclass
+class CompressionStats:
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    _lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+    def add(self, bytes_in: int, bytes_out: int) -> None:
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def snapshot(self) -> dict[str, int]:
+        """Return the counters (and the bytes saved) as they are at one moment."""
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def _compressors(gzip_level: int, brotli_quality: int, zstd_level: int) -> dict[str, Callable[[bytes], bytes]]:
+    """Return the available compressors, in order of preference when the client has no preference."""
+    compressors: dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressors["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return compressors
+
+
+def negotiate_encoding(accept_encoding: str, available: list[str]) -> str | None:
+    """Pick the encoding from `available` with the highest q-value in an ``Accept-Encoding`` header.
+
+    Ties are won by the encoding that comes first in `available`. ``*`` matches every available encoding.
+    """
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        qualities[name.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type.startswith(COMPRESSIBLE_TYPES) or media_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses, see the module docstring.
+
+    Args:
+        app: The ASGI app.
+        minimum_size: Responses with a smaller body are sent uncompressed.
+        gzip_level: gzip compression level.
+        brotli_quality: brotli quality, the higher qualities are too slow for dynamic responses.
+        zstd_level: zstd compression level.
+
+    """
+
+    def __init__(
+        self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressors = _compressors(gzip_level, brotli_quality, zstd_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, list(self.compressors)) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                await self._send_body(encoding, start_message, message, send)  # type: ignore
+                passthrough = True
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _send_body(self, encoding: str, start_message: Message, message: Message, send: Send) -> None:
+        headers = MutableHeaders(raw=start_message["headers"])
+        body = message.get("body", b"")
+        if (
+            message.get("more_body", False)
+            or "content-encoding" in headers
+            or len(body) < self.minimum_size
+            or not _is_compressible(headers.get("content-type", ""))
+        ):
+            await send(start_message)
+            await send(message)
+            return
+
+        compressed = await run_in_threadpool(self.compressors[encoding], body)
+        compression_stats.add(len(body), len(compressed))
+
+        headers["content-encoding"] = encoding
+        headers["content-length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        if (etag := headers.get("etag")) and not etag.startswith("W/"):
+            # The compressed body is not byte for byte the same representation anymore
+            headers["etag"] = f"W/{etag}"
+        start_message["headers"] = headers.raw
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": compressed, "more_body": False})
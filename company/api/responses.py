@@ -0,0 +1,90 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""JSON response classes that serialise with orjson.
+
+Types orjson does not handle natively (IP addresses, pydantic models, API client models) and datetimes, which the
+orchestrator formats with seconds precision, go through the same ``to_serializable`` as ``json_dumps``.
+"""
+
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Mapping
+
+import orjson
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+
+from orchestrator.utils.datetime import isoformat
+from orchestrator.utils.json import to_serializable
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _default(o: Any) -> Any:
+    if isinstance(o, datetime):
+        return isoformat(o)
+    return to_serializable(o)
+
+
+def orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json; charset=utf-8"
+
+    def render(self, content: Any) -> bytes:
+        return orjson_dumps(content)
+
+
+class StreamingJSONResponse(StreamingResponse):
+    """Stream an iterable as a JSON array, without building the whole body in memory.
+
+    Items are serialised one by one and sent in chunks of about ``STREAM_CHUNK_SIZE`` bytes. Synchronous iterables
+    (e.g. a ``Query.yield_per()``) are consumed in the threadpool. An error while iterating can not change the status
+    code anymore and aborts the response, so the client gets invalid JSON instead of a truncated list.
+
+    Example::
+
+        @router.get("/")
+        def list_things() -> StreamingJSONResponse:
+            return StreamingJSONResponse(thing.dict() for thing in ThingTable.query.yield_per(1000))
+    """
+
+    media_type = "application/json; charset=utf-8"
+
+    def __init__(
+        self,
+        content: Iterable[Any] | AsyncIterable[Any],
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        items = content if isinstance(content, AsyncIterable) else iterate_in_threadpool(iter(content))
+        super().__init__(self._chunks(items), status_code, headers, self.media_type, background)
+
+    @staticmethod
+    async def _chunks(items: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+        chunk = bytearray(b"[")
+        separator = b""
+        async for item in items:
+            chunk += separator
+            chunk += orjson_dumps(item)
+            separator = b","
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield bytes(chunk)
+                chunk.clear()
+        chunk += b"]"
+        yield bytes(chunk)
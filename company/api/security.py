@@ -0,0 +1,38 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Authorization dependencies of the company endpoints, next to the OPA decision of orchestrator-core."""
+
+from http import HTTPStatus
+
+from fastapi.param_functions import Depends
+from oauth2_lib.fastapi import OIDCUserModel
+
+from orchestrator.api.error_handling import raise_status
+from orchestrator.security import oidc_user
+from orchestrator.settings import oauth2_settings
+
+from company.settings import admin_settings
+
+
+def admin_security(user: OIDCUserModel | None = Depends(oidc_user)) -> OIDCUserModel | None:
+    """Only let users with one of the ADMIN_ROLES through.
+
+    Admin endpoints can slow a worker down (profiling) or expose internals, so the OPA decision that every company
+    endpoint gets is not enough. Nothing is checked when OAuth2 is not active, like the OPA decision.
+    """
+    if not oauth2_settings.OAUTH2_ACTIVE:
+        return user
+    if user is None or not user.roles & set(admin_settings.ADMIN_ROLES):
+        raise_status(HTTPStatus.FORBIDDEN, "Only administrators can use this endpoint")
+    return user
@@ -0,0 +1,21 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import typer
+
+from company.cli import bulk, dry_run, preferences
+
+app = typer.Typer()
+app.command(name="bulk-run")(bulk.bulk_run)
+app.command(name="dry-run")(dry_run.dry_run)
+app.add_typer(preferences.app, name="preferences")
@@ -0,0 +1,260 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Start a workflow for many subscriptions without overloading the workers or the systems they talk to."""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+from threading import Lock
+from time import monotonic, sleep
+from typing import Callable, Iterable, List, Optional
+from uuid import UUID
+
+import structlog
+import typer
+
+logger = structlog.get_logger(__name__)
+
+IN_PROGRESS_STATUSES = ("created", "running", "waiting")
+COMPLETED_STATUS = "completed"
+MAX_BACKOFF = 60.0
+
+
+class RateLimiter:
+    """Token bucket that allows `rate` acquisitions per second with bursts of at most `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = monotonic()
+            self._tokens -= 1
+
+
+class Checkpoint:
+    """Results of a bulk run per subscription, stored after every change so an interrupted run can be resumed."""
+
+    def __init__(self, path: Path, workflow: str) -> None:
+        self.path = path
+        self.workflow = workflow
+        self.results: dict[str, dict[str, str | None]] = {}
+
+        if path.exists():
+            data = json.loads(path.read_text())
+            if data["workflow"] != workflow:
+                raise typer.BadParameter(f"Checkpoint {path} belongs to workflow {data['workflow']}")
+            self.results = data["results"]
+
+    def resume(self, lookup: Callable[[Iterable[UUID]], dict[UUID, str]]) -> dict[UUID, str]:
+        """Replace the in progress entries of an interrupted run by the current status of their process.
+
+        Args:
+            lookup: Returns the last status of the processes with the given pids, like :func:`process_statuses`.
+
+        Returns: The processes that are still in progress, by pid, with their subscription.
+
+        """
+        pending = {
+            UUID(result["pid"]): subscription_id
+            for subscription_id, result in self.results.items()
+            if result["status"] in IN_PROGRESS_STATUSES and result["pid"]
+        }
+        if not pending:
+            return {}
+
+        statuses = lookup(pending)
+        in_progress = {}
+        for pid, subscription_id in pending.items():
+            status = statuses.get(pid, "not found")
+            if status in IN_PROGRESS_STATUSES:
+                in_progress[pid] = subscription_id
+            self.results[subscription_id] = {"pid": str(pid), "status": status}
+        self._save()
+        return in_progress
+
+    def is_done(self, subscription_id: str, retry_failed: bool) -> bool:
+        """Return whether the subscription should not be started, call :meth:`resume` first.
+
+        Subscriptions whose process is still in progress are never started again, failed ones only when
+        `retry_failed` is set.
+        """
+        result = self.results.get(subscription_id)
+        if result is None:
+            return False
+        if result["status"] == COMPLETED_STATUS or result["status"] in IN_PROGRESS_STATUSES:
+            return True
+        return not retry_failed
+
+    def record(self, subscription_id: str, pid: UUID | None, status: str) -> None:
+        self.results[subscription_id] = {"pid": str(pid) if pid else None, "status": status}
+        self._save()
+
+    def _save(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"workflow": self.workflow, "results": self.results}, indent=2))
+        os.replace(tmp_path, self.path)
+
+
+def select_subscriptions(
+    product_tags: Iterable[str],
+    products: Iterable[str],
+    statuses: Iterable[str],
+    customer_id: str | None,
+    subscription_ids: Iterable[str],
+    limit: int | None,
+) -> list[str]:
+    from sqlalchemy import select
+
+    from orchestrator.db import ProductTable, SubscriptionTable, db
+
+    stmt = (
+        select(SubscriptionTable.subscription_id)
+        .join(ProductTable, ProductTable.product_id == SubscriptionTable.product_id)
+        .where(SubscriptionTable.status.in_(list(statuses)))
+        .order_by(SubscriptionTable.subscription_id)
+    )
+    if tags := list(product_tags):
+        stmt = stmt.where(ProductTable.tag.in_(tags))
+    if names := list(products):
+        stmt = stmt.where(ProductTable.name.in_(names))
+    if customer_id:
+        stmt = stmt.where(SubscriptionTable.customer_id == customer_id)
+    if ids := list(subscription_ids):
+        stmt = stmt.where(SubscriptionTable.subscription_id.in_(ids))
+    if limit:
+        stmt = stmt.limit(limit)
+    return [str(subscription_id) for subscription_id in db.session.execute(stmt).scalars()]
+
+
+def queue_depth() -> int:
+    """Return the number of processes that are created or running in the whole orchestrator."""
+    from sqlalchemy import func, select
+
+    from orchestrator.db import ProcessTable, db
+
+    stmt = select(func.count()).where(ProcessTable.last_status.in_(["created", "running"]))
+    return db.session.execute(stmt).scalar_one()
+
+
+def process_statuses(pids: Iterable[UUID]) -> dict[UUID, str]:
+    from sqlalchemy import select
+
+    from orchestrator.db import ProcessTable, db
+
+    stmt = select(ProcessTable.pid, ProcessTable.last_status).where(ProcessTable.pid.in_(list(pids)))
+    result = {pid: status for pid, status in db.session.execute(stmt)}
+    db.session.rollback()  # Do not keep a snapshot open between polls
+    return result
+
+
+def bulk_run(
+    workflow: str = typer.Argument(..., help="Name of the workflow to start for each subscription"),
+    product_tag: List[str] = typer.Option([], help="Only subscriptions of products with this tag"),
+    product: List[str] = typer.Option([], help="Only subscriptions of products with this name"),
+    status: List[str] = typer.Option(["active"], help="Only subscriptions with this lifecycle status"),
+    customer_id: Optional[str] = typer.Option(None, help="Only subscriptions of this customer"),
+    subscription_id: List[str] = typer.Option([], help="Only these subscriptions"),
+    limit: Optional[int] = typer.Option(None, help="Maximum number of subscriptions"),
+    extra_input: str = typer.Option("[]", help="JSON list of form pages to submit after the subscription page"),
+    concurrency: int = typer.Option(4, min=1, help="Maximum number of processes of this run at the same time"),
+    rate: float = typer.Option(1.0, min=0.01, help="Maximum number of processes started per second"),
+    max_queue_depth: int = typer.Option(20, min=1, help="Wait while this many processes are created or running"),
+    checkpoint: Path = typer.Option(Path("bulk-run.checkpoint.json"), help="File to store and resume progress"),
+    retry_failed: bool = typer.Option(False, help="Also rerun subscriptions that failed in a previous run"),
+    poll_interval: float = typer.Option(1.0, min=0.1, help="Seconds between process status checks"),
+    user: str = typer.Option("bulk-run", help="User that is recorded as the creator of the processes"),
+    dry_run: bool = typer.Option(False, help="Only show the subscriptions that would be processed"),
+) -> None:
+    """Start a workflow for a filtered set of subscriptions, throttled and resumable.
+
+    Processes run in the thread pool of this command, so more concurrency than the orchestrator MAX_WORKERS setting
+    has no effect. When the orchestrator as a whole has more than --max-queue-depth processes created or running no
+    new processes are started, with an exponential backoff.
+    """
+    from orchestrator.db import init_database
+    from orchestrator.services.processes import start_process
+    from orchestrator.settings import app_settings
+
+    import company.workflows  # noqa: F401  Side-effects
+
+    init_database(app_settings)
+    extra_pages = json.loads(extra_input)
+    progress_file = Checkpoint(checkpoint, workflow)
+
+    # Processes of an interrupted run that are still going are waited for instead of started again
+    in_flight = progress_file.resume(process_statuses)
+    subscription_ids = select_subscriptions(product_tag, product, status, customer_id, subscription_id, limit)
+    todo = deque(sid for sid in subscription_ids if not progress_file.is_done(sid, retry_failed))
+    typer.echo(
+        f"{len(subscription_ids)} subscriptions selected, {len(todo)} to process, "
+        f"{len(in_flight)} still in progress from an earlier run"
+    )
+    if dry_run:
+        typer.echo("\n".join(todo))
+        return
+
+    limiter = RateLimiter(rate)
+    counts = {"completed": 0, "failed": 0}
+    backoff = 0.0
+    start = monotonic()
+
+    def finish(sid: str, pid: UUID | None, process_status: str) -> None:
+        progress_file.record(sid, pid, process_status)
+        counts["completed" if process_status == COMPLETED_STATUS else "failed"] += 1
+        progress.update(1)
+        if process_status != COMPLETED_STATUS:
+            logger.warning("Process did not complete", subscription_id=sid, pid=str(pid), status=process_status)
+
+    with typer.progressbar(length=len(todo) + len(in_flight), label=f"Running {workflow}") as progress:
+        while todo or in_flight:
+            while todo and len(in_flight) < concurrency:
+                if queue_depth() >= max_queue_depth:
+                    backoff = min(max(backoff * 2, poll_interval), MAX_BACKOFF)
+                    logger.info("Process queue is deep, backing off", seconds=backoff)
+                    break
+                backoff = 0.0
+
+                limiter.acquire()
+                sid = todo.popleft()
+                try:
+                    pid, _ = start_process(workflow, user_inputs=[{"subscription_id": sid}, *extra_pages], user=user)
+                except Exception as ex:
+                    finish(sid, None, f"not started: {ex}")
+                    continue
+                in_flight[pid] = sid
+                progress_file.record(sid, pid, "running")
+
+            sleep(max(poll_interval, backoff))
+            for pid, process_status in process_statuses(in_flight).items():
+                if process_status not in IN_PROGRESS_STATUSES:
+                    finish(in_flight.pop(pid), pid, process_status)
+
+    elapsed = monotonic() - start
+    throughput = (counts["completed"] + counts["failed"]) / elapsed if elapsed else 0.0
+    typer.echo(
+        f"Done in {elapsed:.1f}s ({throughput:.2f} subscriptions/s): "
+        f"{counts['completed']} completed, {counts['failed']} failed or suspended. Details in {checkpoint}"
+    )
@@ -0,0 +1,182 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Run workflows end to end against simulated external systems and a throwaway database."""
+
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing
+from pathlib import Path
+from time import perf_counter
+from typing import Iterator, List, Optional
+from uuid import uuid4
+
+import structlog
+import typer
+
+logger = structlog.get_logger(__name__)
+
+ROOT_PATH = Path(__file__).parent.parent.parent
+
+
+@contextlib.contextmanager
+def throwaway_database(database_uri: str, keep: bool = False) -> Iterator[str]:
+    """Create a new database next to `database_uri`, migrate it to the latest schema and drop it afterwards."""
+    import alembic.command
+    from alembic.config import Config
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine.url import make_url
+
+    import orchestrator
+    from orchestrator.settings import app_settings
+
+    url = make_url(database_uri)
+    url = url.set(database=f"{url.database}_dry_run_{uuid4().hex[:8]}")
+    engine = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with closing(engine.connect()) as conn:
+        conn.execute(f'CREATE DATABASE "{url.database}";')
+
+    throwaway_uri = str(url)
+    try:
+        app_settings.DATABASE_URI = throwaway_uri
+        alembic_cfg = Config(file_=str(ROOT_PATH / "alembic.ini"))
+        alembic_cfg.set_main_option("sqlalchemy.url", throwaway_uri)
+        version_locations = alembic_cfg.get_main_option("version_locations")
+        alembic_cfg.set_main_option(
+            "version_locations",
+            f"{version_locations} {os.path.dirname(orchestrator.__file__)}/migrations/versions/schema",
+        )
+        alembic.command.upgrade(alembic_cfg, "heads")
+        yield throwaway_uri
+    finally:
+        app_settings.DATABASE_URI = database_uri
+        if keep:
+            typer.echo(f"Kept database {url.database}")
+        else:
+            with closing(engine.connect()) as conn:
+                conn.execute(f'DROP DATABASE IF EXISTS "{url.database}" WITH (FORCE);')
+        engine.dispose()
+
+
+def _profiled_executor(max_workers: int, profilers: List[cProfile.Profile]) -> ThreadPoolExecutor:
+    """Return a thread pool in which every worker thread runs under its own profiler."""
+    lock = threading.Lock()
+
+    def _start_profiler() -> None:
+        profiler = cProfile.Profile()
+        with lock:
+            profilers.append(profiler)
+        profiler.enable()
+
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=_start_profiler)
+
+
+@contextlib.contextmanager
+def workflow_executor(executor: ThreadPoolExecutor) -> Iterator[ThreadPoolExecutor]:
+    """Run the processes that orchestrator-core starts on `executor`, restoring its own pool afterwards.
+
+    orchestrator-core has no public hook to replace its pool, so this swaps the module attribute behind
+    :func:`orchestrator.services.processes.get_thread_pool`.
+    """
+    from orchestrator.services import processes
+
+    previous = processes._workflow_executor
+    processes._workflow_executor = executor
+    try:
+        yield executor
+    finally:
+        executor.shutdown(wait=True)
+        processes._workflow_executor = previous
+
+
+def print_report(elapsed: float, runs: int) -> None:
+    from sqlalchemy import func, select
+
+    from orchestrator.db import ProcessTable, db
+
+    from company.db import ProcessStepTimingTable
+
+    stmt = select(ProcessTable.last_status, func.count()).group_by(ProcessTable.last_status)
+    statuses = dict(db.session.execute(stmt).all())
+    typer.echo(f"{runs} processes in {elapsed:.2f}s, {runs / elapsed:.2f} processes/s: {statuses}")
+
+    timings_stmt = (
+        select(
+            ProcessStepTimingTable.step_name,
+            func.count(),
+            func.avg(ProcessStepTimingTable.wall_time),
+            func.avg(ProcessStepTimingTable.db_queries),
+            func.avg(ProcessStepTimingTable.external_calls),
+        )
+        .group_by(ProcessStepTimingTable.step_name)
+        .order_by(func.avg(ProcessStepTimingTable.wall_time).desc())
+    )
+    typer.echo(f"{'step':<50} {'count':>6} {'avg wall':>10} {'queries':>8} {'external':>8}")
+    for step_name, count, wall_time, queries, external_calls in db.session.execute(timings_stmt):
+        typer.echo(f"{step_name[:50]:<50} {count:>6} {wall_time:>9.3f}s {queries:>8.1f} {external_calls:>8.1f}")
+
+
+def dry_run(
+    workflow: str = typer.Argument(..., help="Name of the workflow to run"),
+    user_inputs: Path = typer.Option(..., exists=True, help="JSON file with the list of form pages to submit"),
+    runs: int = typer.Option(10, min=1, help="Number of processes to run"),
+    concurrency: int = typer.Option(4, min=1, help="Number of worker threads"),
+    latency_ms: Optional[float] = typer.Option(None, help="Average latency of a simulated external call"),
+    failure_rate: Optional[float] = typer.Option(None, min=0, max=1, help="Fraction of external calls that fail"),
+    profile: Optional[Path] = typer.Option(None, help="Write cProfile statistics of the worker threads to this file"),
+    keep_database: bool = typer.Option(False, help="Do not drop the throwaway database afterwards"),
+) -> None:
+    """Run a workflow a number of times against simulated NSO and ApiClients and a throwaway database.
+
+    Reports the throughput, the status of the processes and the average timing of each step.
+    """
+    from orchestrator.db import init_database
+    from orchestrator.services import processes
+    from orchestrator.settings import app_settings
+    from orchestrator.workflows import get_workflow
+
+    import company.workflows  # noqa: F401  Side-effects: registers the company workflows
+    from company.settings import dry_run_settings
+
+    if get_workflow(workflow) is None:
+        raise typer.BadParameter(f"Unknown workflow {workflow}", param_hint="WORKFLOW")
+
+    dry_run_settings.DRY_RUN = True
+    if latency_ms is not None:
+        dry_run_settings.DRY_RUN_LATENCY_MS = latency_ms
+    if failure_rate is not None:
+        dry_run_settings.DRY_RUN_FAILURE_RATE = failure_rate
+    pages: List[dict] = json.loads(user_inputs.read_text())
+
+    with throwaway_database(app_settings.DATABASE_URI, keep=keep_database):
+        init_database(app_settings)
+
+        profilers: List[cProfile.Profile] = []
+        # Use a pool of our own so the workers can be sized and profiled
+        executor = _profiled_executor(concurrency, profilers) if profile else ThreadPoolExecutor(concurrency)
+        with workflow_executor(executor):
+            start = perf_counter()
+            futures = [processes.start_process(workflow, user_inputs=pages, user="dry-run")[1] for _ in range(runs)]
+            wait(futures)
+            elapsed = perf_counter() - start
+
+        print_report(elapsed, runs)
+        if profilers:
+            stats = pstats.Stats(*profilers)
+            stats.dump_stats(profile)
+            stats.sort_stats("cumulative").print_stats(25)
@@ -0,0 +1,96 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Export and import the user preferences table, e.g. for backups or to move them between environments."""
+
+import gzip
+from enum import Enum
+from pathlib import Path
+from time import perf_counter
+from typing import Optional
+
+import typer
+
+app: typer.Typer = typer.Typer()
+
+
+class FileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+def _file_format(path: Path, file_format: Optional[FileFormat]) -> str:
+    if file_format:
+        return file_format.value
+    suffixes = [suffix for suffix in path.suffixes if suffix != ".gz"]
+    if suffixes and suffixes[-1].lstrip(".") in FileFormat.__members__:
+        return suffixes[-1].lstrip(".")
+    raise typer.BadParameter(f"Can not determine the format of {path}, use --format")
+
+
+def _init_database() -> None:
+    from orchestrator.db import init_database
+    from orchestrator.settings import app_settings
+
+    init_database(app_settings)
+
+
+def _report(action: str, rows: int, start: float) -> None:
+    elapsed = perf_counter() - start
+    typer.echo(f"{action} {rows} user preferences in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)")
+
+
+@app.command(name="export")
+def export_preferences(
+    path: Path = typer.Argument(..., help="File to write, compressed with gzip when it ends with .gz"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", help="Defaults to the file extension"),
+) -> None:
+    """Export all user preferences as NDJSON (one document per line) or CSV."""
+    from sqlalchemy import func, select
+
+    from orchestrator.db import db
+
+    from company.db import UserPreferenceTable
+    from company.services.user_preferences import export_user_preferences
+
+    file_format_name = _file_format(path, file_format)
+    _init_database()
+    total = db.session.execute(select(func.count()).select_from(UserPreferenceTable)).scalar_one()
+
+    start = perf_counter()
+    with typer.progressbar(length=total, label="Exporting") as progress:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "wb") as fileobj:
+            rows = export_user_preferences(fileobj, file_format_name, lambda data: progress.update(data.count(b"\n")))
+    _report("Exported", rows, start)
+
+
+@app.command(name="import")
+def import_preferences(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="File to read, may be compressed with gzip"),
+    file_format: Optional[FileFormat] = typer.Option(None, "--format", help="Defaults to the file extension"),
+) -> None:
+    """Insert or update user preferences from a file written by export, in a single transaction."""
+    from company.services.user_preferences import import_user_preferences
+
+    file_format_name = _file_format(path, file_format)
+    _init_database()
+
+    start = perf_counter()
+    with typer.progressbar(length=path.stat().st_size, label="Importing") as progress, open(path, "rb") as raw:
+        fileobj = gzip.GzipFile(fileobj=raw, mode="rb") if path.suffix == ".gz" else raw
+        # Progress is measured on the file as stored, also when it is decompressed
+        rows = import_user_preferences(
+            fileobj, file_format_name, lambda data: progress.update(raw.tell() - progress.pos)
+        )
+    _report("Imported", rows, start)
@@ -12,11 +12,13 @@
 # limitations under the License.
 
 from company.db.models import (
+    ProcessStepTimingTable,
     UserPreferenceDomain,
     UserPreferenceTable,
 )
 
 __all__ = [
+    "ProcessStepTimingTable",
     "UserPreferenceTable",
     "UserPreferenceDomain",
 ]
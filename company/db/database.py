@@ -0,0 +1,107 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Async (asyncpg) database access for company endpoints.
+
+The orchestrator-core database is a scoped SQLAlchemy session that is bound to the thread handling the request. Plain
+``def`` endpoints therefore hold a threadpool slot for the duration of every query. Endpoints that only do light
+database work can instead be written as ``async def`` and get an ``AsyncSession`` from :func:`get_async_session`.
+"""
+
+from threading import Lock
+from typing import Any, AsyncGenerator
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from orchestrator.settings import app_settings
+
+from company.settings import database_settings
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+
+
+class AsyncDatabase:
+    """Lazily created async engine and session factory.
+
+    The engine is created on first use so importing this module does not require a database (or asyncpg).
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._engine: AsyncEngine | None = None
+        self._session_factory: sessionmaker | None = None
+
+    def init(self, database_uri: str, **engine_arguments: Any) -> None:
+        """(Re)create the engine for `database_uri`.
+
+        Args:
+            database_uri: A (sync) PostgreSQL database uri, the driver is replaced by asyncpg.
+            engine_arguments: Overrides for the pool configuration from the database settings. When a ``poolclass``
+                is passed the pool sizing settings are not applied.
+
+        """
+        with self._lock:
+            self._create(database_uri, **engine_arguments)
+
+    def _create(self, database_uri: str, **engine_arguments: Any) -> None:
+        url = make_url(database_uri).set(drivername=ASYNC_DRIVER)
+        arguments: dict[str, Any] = {"pool_pre_ping": True}
+        if "poolclass" not in engine_arguments:
+            arguments |= {
+                "pool_size": database_settings.ASYNC_DATABASE_POOL_SIZE,
+                "max_overflow": database_settings.ASYNC_DATABASE_MAX_OVERFLOW,
+                "pool_timeout": database_settings.ASYNC_DATABASE_POOL_TIMEOUT,
+                "pool_recycle": database_settings.ASYNC_DATABASE_POOL_RECYCLE,
+            }
+        arguments |= engine_arguments
+        self._engine = create_async_engine(url, **arguments)
+        self._session_factory = sessionmaker(self._engine, class_=AsyncSession, expire_on_commit=False)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._create(app_settings.DATABASE_URI)
+        return self._engine  # type: ignore
+
+    def reset(self) -> None:
+        """Forget the engine without closing its connections, it is recreated on first use.
+
+        Meant for forked child processes: the inherited connections belong to the parent.
+        """
+        with self._lock:
+            self._engine = None
+            self._session_factory = None
+
+    def session(self) -> AsyncSession:
+        self.engine  # noqa: B018  Make sure the session factory exists
+        return self._session_factory()  # type: ignore
+
+
+async_db = AsyncDatabase()
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that provides an ``AsyncSession`` that is closed when the request is done.
+
+    Example::
+
+        @router.get("/{name}")
+        async def get_thing(name: str, session: AsyncSession = Depends(get_async_session)) -> dict:
+            ...
+    """
+    async with async_db.session() as session:
+        yield session
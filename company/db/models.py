@@ -17,9 +17,15 @@ from typing import Any
 
 from sqlalchemy import (
     Column,
+    DateTime,
     Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
     PrimaryKeyConstraint,
     String,
+    text,
 )
 from sqlalchemy.dialects import postgresql as pg
 
@@ -38,4 +44,49 @@ class UserPreferenceTable(BaseModel):
     user_name = Column(String(), nullable=False, index=True)
     domain = Column(Enum(UserPreferenceDomain))
     preferences = Column(pg.JSONB(), nullable=False)
-    __table_args__: tuple[PrimaryKeyConstraint, dict[Any, Any]] = (PrimaryKeyConstraint("domain", "user_name"), {})
+    __table_args__: tuple[PrimaryKeyConstraint, Index, dict[Any, Any]] = (
+        PrimaryKeyConstraint("domain", "user_name"),
+        # jsonb_path_ops supports containment (@>) and jsonpath (@?) queries with a smaller index than jsonb_ops
+        Index(
+            "ix_user_preference_preferences",
+            "preferences",
+            postgresql_using="gin",
+            postgresql_ops={"preferences": "jsonb_path_ops"},
+        ),
+        {},
+    )
+
+
+class ProcessStepTimingTable(BaseModel):
+    """Resource usage of one execution of a workflow step, recorded by the company workflow wrappers."""
+
+    __tablename__ = "process_step_timing"
+    id = Column(pg.UUID(as_uuid=True), server_default=text("uuid_generate_v4()"), primary_key=True)
+    process_id = Column(pg.UUID(as_uuid=True), ForeignKey("processes.pid", ondelete="CASCADE"), index=True)
+    workflow_name = Column(String(), nullable=False)
+    step_name = Column(String(), nullable=False)
+    status = Column(String(), nullable=False)
+    wall_time = Column(Float(), nullable=False)
+    cpu_time = Column(Float(), nullable=False)
+    db_queries = Column(Integer(), nullable=False)
+    external_calls = Column(Integer(), nullable=False)
+    executed_at = Column(DateTime(timezone=True), server_default=text("current_timestamp"), nullable=False, index=True)
+
+
+class MailOutboxTable(BaseModel):
+    """Confirmation mails queued by workflow steps, sent by the mail dispatcher schedule."""
+
+    __tablename__ = "mail_outbox"
+    id = Column(pg.UUID(as_uuid=True), server_default=text("uuid_generate_v4()"), primary_key=True)
+    mail = Column(pg.JSONB(), nullable=False)
+    status = Column(String(), server_default=text("'queued'"), nullable=False)
+    attempts = Column(Integer(), server_default=text("0"), nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=text("current_timestamp"), nullable=False)
+    last_error = Column(String(), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=text("current_timestamp"), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    __table_args__: tuple[Index, dict[Any, Any]] = (
+        # The dispatcher only looks for queued mails, sent and dead ones are kept out of the index
+        Index("ix_mail_outbox_next_attempt_at", "next_attempt_at", postgresql_where=text("status = 'queued'")),
+        {},
+    )
@@ -14,9 +14,13 @@
 from orchestrator.schedules import ALL_SCHEDULERS
 
 from company.schedules.cache_warmer import run_cache_warmer
+from company.schedules.mail_dispatcher import run_mail_dispatcher
+from company.schedules.validate_subscriptions import run_validate_subscriptions
 
 ALL_SCHEDULERS.extend(
     [
         run_cache_warmer,
+        run_mail_dispatcher,
+        run_validate_subscriptions,
     ]
 )
@@ -0,0 +1,31 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import structlog
+
+from orchestrator.db import db
+from orchestrator.schedules.scheduling import scheduler
+
+from company.services.mail_outbox import dispatch_mail
+from company.settings import mail_settings
+
+logger = structlog.get_logger(__name__)
+
+
+@scheduler(name="Dispatch mail", time_unit="seconds", period=mail_settings.MAIL_DISPATCH_INTERVAL_SECONDS)
+def run_mail_dispatcher() -> None:
+    with db.database_scope():
+        result = dispatch_mail()
+    if result.sent or result.retried or result.dead:
+        logger.info("Dispatched mail", sent=result.sent, retried=result.retried, dead=result.dead)
@@ -0,0 +1,33 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import structlog
+
+from orchestrator.schedules.scheduling import scheduler
+
+from company.services.subscription_validation import validate_subscriptions
+
+logger = structlog.get_logger(__name__)
+
+
+@scheduler(name="Validate subscriptions", time_unit="day", at="03:00")
+def run_validate_subscriptions() -> None:
+    report = validate_subscriptions()
+    for failure in report.failures:
+        logger.warning(
+            "Subscription validation failed",
+            subscription_id=str(failure.subscription_id),
+            check=failure.check,
+            message=failure.message,
+        )
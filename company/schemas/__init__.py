@@ -12,8 +12,18 @@
 # limitations under the License.
 
 
-from company.schemas.user import UserPreferenceSchema
+from company.schemas.compression import CompressionStatsSchema
+from company.schemas.profiler import AllocationSchema, ProfileSchema
+from company.schemas.step_timing import StepTimingSummarySchema
+from company.schemas.templates import TemplateRenderStatsSchema
+from company.schemas.user import UserPreferenceListSchema, UserPreferenceSchema
 
 __all__ = (
+    "AllocationSchema",
+    "CompressionStatsSchema",
+    "ProfileSchema",
+    "StepTimingSummarySchema",
+    "TemplateRenderStatsSchema",
+    "UserPreferenceListSchema",
     "UserPreferenceSchema",
 )
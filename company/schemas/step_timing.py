@@ -0,0 +1,26 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from orchestrator.schemas.base import OrchestratorBaseModel
+
+
+class StepTimingSummarySchema(OrchestratorBaseModel):
+    workflow_name: str
+    step_name: str
+    executions: int
+    wall_time_avg: float
+    wall_time_p95: float
+    wall_time_max: float
+    cpu_time_avg: float
+    db_queries_avg: float
+    external_calls_avg: float
@@ -23,3 +23,8 @@ class UserPreferenceSchema(OrchestratorBaseModel):
 
     class Config:
         orm_mode = True
+
+
+class UserPreferenceListSchema(OrchestratorBaseModel):
+    items: list[UserPreferenceSchema]
+    next_cursor: str | None
@@ -0,0 +1,238 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Check the DNS records of many nodes at once.
+
+All A, AAAA and PTR lookups of a batch run concurrently on one event loop, at most ``DNS_CONCURRENCY`` at a time.
+Answers are cached for their TTL (capped at ``DNS_MAX_CACHE_SECONDS``), names that do not exist or have no records of
+the type for ``DNS_NEGATIVE_CACHE_SECONDS``. Lookups of the same record that are in flight at the same time share one
+query. The result is one :class:`DnsReport` with a :class:`DnsCheckResult` per node.
+
+Example::
+
+    report = check_node_dns([NodeDnsRecords("rt1.dev.vtb", IPv4Address("10.1.4.1"), IPv6Address("fd00:0:100:1::1"))])
+    if not report.ok:
+        raise ValueError(report.failures)
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from ipaddress import IPv4Address, IPv6Address
+from threading import Lock
+from time import monotonic
+from typing import Iterable
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import dns.reversename
+import structlog
+
+from company.settings import dns_settings, external_service_settings
+from company.types import IPAddress
+
+logger = structlog.get_logger(__name__)
+
+
+class DnsLookupError(Exception):
+    """The lookup failed (timeout, no nameserver answered), as opposed to the record not existing."""
+
+
+class DnsCache:
+    """Answers by (name, record type), negative answers are cached as an empty tuple."""
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str], tuple[float, tuple[str, ...]]] = {}
+        self._lock = Lock()
+
+    def get(self, name: str, rdtype: str) -> tuple[str, ...] | None:
+        entry = self._entries.get((name, rdtype))
+        if entry is None or entry[0] <= monotonic():
+            return None
+        return entry[1]
+
+    def set(self, name: str, rdtype: str, answers: tuple[str, ...], ttl: float) -> None:
+        with self._lock:
+            if len(self._entries) >= dns_settings.DNS_CACHE_SIZE:
+                now = monotonic()
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+                if len(self._entries) >= dns_settings.DNS_CACHE_SIZE:
+                    self._entries.clear()
+            self._entries[(name, rdtype)] = (monotonic() + ttl, answers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+dns_cache = DnsCache()
+
+
+def create_resolver() -> dns.asyncresolver.Resolver:
+    """Return a resolver for the configured nameservers, or the ones of the system if none are configured."""
+    resolver = dns.asyncresolver.Resolver(configure=not dns_settings.DNS_NAMESERVERS)
+    if dns_settings.DNS_NAMESERVERS:
+        resolver.nameservers = list(dns_settings.DNS_NAMESERVERS)
+    resolver.port = dns_settings.DNS_PORT
+    resolver.timeout = dns_settings.DNS_TIMEOUT_SECONDS
+    resolver.lifetime = dns_settings.DNS_LIFETIME_SECONDS
+    return resolver
+
+
+class DnsLookup:
+    """Cached, concurrency limited lookups on one event loop."""
+
+    def __init__(self, resolver: dns.asyncresolver.Resolver, cache: DnsCache, concurrency: int) -> None:
+        self.resolver = resolver
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def resolve(self, name: str, rdtype: str) -> tuple[str, ...]:
+        """Return the (sorted) records of type `rdtype` of `name`, an empty tuple if there are none."""
+        name = name.lower().rstrip(".") + "."
+        if (answers := self.cache.get(name, rdtype)) is not None:
+            return answers
+
+        key = (name, rdtype)
+        if (task := self._in_flight.get(key)) is None:
+            task = self._in_flight[key] = asyncio.ensure_future(self._query(name, rdtype))
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _query(self, name: str, rdtype: str) -> tuple[str, ...]:
+        async with self._semaphore:
+            try:
+                answer = await self.resolver.resolve(name, rdtype, search=False)
+            except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+                self.cache.set(name, rdtype, (), dns_settings.DNS_NEGATIVE_CACHE_SECONDS)
+                return ()
+            except (dns.resolver.NoNameservers, dns.exception.Timeout) as ex:
+                raise DnsLookupError(f"Lookup of {rdtype} {name} failed: {ex}") from ex
+
+        answers = tuple(sorted(rdata.to_text().lower() for rdata in answer))
+        self.cache.set(name, rdtype, answers, min(answer.rrset.ttl, dns_settings.DNS_MAX_CACHE_SECONDS))
+        return answers
+
+    async def reverse(self, address: IPAddress) -> tuple[str, ...]:
+        return await self.resolve(dns.reversename.from_address(str(address)).to_text(), "PTR")
+
+
+@dataclass(frozen=True)
+class NodeDnsRecords:
+    """The records a node should have, `name` is the fully qualified name."""
+
+    name: str
+    ipv4: IPv4Address | None = None
+    ipv6: IPv6Address | None = None
+
+
+@dataclass
+class DnsCheckResult:
+    name: str
+    records: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    failures: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+@dataclass
+class DnsReport:
+    results: list[DnsCheckResult] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results)
+
+    @property
+    def failures(self) -> dict[str, list[str]]:
+        return {result.name: result.failures for result in self.results if not result.ok}
+
+
+async def _check_address(
+    lookup: DnsLookup, node: NodeDnsRecords, rdtype: str, address: IPAddress, result: DnsCheckResult
+) -> None:
+    fqdn = node.name.lower().rstrip(".") + "."
+    forward, reverse = await asyncio.gather(
+        lookup.resolve(node.name, rdtype), lookup.reverse(address), return_exceptions=True
+    )
+
+    if isinstance(forward, Exception):
+        result.failures.append(str(forward))
+    else:
+        result.records[rdtype] = forward
+        if str(address) not in forward:
+            result.failures.append(f"{rdtype} of {node.name} is {', '.join(forward) or 'missing'}, expected {address}")
+
+    if isinstance(reverse, Exception):
+        result.failures.append(str(reverse))
+    else:
+        result.records[f"PTR {address}"] = reverse
+        if fqdn not in reverse:
+            result.failures.append(f"PTR of {address} is {', '.join(reverse) or 'missing'}, expected {fqdn}")
+
+
+async def check_node_dns_async(
+    nodes: Iterable[NodeDnsRecords],
+    resolver: dns.asyncresolver.Resolver | None = None,
+    cache: DnsCache | None = None,
+) -> DnsReport:
+    """Check the A, AAAA and PTR records of all nodes concurrently.
+
+    Args:
+        nodes: The nodes and the addresses they should resolve to.
+        resolver: The resolver to use, defaults to :func:`create_resolver`.
+        cache: The cache to use, defaults to the cache of this process.
+
+    Returns: The report with the records found and the failed checks per node.
+
+    """
+    start = monotonic()
+    cache = dns_cache if cache is None else cache
+    lookup = DnsLookup(resolver or create_resolver(), cache, dns_settings.DNS_CONCURRENCY)
+
+    checks = []
+    report = DnsReport()
+    for node in nodes:
+        result = DnsCheckResult(node.name)
+        report.results.append(result)
+        if node.ipv4 is not None:
+            checks.append(_check_address(lookup, node, "A", node.ipv4, result))
+        if node.ipv6 is not None:
+            checks.append(_check_address(lookup, node, "AAAA", node.ipv6, result))
+
+    await asyncio.gather(*checks)
+    report.duration = monotonic() - start
+    logger.debug(
+        "Checked DNS records", nodes=len(report.results), failed=len(report.failures), duration=report.duration
+    )
+    return report
+
+
+def check_node_dns(nodes: Iterable[NodeDnsRecords], resolver: dns.asyncresolver.Resolver | None = None) -> DnsReport:
+    """Check the DNS records of nodes from synchronous code like workflow steps, see :func:`check_node_dns_async`.
+
+    Nothing is checked when DO_DNS_CHECKS is disabled.
+    """
+    nodes = list(nodes)
+    if not external_service_settings.DO_DNS_CHECKS:
+        return DnsReport([DnsCheckResult(node.name) for node in nodes])
+    return asyncio.run(check_node_dns_async(nodes, resolver))
+
+
+def node_fqdn(node_name: str, zone: str | None = None) -> str:
+    """Return the fully qualified name of a node in NODE_DNS_ZONE (or `zone`)."""
+    return f"{node_name}.{zone or external_service_settings.NODE_DNS_ZONE}"
@@ -0,0 +1,315 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Outbox for confirmation mails.
+
+Workflow steps call :func:`enqueue_mail`, which only adds a row to the ``mail_outbox`` table in the transaction of
+the step: the mail is sent when, and only when, the step commits, and the step never waits on the mail server. The
+mail dispatcher schedule calls :func:`dispatch_mail`, which claims batches of due mails with ``SKIP LOCKED`` (so
+several dispatchers can run side by side) and sends them over a small pool of SMTP connections that stay open
+between batches. Failed mails are retried with exponential backoff; mails that are refused by the server, or still
+fail after ``MAIL_MAX_ATTEMPTS``, are kept with status ``dead`` for inspection.
+
+A claim pushes ``next_attempt_at`` forward by ``MAIL_CLAIM_TIMEOUT_SECONDS``, so mails of a dispatcher that died
+halfway a batch are picked up again after that timeout.
+"""
+
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+from queue import Empty, LifoQueue
+from threading import BoundedSemaphore
+from time import monotonic
+from typing import Any, Iterator, NamedTuple
+from uuid import UUID
+
+import html2text
+import structlog
+from sqlalchemy import bindparam, func, select, update
+
+from orchestrator.db import db
+from orchestrator.settings import app_settings
+
+from company.db.models import MailOutboxTable
+from company.settings import mail_settings
+from company.types import ConfirmationMail, MailAddress
+from company.utils.lazy import LazySingleton
+
+logger = structlog.get_logger(__name__)
+
+QUEUED = "queued"
+SENT = "sent"
+DEAD = "dead"
+
+
+def enqueue_mail(mail: ConfirmationMail) -> UUID:
+    """Queue a mail for sending once the current transaction commits.
+
+    Args:
+        mail: The mail to send.
+
+    Returns: The id of the outbox row.
+
+    """
+    row = MailOutboxTable(mail=dict(mail))
+    db.session.add(row)
+    db.session.flush()
+    return row.id
+
+
+def _format_addresses(addresses: list[MailAddress]) -> str:
+    return ", ".join(formataddr((address["name"], address["email"])) for address in addresses)
+
+
+def build_message(mail: ConfirmationMail, sender: str) -> EmailMessage:
+    """Build a plain text and html message of a mail, bcc recipients are left out of the headers."""
+    message = EmailMessage()
+    message["Subject"] = mail["subject"]
+    message["From"] = sender
+    message["To"] = _format_addresses(mail["to"])
+    if mail["cc"]:
+        message["Cc"] = _format_addresses(mail["cc"])
+    message["Content-Language"] = mail["language"]
+    message.set_content(html2text.html2text(mail["message"]))
+    message.add_alternative(mail["message"], subtype="html")
+    return message
+
+
+def recipients(mail: ConfirmationMail) -> list[str]:
+    return [address["email"] for address in (*mail["to"], *mail["cc"], *mail["bcc"])]
+
+
+class SMTPConnectionPool:
+    """At most `size` SMTP connections that are reused for many mails.
+
+    Connections that were idle for longer than `idle_timeout` seconds are not trusted anymore (servers drop idle
+    clients) and replaced by a new one.
+    """
+
+    def __init__(
+        self, host: str, port: int, starttls: bool, size: int, idle_timeout: float, timeout: float = 30.0
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: LifoQueue[tuple[smtplib.SMTP, float]] = LifoQueue()
+        self._slots = BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            connection.starttls()
+        return connection
+
+    @staticmethod
+    def _close(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                connection, idle_since = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+            if monotonic() - idle_since < self.idle_timeout:
+                return connection
+            self._close(connection)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """Borrow a connection, it is closed instead of returned when anything but a refused mail goes wrong."""
+        with self._slots:
+            connection = self._checkout()
+            try:
+                yield connection
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as ex:
+                # The server refused a mail but is still talking to us, unless it is shutting down (421)
+                if getattr(ex, "smtp_code", None) == 421:
+                    connection.close()
+                else:
+                    self._idle.put((connection, monotonic()))
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            self._idle.put((connection, monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except Empty:
+                return
+            self._close(connection)
+
+
+_smtp_pool: LazySingleton[SMTPConnectionPool] = LazySingleton(
+    lambda: SMTPConnectionPool(
+        app_settings.MAIL_SERVER,
+        app_settings.MAIL_PORT,
+        app_settings.MAIL_STARTTLS,
+        mail_settings.MAIL_CONNECTIONS,
+        mail_settings.MAIL_CONNECTION_IDLE_SECONDS,
+        mail_settings.MAIL_SMTP_TIMEOUT_SECONDS,
+    )
+)
+
+
+class ClaimedMail(NamedTuple):
+    id: UUID
+    mail: ConfirmationMail
+    attempts: int
+
+
+class SendResult(NamedTuple):
+    id: UUID
+    attempts: int
+    error: str | None
+    permanent: bool
+
+
+@dataclass
+class DispatchResult:
+    sent: int = 0
+    retried: int = 0
+    dead: int = 0
+
+
+def _is_permanent(error: Exception) -> bool:
+    """Return whether the server refused the mail itself, trying again will not help."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return isinstance(error, (smtplib.SMTPNotSupportedError, UnicodeError))
+
+
+def _send(pool: SMTPConnectionPool, claimed: ClaimedMail) -> SendResult:
+    sender = mail_settings.MAIL_SENDER
+    try:
+        message = build_message(claimed.mail, sender)
+        try:
+            with pool.connection() as connection:
+                connection.send_message(message, from_addr=sender, to_addrs=recipients(claimed.mail))
+        except smtplib.SMTPServerDisconnected:
+            # A pooled connection may have been dropped by the server just now, try once on a new one
+            with pool.connection() as connection:
+                connection.send_message(message, from_addr=sender, to_addrs=recipients(claimed.mail))
+    except Exception as ex:
+        return SendResult(claimed.id, claimed.attempts, repr(ex), _is_permanent(ex))
+    return SendResult(claimed.id, claimed.attempts, None, False)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Return the backoff after the given number of failed attempts."""
+    seconds = mail_settings.MAIL_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, mail_settings.MAIL_RETRY_BACKOFF_MAX_SECONDS))
+
+
+def _claim_batch(batch_size: int) -> list[ClaimedMail]:
+    due = (
+        select(MailOutboxTable.id)
+        .where(MailOutboxTable.status == QUEUED, MailOutboxTable.next_attempt_at <= func.now())
+        .order_by(MailOutboxTable.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    claim = (
+        update(MailOutboxTable)
+        .where(MailOutboxTable.id.in_(due))
+        .values(
+            attempts=MailOutboxTable.attempts + 1,
+            next_attempt_at=func.now() + timedelta(seconds=mail_settings.MAIL_CLAIM_TIMEOUT_SECONDS),
+        )
+        .returning(MailOutboxTable.id, MailOutboxTable.mail, MailOutboxTable.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = [ClaimedMail(*row) for row in db.session.execute(claim)]
+    db.session.commit()
+    return claimed
+
+
+def _record_results(results: list[SendResult], result: DispatchResult) -> None:
+    outbox = MailOutboxTable.__table__
+    sent = [{"outbox_id": send.id} for send in results if send.error is None]
+    failed: list[dict[str, Any]] = []
+    for send in results:
+        if send.error is None:
+            continue
+        dead = send.permanent or send.attempts >= mail_settings.MAIL_MAX_ATTEMPTS
+        failed.append(
+            {
+                "outbox_id": send.id,
+                "new_status": DEAD if dead else QUEUED,
+                "delay": retry_delay(send.attempts),
+                "error": send.error,
+            }
+        )
+        if dead:
+            result.dead += 1
+            logger.error("Giving up on mail", outbox_id=str(send.id), attempts=send.attempts, error=send.error)
+        else:
+            result.retried += 1
+
+    if sent:
+        db.session.execute(
+            outbox.update()
+            .where(outbox.c.id == bindparam("outbox_id"))
+            .values(status=SENT, sent_at=func.now(), last_error=None),
+            sent,
+        )
+        result.sent += len(sent)
+    if failed:
+        db.session.execute(
+            outbox.update()
+            .where(outbox.c.id == bindparam("outbox_id"))
+            .values(
+                status=bindparam("new_status"),
+                next_attempt_at=func.now() + bindparam("delay"),
+                last_error=bindparam("error"),
+            ),
+            failed,
+        )
+    db.session.commit()
+
+
+def dispatch_mail(batch_size: int | None = None, pool: SMTPConnectionPool | None = None) -> DispatchResult:
+    """Send all mails in the outbox that are due, batch by batch, until none are left.
+
+    Args:
+        batch_size: Number of mails claimed at once, defaults to MAIL_BATCH_SIZE.
+        pool: The SMTP connections to send over, defaults to the pool of this process.
+
+    Returns: The number of mails that were sent, will be retried and were given up on.
+
+    """
+    batch_size = batch_size or mail_settings.MAIL_BATCH_SIZE
+    pool = pool or _smtp_pool.get()
+    result = DispatchResult()
+
+    with ThreadPoolExecutor(max_workers=mail_settings.MAIL_CONNECTIONS, thread_name_prefix="mail") as executor:
+        while batch := _claim_batch(batch_size):
+            results = list(executor.map(lambda claimed: _send(pool, claimed), batch))
+            _record_results(results, result)
+            if len(batch) < batch_size:
+                break
+    return result
@@ -14,20 +14,24 @@
 
 from functools import wraps
 from http import HTTPStatus
-from typing import Any, Callable, Sequence, TypeVar
+from typing import TYPE_CHECKING, Any, Callable, Sequence, TypeVar
 from urllib import parse
 from uuid import UUID
 
 import structlog
-from pynso import DatastoreType
 from structlog.threadlocal import tmp_bind
 
 from orchestrator.types import State
 from orchestrator.utils.errors import ApiException
 from orchestrator.utils.json import json_dumps
 
-from company.settings import external_service_settings
-from company.utils.external import nso_api_client
+from company.settings import dry_run_settings, external_service_settings
+from company.utils.external import get_nso_client
+from company.utils.instrumentation import count_external_call
+from company.utils.simulation import simulated_nso_client
+
+if TYPE_CHECKING:
+    from pynso import DatastoreType
 
 logger = structlog.get_logger(__name__)
 
@@ -39,11 +43,16 @@ DEVICES_ROOT_PATH = "tailf-ncs:devices"
 T = TypeVar("T")
 
 
+def _nso_client() -> Any:
+    return simulated_nso_client if dry_run_settings.DRY_RUN else get_nso_client()
+
+
 def only_if_nso_enabled(f: Callable[..., T]) -> Callable[..., T]:
     @wraps(f)
     def wrapper(*args: Any, **kwargs: Any) -> T:
         if not external_service_settings.NSO_ENABLED:
             raise Exception("NSO disabled")
+        count_external_call()
         return f(*args, **kwargs)
 
     return wrapper
@@ -61,7 +70,7 @@ def create(path: Sequence[str], payload: dict) -> bool:
 
     """
     logger.debug("NSO payload: %s", payload)
-    return nso_api_client.create_data_value(data_path=path, data=json_dumps(payload))
+    return _nso_client().create_data_value(data_path=path, data=json_dumps(payload))
 
 
 @only_if_nso_enabled
@@ -76,12 +85,12 @@ def update(path: Sequence[str], payload: dict) -> bool:
     Returns: True
 
     """
-    return nso_api_client.set_data_value(data_path=path, data=json_dumps(payload))
+    return _nso_client().set_data_value(data_path=path, data=json_dumps(payload))
 
 
 @only_if_nso_enabled
-def get(path: Sequence[str], *, datastore: DatastoreType = None, params: dict[str, Any] | None = None) -> Any:
-    return nso_api_client.get_data(data_path=path, datastore=datastore, params=params)
+def get(path: Sequence[str], *, datastore: "DatastoreType | None" = None, params: dict[str, Any] | None = None) -> Any:
+    return _nso_client().get_data(data_path=path, datastore=datastore, params=params)
 
 
 @only_if_nso_enabled
@@ -96,7 +105,7 @@ def delete(path: Sequence[str]) -> bool:
     Returns: boolean
 
     """
-    return nso_api_client.delete_path(data_path=path)
+    return _nso_client().delete_path(data_path=path)
 
 
 @only_if_nso_enabled
@@ -104,7 +113,7 @@ def call_operation(path: Sequence[str], data: dict | None = None) -> Any:
     if data is None:
         data = {}
 
-    return nso_api_client.call_operation(data_path=path, data=data)
+    return _nso_client().call_operation(data_path=path, data=data)
 
 
 def create_node_path(node_name: str) -> list[str]:
@@ -117,10 +126,14 @@ def create_service_path(service_type: str, service_id: str | UUID) -> list[str]:
 
 
 def get_all_services() -> dict:
+    from pynso import DatastoreType
+
     return get([SERVICES_ROOT_PATH], datastore=DatastoreType.CONFIG).get("tailf-ncs:services", {})
 
 
 def get_service(service_type: str, service_id: str | UUID) -> State:
+    from pynso import DatastoreType
+
     return get(create_service_path(service_type, service_id), datastore=DatastoreType.CONFIG)
 
 
@@ -0,0 +1,300 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local index of the used prefixes in the address pools we carve subnets from.
+
+Every pool is a binary (radix) tree over the address bits below the pool prefix. Only the parts of the tree that
+contain used prefixes exist, a missing child is a completely free block. Each node keeps the length of the biggest
+free block below it, so "the first free /31" and "is this /64 free" walk at most one path from the root: a few
+dozen steps, whatever the number of used prefixes.
+
+The index is filled from IPAM with :meth:`PrefixIndex.sync`. :meth:`PrefixIndex.reserve` marks prefixes as used
+locally and then confirms them to IPAM in one call, so bulk provisioning needs one IPAM request per batch instead of
+a search per link. Reserved prefixes that are not confirmed yet survive a sync.
+"""
+
+from contextlib import suppress
+from dataclasses import dataclass
+from ipaddress import ip_network
+from threading import Lock
+from time import monotonic
+from typing import Callable, Iterable, Iterator
+
+import structlog
+
+from company.settings import external_service_settings
+from company.types import IPNetwork
+
+logger = structlog.get_logger(__name__)
+
+FULL = 129  # ``_Node.biggest_free`` of a subtree without free blocks, longer than any prefix
+
+Fetcher = Callable[[IPNetwork], Iterable[IPNetwork]]
+Confirmer = Callable[[list[IPNetwork]], None]
+
+
+class PrefixInUse(ValueError):
+    pass
+
+
+class PoolExhausted(ValueError):
+    pass
+
+
+class _Node:
+    __slots__ = ("children", "used", "biggest_free")
+
+    def __init__(self, prefixlen: int) -> None:
+        self.children: list["_Node | None"] = [None, None]
+        self.used = False
+        # Prefix length of the biggest free block in this subtree, FULL if there is none
+        self.biggest_free = prefixlen
+
+
+class PrefixTree:
+    """Used prefixes inside one network."""
+
+    def __init__(self, network: IPNetwork) -> None:
+        self.network = network
+        self._bits = network.max_prefixlen
+        self._root = _Node(network.prefixlen)
+        self._network_class = type(network)
+
+    def _check(self, prefix: IPNetwork) -> None:
+        if prefix.version != self.network.version or not prefix.subnet_of(self.network):  # type: ignore[arg-type]
+            raise ValueError(f"{prefix} is not part of {self.network}")
+
+    def _bit(self, address: int, prefixlen: int) -> int:
+        """Return the bit of `address` that selects the child of a node at `prefixlen`."""
+        return (address >> (self._bits - prefixlen - 1)) & 1
+
+    def _update(self, node: _Node, prefixlen: int) -> None:
+        if node.used:
+            node.biggest_free = FULL
+        elif node.children == [None, None]:
+            node.biggest_free = prefixlen
+        else:
+            node.biggest_free = min(prefixlen + 1 if child is None else child.biggest_free for child in node.children)
+
+    def _path(self, prefix: IPNetwork, create: bool) -> Iterator[tuple[_Node, int]]:
+        """Yield the nodes from the root down to `prefix`, stopping early at a used or missing node."""
+        address = int(prefix.network_address)
+        node: _Node | None = self._root
+        prefixlen = self.network.prefixlen
+        while node is not None:
+            yield node, prefixlen
+            if node.used or prefixlen == prefix.prefixlen:
+                return
+            bit = self._bit(address, prefixlen)
+            if node.children[bit] is None and create:
+                node.children[bit] = _Node(prefixlen + 1)
+            node = node.children[bit]
+            prefixlen += 1
+
+    def is_free(self, prefix: IPNetwork) -> bool:
+        """Return whether no part of `prefix` is used."""
+        self._check(prefix)
+        for node, prefixlen in self._path(prefix, create=False):
+            if node.used:
+                return False
+            if prefixlen == prefix.prefixlen:
+                return node.children == [None, None]
+        return True  # Reached a missing node: a free block that contains the prefix
+
+    def add(self, prefix: IPNetwork) -> None:
+        """Mark `prefix` as used, raises PrefixInUse when any part of it is used already."""
+        self._check(prefix)
+        path = list(self._path(prefix, create=True))
+        node, prefixlen = path[-1]
+        if node.used or prefixlen != prefix.prefixlen or node.children != [None, None]:
+            self._prune(path)
+            raise PrefixInUse(f"{prefix} overlaps with a used prefix")
+        node.used = True
+        for node, prefixlen in reversed(path):
+            self._update(node, prefixlen)
+
+    def remove(self, prefix: IPNetwork) -> None:
+        """Mark `prefix` as free again, it must have been added as a whole."""
+        self._check(prefix)
+        path = list(self._path(prefix, create=False))
+        node, prefixlen = path[-1]
+        if not node.used or prefixlen != prefix.prefixlen:
+            raise ValueError(f"{prefix} is not used")
+        node.used = False
+        self._prune(path)
+
+    def _prune(self, path: list[tuple[_Node, int]]) -> None:
+        """Update the nodes on `path` bottom up, dropping children that became completely free."""
+        for node, prefixlen in reversed(path):
+            for bit, child in enumerate(node.children):
+                if child is not None and not child.used and child.children == [None, None]:
+                    node.children[bit] = None
+            self._update(node, prefixlen)
+
+    def first_free(self, prefixlen: int) -> IPNetwork | None:
+        """Return the free prefix of length `prefixlen` with the lowest address, or None if there is none."""
+        if not self.network.prefixlen <= prefixlen <= self._bits:
+            raise ValueError(f"Can not allocate a /{prefixlen} from {self.network}")
+
+        if self._root.biggest_free > prefixlen:
+            return None
+
+        # Every node on the way has a free block of at least the requested size, take the lowest child that has too
+        node: _Node | None = self._root
+        depth = self.network.prefixlen
+        address = int(self.network.network_address)
+        while node is not None and depth < prefixlen:
+            for bit, child in enumerate(node.children):
+                if child is None or child.biggest_free <= prefixlen:
+                    address |= bit << (self._bits - depth - 1)
+                    node = child
+                    break
+            depth += 1
+        return self._network_class((address, prefixlen))
+
+    def __iter__(self) -> Iterator[IPNetwork]:
+        """Yield the used prefixes in address order."""
+        stack = [(self._root, int(self.network.network_address), self.network.prefixlen)]
+        while stack:
+            node, address, prefixlen = stack.pop()
+            if node.used:
+                yield self._network_class((address, prefixlen))
+                continue
+            for bit in (1, 0):
+                if (child := node.children[bit]) is not None:
+                    stack.append((child, address | bit << (self._bits - prefixlen - 1), prefixlen + 1))
+
+
+@dataclass
+class _Pool:
+    tree: PrefixTree
+    lock: Lock
+    pending: set[IPNetwork]
+    synced_at: float | None = None
+
+
+class PrefixIndex:
+    """Prefix trees of named address pools, kept in sync with IPAM.
+
+    Args:
+        pools: The networks of the pools by pool name.
+        fetch: Returns the used prefixes inside a pool according to IPAM.
+
+    """
+
+    def __init__(self, pools: dict[str, IPNetwork], fetch: Fetcher) -> None:
+        self.fetch = fetch
+        self._pools = {name: _Pool(PrefixTree(network), Lock(), set()) for name, network in pools.items()}
+
+    def _pool(self, name: str) -> _Pool:
+        try:
+            return self._pools[name]
+        except KeyError:
+            raise ValueError(f"Unknown address pool {name}") from None
+
+    def sync(self, name: str) -> int:
+        """Replace the used prefixes of a pool with those in IPAM and return how many there are."""
+        pool = self._pool(name)
+        tree = PrefixTree(pool.tree.network)
+        count = 0
+        for prefix in self.fetch(pool.tree.network):
+            try:
+                tree.add(prefix)
+                count += 1
+            except PrefixInUse:
+                logger.warning("Overlapping prefixes in IPAM", pool=name, prefix=str(prefix))
+
+        with pool.lock:
+            for prefix in pool.pending:
+                if tree.is_free(prefix):
+                    tree.add(prefix)
+            pool.tree = tree
+            pool.synced_at = monotonic()
+        return count
+
+    def sync_if_stale(self, name: str, max_age: float) -> None:
+        pool = self._pool(name)
+        if pool.synced_at is None or monotonic() - pool.synced_at > max_age:
+            self.sync(name)
+
+    def is_free(self, name: str, prefix: IPNetwork) -> bool:
+        return self._pool(name).tree.is_free(prefix)
+
+    def first_free(self, name: str, prefixlen: int) -> IPNetwork | None:
+        return self._pool(name).tree.first_free(prefixlen)
+
+    def reserve(self, name: str, prefixlen: int, count: int = 1, confirm: Confirmer | None = None) -> list[IPNetwork]:
+        """Reserve `count` free prefixes of length `prefixlen` and confirm them to IPAM in one call.
+
+        The prefixes are marked as used before `confirm` is called, so concurrent reservations do not get the same
+        ones. When `confirm` raises, the prefixes are freed again and the error is raised.
+
+        Args:
+            name: The pool to allocate from.
+            prefixlen: The length of the prefixes.
+            count: The number of prefixes.
+            confirm: Registers the prefixes in IPAM.
+
+        Returns: The reserved prefixes.
+
+        """
+        pool = self._pool(name)
+        with pool.lock:
+            tree = pool.tree
+            reserved = []
+            try:
+                for _ in range(count):
+                    if (prefix := tree.first_free(prefixlen)) is None:
+                        raise PoolExhausted(f"No free /{prefixlen} left in pool {name} ({tree.network})")
+                    tree.add(prefix)
+                    reserved.append(prefix)
+            except PoolExhausted:
+                for prefix in reserved:
+                    tree.remove(prefix)
+                raise
+            pool.pending.update(reserved)
+
+        try:
+            if confirm is not None:
+                confirm(reserved)
+        except Exception:
+            with pool.lock:
+                for prefix in reserved:
+                    with suppress(ValueError):  # A sync in the meantime may have replaced the tree
+                        pool.tree.remove(prefix)
+            raise
+        finally:
+            with pool.lock:
+                pool.pending.difference_update(reserved)
+        return reserved
+
+    def release(self, name: str, prefix: IPNetwork) -> None:
+        """Free a prefix locally, after it was removed from IPAM."""
+        pool = self._pool(name)
+        with pool.lock:
+            pool.tree.remove(prefix)
+
+
+def configured_pools() -> dict[str, IPNetwork]:
+    """Return the address pools of the external service settings by name."""
+    settings = external_service_settings
+    return {
+        "node_ipv4": ip_network(settings.NODE_IPV4_PREFIX),
+        "node_ipv6": ip_network(settings.NODE_IPV6_PREFIX),
+        "corelink_ipv4": ip_network(settings.CORELINK_IPV4_PREFIX),
+        "corelink_ipv6": ip_network(settings.CORELINK_IPV6_PREFIX),
+        "ptp_ipv4": ip_network(settings.PTP_IPV4_PREFIX),
+        "ptp_ipv6": ip_network(settings.PTP_IPV6_PREFIX),
+        "ip_peer_port_ipv4": ip_network(settings.IP_PEER_PORT_IPV4_ROOT_PREFIX),
+        "ip_peer_port_ipv6": ip_network(settings.IP_PEER_PORT_IPV6_ROOT_PREFIX),
+    }
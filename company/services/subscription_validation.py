@@ -0,0 +1,183 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Validate the whole subscription estate in bulk.
+
+The checks are the same as the ones the validate workflows run per subscription (see ``company.workflows.helpers``),
+but the columns they need are fetched for thousands of subscriptions at once with keyset paginated queries. Like the
+core validate schedule, only subscriptions that are in sync and have a status the validate workflows are usable on are
+validated. Checks that only need those columns (the status check) run in the calling process, the desired description
+needs the full domain model and is computed in batches by a pool of worker processes.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Iterable, Iterator, NamedTuple
+from uuid import UUID
+
+import structlog
+from sqlalchemy import select
+
+from orchestrator.db import ProductTable, SubscriptionTable, db, init_database
+from orchestrator.domain.base import SubscriptionModel
+from orchestrator.services.subscriptions import TARGET_DEFAULT_USABLE_MAP
+from orchestrator.settings import app_settings
+from orchestrator.targets import Target
+
+from company.products.services.subscription import subscription_description
+from company.workflows.helpers import description_error, status_is_active_error
+
+logger = structlog.get_logger(__name__)
+
+QUERY_BATCH_SIZE = 5000
+DESCRIPTION_BATCH_SIZE = 200
+
+
+class SubscriptionRow(NamedTuple):
+    subscription_id: UUID
+    description: str
+    status: str
+
+
+@dataclass(frozen=True)
+class ValidationFailure:
+    subscription_id: UUID
+    check: str
+    message: str
+
+
+@dataclass
+class ValidationReport:
+    checked: int = 0
+    failures: list[ValidationFailure] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+
+def subscription_rows(
+    product_tags: Iterable[str] = (), statuses: Iterable[str] | None = None, batch_size: int = QUERY_BATCH_SIZE
+) -> Iterator[list[SubscriptionRow]]:
+    """Yield the columns needed for validation of all in sync subscriptions with one of the given statuses.
+
+    Args:
+        product_tags: Only include subscriptions of products with one of these tags.
+        statuses: Only include subscriptions with one of these statuses, defaults to the statuses the validate (system)
+            workflows are usable on.
+        batch_size: Number of subscriptions per query.
+
+    """
+    if statuses is None:
+        statuses = TARGET_DEFAULT_USABLE_MAP[Target.SYSTEM]
+    stmt = (
+        select(SubscriptionTable.subscription_id, SubscriptionTable.description, SubscriptionTable.status)
+        .where(SubscriptionTable.insync.is_(True), SubscriptionTable.status.in_(list(statuses)))
+        .order_by(SubscriptionTable.subscription_id)
+        .limit(batch_size)
+    )
+    if tags := list(product_tags):
+        stmt = stmt.join(ProductTable, ProductTable.product_id == SubscriptionTable.product_id).where(
+            ProductTable.tag.in_(tags)
+        )
+
+    last_id = None
+    while True:
+        page_stmt = stmt if last_id is None else stmt.where(SubscriptionTable.subscription_id > last_id)
+        rows = [SubscriptionRow(*row) for row in db.session.execute(page_stmt)]
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].subscription_id
+
+
+def _init_worker() -> None:
+    init_database(app_settings)
+
+
+def desired_descriptions(subscription_ids: list[UUID]) -> tuple[dict[UUID, str], dict[UUID, str]]:
+    """Compute the desired description of each subscription.
+
+    Runs in a worker process. The description is derived from the domain model, so every subscription still needs
+    a model load, but a batch is handled in one task and one database session.
+
+    Returns: The desired descriptions and, for subscriptions that failed, the error that prevented it.
+
+    """
+    descriptions: dict[UUID, str] = {}
+    errors: dict[UUID, str] = {}
+    with db.database_scope():
+        for subscription_id in subscription_ids:
+            try:
+                subscription = SubscriptionModel.from_subscription(subscription_id)
+                descriptions[subscription_id] = subscription_description(subscription)
+            except Exception as ex:
+                errors[subscription_id] = repr(ex)
+    return descriptions, errors
+
+
+def validate_subscriptions(
+    product_tags: Iterable[str] = (),
+    max_workers: int | None = None,
+    description_batch_size: int = DESCRIPTION_BATCH_SIZE,
+) -> ValidationReport:
+    """Validate the status and description of all in sync subscriptions and return one report of the failures.
+
+    Args:
+        product_tags: Only validate subscriptions of products with one of these tags.
+        max_workers: Number of worker processes computing descriptions, defaults to the number of CPUs.
+        description_batch_size: Number of subscriptions per worker task.
+
+    Returns: The validation report.
+
+    """
+    start = perf_counter()
+    report = ValidationReport()
+    descriptions: dict[UUID, str] = {}
+    pending: dict[Future, list[UUID]] = {}
+
+    # Workers are spawned instead of forked so they do not inherit the database connections of this process
+    with ProcessPoolExecutor(max_workers, mp_context=get_context("spawn"), initializer=_init_worker) as executor:
+        for rows in subscription_rows(product_tags):
+            report.checked += len(rows)
+            for row in rows:
+                descriptions[row.subscription_id] = row.description
+                if error := status_is_active_error(row.status):
+                    report.failures.append(ValidationFailure(row.subscription_id, "status", error))
+
+            for offset in range(0, len(rows), description_batch_size):
+                batch = [row.subscription_id for row in rows[offset : offset + description_batch_size]]
+                pending[executor.submit(desired_descriptions, batch)] = batch
+
+        for future in as_completed(pending):
+            try:
+                desired, errors = future.result()
+            except Exception as ex:
+                desired, errors = {}, dict.fromkeys(pending[future], repr(ex))
+
+            for subscription_id, error in errors.items():
+                message = f"Could not determine the desired description: {error}"
+                report.failures.append(ValidationFailure(subscription_id, "description", message))
+            for subscription_id, desired_description in desired.items():
+                if error := description_error(descriptions[subscription_id], desired_description):
+                    report.failures.append(ValidationFailure(subscription_id, "description", error))
+
+    report.failures.sort(key=lambda failure: (str(failure.subscription_id), failure.check))
+    report.duration = perf_counter() - start
+    logger.info(
+        "Validated subscriptions", checked=report.checked, failures=len(report.failures), duration=report.duration
+    )
+    return report
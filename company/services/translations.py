@@ -0,0 +1,129 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Translation bundles that are built once and then served as is.
+
+A bundle is the core translations of a language with the company translations merged on top. It is serialised and
+gzipped when it is built, and identified by a hash of its content that is used as ETag. Bundles are built when the
+app starts and rebuilt when one of their source files changes.
+"""
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+import orjson
+import structlog
+
+import orchestrator
+from orchestrator.settings import app_settings
+
+logger = structlog.get_logger(__name__)
+
+CORE_TRANSLATIONS_DIR = Path(orchestrator.__file__).parent / "workflows" / "translations"
+
+
+@dataclass(frozen=True)
+class TranslationBundle:
+    language: str
+    body: bytes
+    gzipped: bytes
+    version: str
+    sources: tuple[tuple[Path, float], ...]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def _merge(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _translation_dirs() -> list[Path]:
+    company_dir = app_settings.TRANSLATIONS_DIR
+    if company_dir is None or Path(company_dir).resolve() == CORE_TRANSLATIONS_DIR.resolve():
+        return [CORE_TRANSLATIONS_DIR]
+    return [CORE_TRANSLATIONS_DIR, Path(company_dir)]
+
+
+def _source_files(language: str) -> tuple[tuple[Path, float], ...]:
+    """Return the existing translation files of a language with their modification time, core first."""
+    sources = []
+    for directory in _translation_dirs():
+        filename = directory / f"{language}.json"
+        try:
+            sources.append((filename, filename.stat().st_mtime))
+        except FileNotFoundError:
+            continue
+    return tuple(sources)
+
+
+def build_bundle(language: str) -> TranslationBundle:
+    sources = _source_files(language)
+    translations: dict[str, Any] = {}
+    for filename, _ in sources:
+        with filename.open() as translation_file:
+            data = json.load(translation_file)
+        if isinstance(data, dict):
+            translations = _merge(translations, data)
+
+    body = orjson.dumps(translations, option=orjson.OPT_SORT_KEYS)
+    return TranslationBundle(
+        language=language,
+        body=body,
+        gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+        version=hashlib.sha256(body).hexdigest()[:20],
+        sources=sources,
+    )
+
+
+class TranslationBundles:
+    """The bundle of each language, checked against the modification times of its files on every :meth:`get`."""
+
+    def __init__(self) -> None:
+        self._bundles: dict[str, TranslationBundle] = {}
+        self._lock = Lock()
+
+    def get(self, language: str) -> TranslationBundle:
+        bundle = self._bundles.get(language)
+        if bundle is not None and bundle.sources == _source_files(language):
+            return bundle
+
+        with self._lock:
+            bundle = self._bundles.get(language)
+            if bundle is None or bundle.sources != _source_files(language):
+                bundle = build_bundle(language)
+                if bundle.sources:  # Do not keep empty bundles of every language that is asked for
+                    self._bundles[language] = bundle
+                    logger.info("Built translation bundle", language=language, version=bundle.version)
+            return bundle
+
+    def preload(self) -> None:
+        """Build the bundles of all languages that have a translation file."""
+        languages = {filename.stem for directory in _translation_dirs() for filename in directory.glob("*.json")}
+        for language in sorted(languages):
+            self.get(language)
+
+
+translation_bundles = TranslationBundles()
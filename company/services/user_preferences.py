@@ -0,0 +1,273 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Read and write paths for user preferences.
+
+Preferences are written with a single ``INSERT ... ON CONFLICT (domain, user_name) DO UPDATE`` statement. This needs
+one round trip instead of the read-then-write of ``create_or_update`` and is safe under concurrent writes for the
+same primary key.
+
+Queries on the contents of the preferences use the ``jsonb_path_ops`` GIN index on the preferences column, which
+supports containment (``@>``) and jsonpath (``@?``) operators. Key existence is therefore expressed as a jsonpath
+query instead of the ``?`` operator, which that index does not support.
+
+Bulk export and import stream the table with ``COPY``, import goes through a temporary staging table that is merged
+with the same ``ON CONFLICT`` upsert in one statement.
+"""
+
+from typing import IO, Any, Callable, Iterable, Iterator
+
+import structlog
+from more_itertools import chunked
+from sqlalchemy import cast, select, text
+from sqlalchemy.dialects.postgresql import JSONPATH, Insert, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from orchestrator.db import db
+
+from company.db import UserPreferenceTable
+from company.schemas import UserPreferenceSchema
+
+logger = structlog.get_logger(__name__)
+
+UPSERT_BATCH_SIZE = 1000
+BULK_FORMATS = ("ndjson", "csv")
+
+_EXPORT_QUERY = "SELECT domain, user_name, preferences FROM user_preference ORDER BY domain, user_name"
+_EXPORT_STATEMENTS = {
+    # QUOTE and DELIMITER are control characters that can not occur in JSON text, so each line is the document as is.
+    # The default text format would escape the backslashes in it.
+    "ndjson": f"COPY (SELECT row_to_json(p) FROM ({_EXPORT_QUERY}) p) TO STDOUT "
+    "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+    "csv": f"COPY ({_EXPORT_QUERY}) TO STDOUT WITH (FORMAT csv, HEADER)",
+}
+_IMPORT_STATEMENTS = {
+    "ndjson": "COPY user_preference_import (doc) FROM STDIN WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+    "csv": "COPY user_preference_import (domain, user_name, preferences) FROM STDIN WITH (FORMAT csv, HEADER)",
+}
+_CREATE_STAGING_TABLE = """
+CREATE TEMPORARY TABLE user_preference_import (
+    position bigint GENERATED ALWAYS AS IDENTITY,
+    domain text,
+    user_name text,
+    preferences jsonb,
+    doc jsonb
+) ON COMMIT DROP
+"""
+# DISTINCT ON keeps the last occurrence of a duplicate key, PostgreSQL refuses to update a row twice in one statement
+_MERGE_STAGING_TABLE = """
+INSERT INTO user_preference (domain, user_name, preferences)
+SELECT DISTINCT ON (domain, user_name) domain::userpreferencedomain, user_name, preferences
+FROM (
+    SELECT
+        coalesce(domain, doc->>'domain') AS domain,
+        coalesce(user_name, doc->>'user_name') AS user_name,
+        coalesce(preferences, doc->'preferences') AS preferences,
+        position
+    FROM user_preference_import
+) AS staged
+ORDER BY domain, user_name, position DESC
+ON CONFLICT (domain, user_name) DO UPDATE SET preferences = excluded.preferences
+"""
+
+
+def _as_row(user_pref: UserPreferenceSchema) -> dict[str, Any]:
+    return {"user_name": user_pref.user_name, "domain": user_pref.domain, "preferences": user_pref.preferences}
+
+
+def _from_row(row: Row) -> UserPreferenceSchema:
+    return UserPreferenceSchema(user_name=row.user_name, domain=row.domain.name, preferences=row.preferences)
+
+
+def _key_path(key: str) -> str:
+    escaped = key.replace("\\", "\\\\").replace('"', '\\"')
+    return f'$."{escaped}"'
+
+
+def query_statement(
+    domain: str, contains: dict[str, Any] | None = None, has_keys: Iterable[str] = (), after: str | None = None
+) -> Select:
+    """Return a query for the preferences of a domain, filtered on their contents and ordered by user name.
+
+    Args:
+        domain: The preference domain.
+        contains: Only return preferences that contain this (partial) document, e.g. ``{"onboarding": True}``.
+        has_keys: Only return preferences that have all these top level keys.
+        after: Keyset pagination cursor, only return users that sort after this user name.
+
+    Returns: The select statement, without a limit.
+
+    """
+    stmt = select(UserPreferenceTable).where(UserPreferenceTable.domain == domain)
+    if contains:
+        stmt = stmt.where(UserPreferenceTable.preferences.contains(contains))
+    for key in has_keys:
+        stmt = stmt.where(UserPreferenceTable.preferences.op("@?", is_comparison=True)(cast(_key_path(key), JSONPATH)))
+    if after is not None:
+        stmt = stmt.where(UserPreferenceTable.user_name > after)
+    return stmt.order_by(UserPreferenceTable.user_name)
+
+
+def upsert_statement(rows: list[dict[str, Any]]) -> Insert:
+    """Return the upsert statement for one or more user preference rows.
+
+    Args:
+        rows: dicts with the ``user_name``, ``domain`` and ``preferences`` of each row.
+
+    Returns: An insert statement that updates the preferences of existing rows and returns all written rows.
+
+    """
+    stmt = insert(UserPreferenceTable).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserPreferenceTable.domain, UserPreferenceTable.user_name],
+        set_={"preferences": stmt.excluded.preferences},
+    ).returning(UserPreferenceTable.user_name, UserPreferenceTable.domain, UserPreferenceTable.preferences)
+
+
+def upsert_user_preference(user_pref: UserPreferenceSchema) -> UserPreferenceSchema:
+    """Insert or update the preferences of one user in a single statement.
+
+    Args:
+        user_pref: The preferences to store.
+
+    Returns: The stored preferences.
+
+    """
+    row = db.session.execute(upsert_statement([_as_row(user_pref)])).one()
+    db.session.commit()
+    return _from_row(row)
+
+
+async def async_upsert_user_preference(session: AsyncSession, user_pref: UserPreferenceSchema) -> UserPreferenceSchema:
+    """Async variant of :func:`upsert_user_preference` for endpoints that use an ``AsyncSession``.
+
+    Args:
+        session: The session to execute (and commit) the upsert in.
+        user_pref: The preferences to store.
+
+    Returns: The stored preferences.
+
+    """
+    row = (await session.execute(upsert_statement([_as_row(user_pref)]))).one()
+    await session.commit()
+    return _from_row(row)
+
+
+def upsert_user_preferences(user_prefs: Iterable[UserPreferenceSchema], batch_size: int = UPSERT_BATCH_SIZE) -> int:
+    """Insert or update the preferences of many users, one statement per batch.
+
+    Meant for imports: the iterable is consumed lazily so memory use is bounded by ``batch_size``. Each batch is
+    committed separately. PostgreSQL refuses to update the same row twice in one statement, so duplicate
+    ``(domain, user_name)`` pairs within a batch are collapsed and the last occurrence wins.
+
+    Args:
+        user_prefs: The preferences to store.
+        batch_size: Number of rows per statement.
+
+    Returns: The number of rows written.
+
+    """
+    written = 0
+    for batch in _deduplicated_batches(user_prefs, batch_size):
+        result = db.session.execute(upsert_statement(batch))
+        written += result.rowcount
+        db.session.commit()
+        logger.debug("Upserted user preferences batch", rows=len(batch), total=written)
+    return written
+
+
+def _deduplicated_batches(user_prefs: Iterable[UserPreferenceSchema], batch_size: int) -> Iterator[list[dict]]:
+    for chunk in chunked(user_prefs, batch_size):
+        rows = {(user_pref.domain, user_pref.user_name): _as_row(user_pref) for user_pref in chunk}
+        yield list(rows.values())
+
+
+class _ProgressFile:
+    """File wrapper that reports every chunk ``COPY`` reads or writes."""
+
+    def __init__(self, fileobj: IO[bytes], progress: Callable[[bytes], None]) -> None:
+        self._fileobj = fileobj
+        self._progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._progress(data)
+        return data
+
+    def readline(self, size: int = -1) -> bytes:
+        data = self._fileobj.readline(size)
+        self._progress(data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        self._progress(data)
+        return self._fileobj.write(data)
+
+
+def _noop(data: bytes) -> None:
+    pass
+
+
+def export_user_preferences(
+    fileobj: IO[bytes], file_format: str = "ndjson", progress: Callable[[bytes], None] = _noop
+) -> int:
+    """Stream all user preferences to a file with ``COPY``, ordered by domain and user name.
+
+    Args:
+        fileobj: Binary file to write to.
+        file_format: ``ndjson`` for one JSON document per line or ``csv`` for domain, user_name and preferences columns.
+        progress: Called with every chunk that is written.
+
+    Returns: The number of exported rows.
+
+    """
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(_EXPORT_STATEMENTS[file_format], _ProgressFile(fileobj, progress))
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def import_user_preferences(
+    fileobj: IO[bytes], file_format: str = "ndjson", progress: Callable[[bytes], None] = _noop
+) -> int:
+    """Insert or update user preferences from a file in the format of :func:`export_user_preferences`.
+
+    The file is copied into a temporary staging table and merged into ``user_preference`` with one upsert, all in
+    one transaction. When a key occurs more than once the last occurrence wins.
+
+    Args:
+        fileobj: Binary file to read from.
+        file_format: ``ndjson`` or ``csv``.
+        progress: Called with every chunk that is read.
+
+    Returns: The number of rows written.
+
+    """
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.execute(_CREATE_STAGING_TABLE)
+        cursor.copy_expert(_IMPORT_STATEMENTS[file_format], _ProgressFile(fileobj, progress))
+        staged = cursor.rowcount
+        written = db.session.execute(text(_MERGE_STAGING_TABLE)).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        cursor.close()
+    logger.info("Imported user preferences", staged=staged, written=written)
+    return written
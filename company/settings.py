@@ -20,6 +20,8 @@ def template_environment(loader: jinja2.BaseLoader) -> jinja2.Environment:
     """
     Return a safe jinja2 environment to render a template.
 
+    The environment is shared by all callers with an equal loader, so templates are only compiled once per process.
+
     Args:
         loader: A loader.
 
@@ -27,9 +29,9 @@ def template_environment(loader: jinja2.BaseLoader) -> jinja2.Environment:
         Jinja2 Environment
 
     """
-    return jinja2.Environment(
-        loader=loader, autoescape=True, lstrip_blocks=True, trim_blocks=True, undefined=jinja2.StrictUndefined
-    )
+    from company.utils.templates import get_environment
+
+    return get_environment(loader)
 
 
 class ExternalServiceSettings(BaseSettings):
@@ -67,4 +69,94 @@ class ExternalServiceSettings(BaseSettings):
     WIKI_PRODUCT_LINK: str = "https://wiki.surfnet.nl/display/SURFnetnetwerkWiki/In+gebruik+nemen+nieuwe+service"
 
 
+class DatabaseSettings(BaseSettings):
+    """Settings for the asyncpg backed engine used by the async company endpoints.
+
+    The pool is separate from the orchestrator-core (threadpool) engine, async handlers do not hold a worker thread
+    while they wait on the database so they can share a bigger pool.
+    """
+
+    ASYNC_DATABASE_POOL_SIZE: int = 20
+    ASYNC_DATABASE_MAX_OVERFLOW: int = 20
+    ASYNC_DATABASE_POOL_TIMEOUT: float = 30.0
+    ASYNC_DATABASE_POOL_RECYCLE: int = 1800
+
+
+class DryRunSettings(BaseSettings):
+    """Settings for running workflows against in-process simulators of NSO and the ApiClient based services.
+
+    Never enable DRY_RUN against a production database, processes and subscriptions are written as usual.
+    """
+
+    DRY_RUN: bool = False
+    DRY_RUN_LATENCY_MS: float = 20.0
+    DRY_RUN_LATENCY_JITTER_MS: float = 5.0
+    DRY_RUN_FAILURE_RATE: float = 0.0
+    DRY_RUN_SEED: int | None = None
+
+
+class ProfilerSettings(BaseSettings):
+    """Settings of the on-demand profiler endpoint, which is disabled unless PROFILER_ENABLED is set."""
+
+    PROFILER_ENABLED: bool = False
+    PROFILER_MAX_SECONDS: float = 60.0
+    PROFILER_MIN_INTERVAL: float = 0.001
+
+
+class TemplateSettings(BaseSettings):
+    """Settings of the jinja2 environments, TEMPLATE_BYTECODE_CACHE_DIR defaults to a directory in the temp dir."""
+
+    TEMPLATE_BYTECODE_CACHE: bool = True
+    TEMPLATE_BYTECODE_CACHE_DIR: str | None = None
+    TEMPLATE_SLOW_RENDER_SECONDS: float = 0.1
+
+
+class MailSettings(BaseSettings):
+    """Settings of the mail outbox dispatcher, the SMTP server itself is configured in the orchestrator settings."""
+
+    MAIL_SENDER: str = "noreply@automation.surf.net"
+    MAIL_DISPATCH_INTERVAL_SECONDS: int = 10
+    MAIL_BATCH_SIZE: int = 100
+    MAIL_CONNECTIONS: int = 4
+    MAIL_CONNECTION_IDLE_SECONDS: float = 60.0
+    MAIL_SMTP_TIMEOUT_SECONDS: float = 30.0
+    MAIL_MAX_ATTEMPTS: int = 8
+    MAIL_RETRY_BACKOFF_SECONDS: float = 30.0
+    MAIL_RETRY_BACKOFF_MAX_SECONDS: float = 3600.0
+    MAIL_CLAIM_TIMEOUT_SECONDS: float = 300.0
+
+
+class DnsSettings(BaseSettings):
+    """Settings of the DNS checks, the system resolver configuration is used when DNS_NAMESERVERS is empty."""
+
+    DNS_NAMESERVERS: list[str] = []
+    DNS_PORT: int = 53
+    DNS_TIMEOUT_SECONDS: float = 2.0
+    DNS_LIFETIME_SECONDS: float = 5.0
+    DNS_CONCURRENCY: int = 50
+    DNS_MAX_CACHE_SECONDS: float = 300.0
+    DNS_NEGATIVE_CACHE_SECONDS: float = 30.0
+    DNS_CACHE_SIZE: int = 10000
+
+
+class TranslationSettings(BaseSettings):
+    """Settings of the translation bundles, clients revalidate a bundle with its ETag after TRANSLATIONS_MAX_AGE."""
+
+    TRANSLATIONS_MAX_AGE: int = 300
+
+
+class AdminSettings(BaseSettings):
+    """Settings of the admin endpoints, only users with one of the ADMIN_ROLES can use them when OAuth2 is active."""
+
+    ADMIN_ROLES: list[str] = ["admin"]
+
+
 external_service_settings = ExternalServiceSettings()
+database_settings = DatabaseSettings()
+dry_run_settings = DryRunSettings()
+profiler_settings = ProfilerSettings()
+template_settings = TemplateSettings()
+mail_settings = MailSettings()
+dns_settings = DnsSettings()
+translation_settings = TranslationSettings()
+admin_settings = AdminSettings()
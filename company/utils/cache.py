@@ -0,0 +1,92 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provides a small in-process cache for values that are expensive to build and may go stale."""
+
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after they were set.
+
+    Args:
+        ttl: Time to live of an entry in seconds.
+        maxsize: Maximum number of entries, the least recently used entry is evicted first.
+
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        with self._lock:
+            self._data[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: K, factory: Callable[[], V]) -> V:
+        """Return the cached value for `key`, calling `factory` to create it when it is missing or expired.
+
+        The lock is held while `factory` runs so concurrent callers do not build the same value twice.
+        """
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                value = factory()
+                self.set(key, value)
+            return value
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[1] if item else None
+
+    def evict(self, predicate: Callable[[K], bool]) -> int:
+        """Remove all entries whose key matches `predicate` and return how many were removed."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
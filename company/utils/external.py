@@ -11,33 +11,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Provides utility functions to (more) conveniently talk to external systems."""
+"""Provides utility functions to (more) conveniently talk to external systems.
+
+The API client packages and pynso are only imported when a client is first used, so processes that never talk to an
+external system (CLI commands, most tests) do not pay for them.
+"""
 import contextlib
 from http import HTTPStatus
-from typing import Any, Generator, Union
+from typing import TYPE_CHECKING, Any, Generator, Union
 from uuid import UUID
 
 import requests
 import structlog
 from opentelemetry import context  # type: ignore
-from opentelemetry.instrumentation.utils import http_status_to_status_code
-from opentelemetry.instrumentation.version import __version__
 from opentelemetry.propagate import inject  # type: ignore
-from opentelemetry.trace import Span, SpanKind, get_tracer  # type: ignore
-from opentelemetry.trace.status import Status
-from pynso import NSOClient
-
-import crm_client
-import ims_client
-import ipam_client
-import jira_client
+from opentelemetry.trace import Span, SpanKind, Tracer, get_tracer  # type: ignore
+
 from nwastdlib.url import URL
 from orchestrator.api.error_handling import raise_status
 from orchestrator.settings import app_settings, oauth2_settings
 from orchestrator.types import UUIDstr
 from orchestrator.utils.errors import is_api_exception
 
-from company.settings import external_service_settings
+from company.settings import dry_run_settings, external_service_settings
+from company.utils.instrumentation import count_external_call
+from company.utils.lazy import LazySingleton
+from company.utils.simulation import simulate_api_call
+
+if TYPE_CHECKING:
+    import crm_client
+    from pynso import NSOClient
 
 logger = structlog.get_logger(__name__)
 
@@ -86,13 +89,16 @@ class AuthMixin:
 
     """
 
-    configuration: crm_client.Configuration
+    configuration: "crm_client.Configuration"
 
     @staticmethod
     def _apply_response(span: Span, response: Any) -> None:
         if not span.is_recording():
             return
 
+        from opentelemetry.instrumentation.utils import http_status_to_status_code
+        from opentelemetry.trace.status import Status
+
         if is_api_exception(response) and response.status:
             span.set_attribute("http.status_code", response.status)
             span.set_attribute("http.status_text", response.reason)
@@ -141,18 +147,21 @@ class AuthMixin:
     def call_api(  # type:ignore
         self, resource_path, method, path_params=None, query_params=None, header_params=None, *args, **kwargs
     ):
-        span_attributes = {
-            "http.method": method,
-            "http.url": resource_path,
-        }
-
         header_params = header_params if header_params is not None else {}
+        count_external_call()
+        if dry_run_settings.DRY_RUN:
+            return simulate_api_call(self.__class__.__name__, resource_path, method, path_params, query_params)
+
         # Check credentials
         self.acquire_token()
 
-        with get_tracer(__name__, __version__).start_as_current_span(
-            f"External Api Call {self.__class__.__name__}", kind=SpanKind.CLIENT, attributes=span_attributes
+        with _tracer.get().start_as_current_span(
+            f"External Api Call {self.__class__.__name__}", kind=SpanKind.CLIENT
         ) as span:
+            # Most calls are not sampled, only spend time on attributes for the ones that are
+            if span.is_recording():
+                span.set_attribute("http.method", method)
+                span.set_attribute("http.url", resource_path)
             if app_settings.TRACING_ENABLED and not _is_instrumentation_suppressed():
                 inject(type(header_params).__setitem__, header_params)
             try:
@@ -178,12 +187,41 @@ class AuthMixin:
                     raise
 
 
-nso_api_client = NSOClient(
-    external_service_settings.NSO_HOST,
-    username=external_service_settings.NSO_USER,
-    password=external_service_settings.NSO_PASS,
-    port=external_service_settings.NSO_PORT,
-    ssl=True,
-    verify_ssl=external_service_settings.NSO_SSL_VERIFY,
-)
+def _create_tracer() -> Tracer:
+    from opentelemetry.instrumentation.version import __version__
+
+    return get_tracer(__name__, __version__)
+
+
+def _create_nso_client() -> "NSOClient":
+    from pynso import NSOClient
+
+    return NSOClient(
+        external_service_settings.NSO_HOST,
+        username=external_service_settings.NSO_USER,
+        password=external_service_settings.NSO_PASS,
+        port=external_service_settings.NSO_PORT,
+        ssl=True,
+        verify_ssl=external_service_settings.NSO_SSL_VERIFY,
+    )
+
+
+_tracer: LazySingleton[Tracer] = LazySingleton(_create_tracer)
+_nso_client: LazySingleton["NSOClient"] = LazySingleton(_create_nso_client)
+
+
+def get_nso_client() -> "NSOClient":
+    """Return the NSO client of this process, it is created on first use."""
+    return _nso_client.get()
+
+
+def reset_clients() -> None:
+    """Drop the clients of this process so they are recreated on next use, e.g. after a fork."""
+    _nso_client.reset()
+
 
+def __getattr__(name: str) -> Any:
+    # Backwards compatibility for `from company.utils.external import nso_api_client`
+    if name == "nso_api_client":
+        return get_nso_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
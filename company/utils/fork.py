@@ -0,0 +1,44 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Make a process that was forked from an initialised parent (gunicorn ``--preload``) safe to serve requests.
+
+A forked child shares the sockets of everything the parent opened. Database and Redis connections can not be used by
+two processes, so the child forgets the pools and clients it inherited and recreates them on first use. The
+inherited connections are not closed: that would also close them for the parent and the other workers.
+"""
+
+import aiocache
+import structlog
+
+from orchestrator.db import db
+
+from company.db.database import async_db
+from company.utils.external import reset_clients
+
+logger = structlog.get_logger(__name__)
+
+
+def reinitialise_after_fork() -> None:
+    """Replace inherited connection pools and clients, call this first thing in a forked child."""
+    # Engine.dispose() would close the parent's connections, a fresh pool leaves them alone
+    engine = db.wrapped_database.engine
+    engine.pool = engine.pool.recreate()
+
+    async_db.reset()
+
+    # Drops the cache instances (and their Redis pools), they are recreated from the same config on next use
+    aiocache.caches.set_config(aiocache.caches.get_config())
+
+    reset_clients()
+    logger.debug("Reinitialised connections after fork")
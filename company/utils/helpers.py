@@ -11,13 +11,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from itertools import groupby
-from typing import Any, cast
+from typing import Any
 from uuid import UUID
 
 from structlog import get_logger
 
 from orchestrator.forms.network_type_validators import BFD
 
+from company.utils.summary import Formatter, SummaryColumn, comma_separated, format_value
 
 logger = get_logger(__name__)
 
@@ -30,7 +31,24 @@ def array_to_comma_separated_string(list: list[str | int | bool | float]) -> str
 
     Returns: Comma with space separated string (", ").
     """
-    return ", ".join(str(c) for c in list)
+    return comma_separated(list)
+
+
+def _format_bfd_setting(setting: str) -> Formatter:
+    def format_setting(bfd: BFD | None) -> str:
+        if bfd is None:
+            return ""
+        return format_value(getattr(bfd, setting)) if bfd.enabled else "N/A"
+
+    return format_setting
+
+
+# Summary columns of products with BFD, for use with `company.utils.summary.SummaryEngine`
+BFD_SUMMARY_COLUMNS = (
+    SummaryColumn("BFD", "bfd", lambda bfd: "" if bfd is None else str(bfd.enabled)),
+    SummaryColumn("BFD minimum interval", "bfd", _format_bfd_setting("minimum_interval")),
+    SummaryColumn("BFD multiplier", "bfd", _format_bfd_setting("multiplier")),
+)
 
 
 def create_bfd_summary_data(subscription: dict) -> list[str]:
@@ -41,15 +59,9 @@ def create_bfd_summary_data(subscription: dict) -> list[str]:
 
     Returns: Empty list or list with 3 strings.
     """
-    data = []
-    if "bfd" in subscription:
-        bfd = cast(BFD, subscription["bfd"])
-        data = [
-            str(bfd.enabled),
-            str(bfd.minimum_interval) if bfd.enabled else "N/A",
-            str(bfd.multiplier) if bfd.enabled else "N/A",
-        ]
-    return data
+    if (bfd := subscription.get("bfd")) is None:
+        return []
+    return [column.formatter(bfd) for column in BFD_SUMMARY_COLUMNS]
 
 
 def get_organisation_name(id: UUID) -> str:
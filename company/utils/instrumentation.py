@@ -0,0 +1,79 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cheap counters for measuring what a unit of work (e.g. a workflow step) spends its time on.
+
+Counting is only active inside :func:`measure`, outside of it the hooks are a single ``ContextVar`` lookup. Threads
+started with a copy of the context (like the branches of a parallel step group) count towards the same measurement.
+"""
+
+import contextlib
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter, thread_time
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class Measurement:
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    db_queries: int = 0
+    external_calls: int = 0
+    _lock: Lock = field(default_factory=Lock, repr=False, compare=False)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+_current_measurement: ContextVar[Measurement | None] = ContextVar("current_measurement", default=None)
+
+
+@contextlib.contextmanager
+def measure() -> Iterator[Measurement]:
+    """Measure wall time, CPU time, database queries and external calls of the enclosed code.
+
+    CPU time is that of the calling thread only, work done in other threads is not included.
+
+    Example::
+
+        with measure() as measurement:
+            do_work()
+        logger.info("Work done", duration=measurement.wall_time, queries=measurement.db_queries)
+    """
+    measurement = Measurement()
+    token = _current_measurement.set(measurement)
+    wall_start, cpu_start = perf_counter(), thread_time()
+    try:
+        yield measurement
+    finally:
+        measurement.wall_time = perf_counter() - wall_start
+        measurement.cpu_time = thread_time() - cpu_start
+        _current_measurement.reset(token)
+
+
+def count_external_call() -> None:
+    """Register a call to an external system (NSO, CRM, IPAM, ...) with the running measurement, if any."""
+    if measurement := _current_measurement.get():
+        measurement.increment("external_calls")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_db_query(*args: Any, **kwargs: Any) -> None:
+    if measurement := _current_measurement.get():
+        measurement.increment("db_queries")
@@ -0,0 +1,56 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provides thread-safe singletons that are only created on first use."""
+
+from threading import Lock
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazySingleton(Generic[T]):
+    """Holds the value returned by `factory`, calling it once on the first :meth:`get`.
+
+    Use this for clients and other objects that are expensive to import or build and are not needed by every process
+    that imports the module defining them (CLI commands, workers that never call the external system).
+
+    Example::
+
+        _client: LazySingleton[FubarClient] = LazySingleton(lambda: FubarClient(settings.FUBAR_URI))
+
+        def get_client() -> FubarClient:
+            return _client.get()
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._value: T | None = None
+        self._lock = Lock()
+
+    @property
+    def initialised(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if (value := self._value) is not None:
+            return value
+        with self._lock:
+            if self._value is None:
+                self._value = self._factory()
+            return self._value
+
+    def reset(self) -> None:
+        """Drop the value so the next :meth:`get` creates a new one, e.g. in a forked worker process."""
+        with self._lock:
+            self._value = None
@@ -0,0 +1,124 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Statistical profiler for a running process.
+
+A background thread periodically takes the stacks of all other threads (``sys._current_frames``) and counts them.
+Nothing is hooked into the profiled code, so the overhead is one stack walk per thread per interval. The result is
+in the collapsed stack format of flamegraph.pl and speedscope: one line per distinct stack, frames separated by
+``;`` from the thread down to the innermost function, followed by the number of samples.
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from time import perf_counter
+from types import CodeType, FrameType
+
+ROOT_PATHS = tuple(sorted({os.path.dirname(os.path.dirname(os.__file__)), os.getcwd()}, key=len, reverse=True))
+
+
+@dataclass
+class Allocation:
+    location: str
+    size: int
+    count: int
+
+
+@dataclass
+class Profile:
+    duration: float
+    samples: int
+    stacks: Counter = field(default_factory=Counter)
+    allocations: list[Allocation] | None = None
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _short_path(filename: str) -> str:
+    for root in ROOT_PATHS:
+        if filename.startswith(root):
+            return filename[len(root) :].lstrip(os.sep)
+    return filename
+
+
+class SamplingProfiler:
+    """Sample the stacks of all threads of this process every `interval` seconds until :meth:`stop` is called.
+
+    Args:
+        interval: Seconds between samples.
+        allocation_frames: When set, trace memory allocations with this many frames per allocation site. Unlike the
+            stack sampling this slows down every allocation, use it for short periods only.
+
+    """
+
+    def __init__(self, interval: float = 0.01, allocation_frames: int | None = None) -> None:
+        self.interval = interval
+        self.allocation_frames = allocation_frames
+        self._labels: dict[CodeType, str] = {}
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._started_tracemalloc = False
+        self._start = 0.0
+
+    def _label(self, code: CodeType) -> str:
+        if (label := self._labels.get(code)) is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self) -> None:
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            current: FrameType | None = frame
+            while current is not None:
+                labels.append(self._label(current.f_code))
+                current = current.f_back
+            labels.append(names.get(ident, str(ident)))
+            self._stacks[";".join(reversed(labels))] += 1
+        self._samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        if self.allocation_frames and not tracemalloc.is_tracing():
+            tracemalloc.start(self.allocation_frames)
+            self._started_tracemalloc = True
+        self._start = perf_counter()
+        self._thread.start()
+
+    def stop(self, top_allocations: int = 25) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        profile = Profile(perf_counter() - self._start, self._samples, self._stacks)
+
+        if self.allocation_frames and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            profile.allocations = [
+                Allocation(str(stat.traceback[0]), stat.size, stat.count)
+                for stat in snapshot.statistics("lineno")[:top_allocations]
+            ]
+        return profile
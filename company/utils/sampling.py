@@ -0,0 +1,189 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Trace sampling that adapts the rate per route and per API client.
+
+Traces are sampled when their root span starts, child spans follow that decision. The root span name is the route
+template for requests (``/api/subscriptions/{subscription_id}``) and ``External Api Call <client>`` for calls made
+outside of a request, e.g. by workflows. Per name the sampler starts from a configured base rate and:
+
+* raises it (``boost``) while the recently sampled traces are slow or failing, so problems are well covered;
+* lowers it for hot names so that about ``target_per_second`` traces per second are sampled.
+
+Latency and errors are only known for spans that were sampled, the minimum rate keeps some of those coming in.
+"""
+
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from threading import Lock
+from time import monotonic
+from typing import Any, Mapping, Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.sampling import Decision, ParentBased, Sampler, SamplingResult
+from opentelemetry.trace import Link, SpanKind, StatusCode
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+TRACE_ID_LIMIT = (1 << 64) - 1
+MAX_NAMES = 1000
+OTHER = "other"
+
+
+@dataclass
+class _NameStats:
+    base_rate: float
+    rate: float
+    latency: float = 0.0
+    error_rate: float = 0.0
+    requests_per_second: float = 0.0
+    window_start: float = 0.0
+    window_requests: int = 0
+
+
+class AdaptiveSampler(Sampler):
+    """Sample root spans with a rate per span name that adapts to its latency, errors and traffic.
+
+    Args:
+        default_rate: Base rate of names that do not match any of `rates`.
+        rates: Base rates by span name pattern (``fnmatch`` style), the first matching pattern wins.
+        min_rate: Lower bound of the adapted rate.
+        max_rate: Upper bound of the adapted rate.
+        slow_threshold: Traces slower than this (seconds, moving average) get a boosted rate.
+        error_threshold: Names with a higher moving average error rate get a boosted rate.
+        boost: Factor applied to the base rate of slow or failing names.
+        target_per_second: Sample about this many traces per second per name at most, unless boosted.
+        smoothing: Weight of a new observation in the exponential moving averages.
+        window: Seconds over which the request rate is measured, the rate is recomputed after each window.
+
+    """
+
+    def __init__(
+        self,
+        default_rate: float,
+        rates: Mapping[str, float] | None = None,
+        min_rate: float = 0.001,
+        max_rate: float = 1.0,
+        slow_threshold: float = 1.0,
+        error_threshold: float = 0.05,
+        boost: float = 10.0,
+        target_per_second: float = 1.0,
+        smoothing: float = 0.1,
+        window: float = 10.0,
+    ) -> None:
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.slow_threshold = slow_threshold
+        self.error_threshold = error_threshold
+        self.boost = boost
+        self.target_per_second = target_per_second
+        self.smoothing = smoothing
+        self.window = window
+        self._stats: dict[str, _NameStats] = {}
+        self._lock = Lock()
+
+    def _base_rate(self, name: str) -> float:
+        return next((rate for pattern, rate in self.rates.items() if fnmatchcase(name, pattern)), self.default_rate)
+
+    def _get_stats(self, name: str) -> _NameStats:
+        if (stats := self._stats.get(name)) is not None:
+            return stats
+        with self._lock:
+            if len(self._stats) >= MAX_NAMES:
+                # Unmatched paths make for unbounded names, do not keep stats for all of them
+                name = OTHER
+            if (stats := self._stats.get(name)) is None:
+                base_rate = self._base_rate(name)
+                stats = self._stats[name] = _NameStats(base_rate, base_rate, window_start=monotonic())
+            return stats
+
+    def _adapt(self, stats: _NameStats) -> None:
+        if stats.base_rate <= 0:
+            return  # Explicitly disabled
+
+        rate = stats.base_rate
+        if stats.latency > self.slow_threshold or stats.error_rate > self.error_threshold:
+            rate *= self.boost
+        elif stats.requests_per_second * rate > self.target_per_second:
+            rate = self.target_per_second / stats.requests_per_second
+        stats.rate = min(max(rate, self.min_rate), self.max_rate)
+
+    def rate(self, name: str) -> float:
+        """Return the current sample rate of a span name."""
+        return self._get_stats(name).rate
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: SpanKind = None,
+        attributes: Attributes = None,
+        links: Sequence[Link] = None,
+        trace_state: TraceState = None,
+    ) -> SamplingResult:
+        stats = self._get_stats(name)
+        # Unlocked increment: a lost update only makes the request rate estimate slightly low
+        stats.window_requests += 1
+        if (now := monotonic()) - stats.window_start >= self.window:
+            with self._lock:
+                elapsed = now - stats.window_start
+                if elapsed >= self.window:
+                    stats.requests_per_second = stats.window_requests / elapsed
+                    stats.window_requests = 0
+                    stats.window_start = now
+                    self._adapt(stats)
+
+        if trace_id & TRACE_ID_LIMIT < stats.rate * TRACE_ID_LIMIT:
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, trace_state)
+        return SamplingResult(Decision.DROP, None, trace_state)
+
+    def record(self, name: str, duration: float, error: bool) -> None:
+        """Feed the outcome of a sampled trace back into the rate of its name."""
+        stats = self._get_stats(name)
+        with self._lock:
+            stats.latency += self.smoothing * (duration - stats.latency)
+            stats.error_rate += self.smoothing * (float(error) - stats.error_rate)
+            self._adapt(stats)
+
+    def get_description(self) -> str:
+        return f"AdaptiveSampler{{default_rate={self.default_rate}}}"
+
+
+class AdaptiveSamplingProcessor(SpanProcessor):
+    """Reports the duration and status of finished (sampled) root spans to an :class:`AdaptiveSampler`."""
+
+    def __init__(self, sampler: AdaptiveSampler) -> None:
+        self.sampler = sampler
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.parent is not None and not span.parent.is_remote:
+            return
+        if span.start_time is None or span.end_time is None:
+            return
+
+        status_code: Any = (span.attributes or {}).get("http.status_code", 0)
+        error = span.status.status_code is StatusCode.ERROR or (isinstance(status_code, int) and status_code >= 500)
+        self.sampler.record(span.name, (span.end_time - span.start_time) / 1e9, error)
+
+
+def configure_adaptive_sampling(tracer_provider: TracerProvider, sampler: AdaptiveSampler) -> None:
+    """Use `sampler` for root spans of `tracer_provider`, call this before any tracer is created from it."""
+    tracer_provider.sampler = ParentBased(root=sampler)
+    tracer_provider.add_span_processor(AdaptiveSamplingProcessor(sampler))
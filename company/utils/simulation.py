@@ -0,0 +1,121 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-process simulators of the external systems, used when ``DRY_RUN`` is enabled.
+
+The simulators only mimic the timing and failure behaviour of the real systems (see ``DryRunSettings``), they do
+not validate payloads. NSO keeps what is written to it in memory so that reads after writes behave as expected,
+ApiClient calls return whatever was registered with :func:`register_response` for the operation, or None.
+"""
+
+import random
+import re
+from copy import deepcopy
+from http import HTTPStatus
+from threading import Lock
+from time import sleep
+from typing import Any, Sequence
+
+import structlog
+
+from orchestrator.utils.errors import ApiException
+from orchestrator.utils.json import json_loads
+
+from company.settings import dry_run_settings
+
+logger = structlog.get_logger(__name__)
+
+_random = random.Random(dry_run_settings.DRY_RUN_SEED)
+_random_lock = Lock()
+
+
+def simulate_latency_and_failure(system: str) -> None:
+    """Sleep for the configured latency and raise an ApiException for the configured fraction of calls."""
+    with _random_lock:
+        latency = _random.gauss(dry_run_settings.DRY_RUN_LATENCY_MS, dry_run_settings.DRY_RUN_LATENCY_JITTER_MS)
+        fail = _random.random() < dry_run_settings.DRY_RUN_FAILURE_RATE
+    sleep(max(latency, 0) / 1000)
+    if fail:
+        logger.debug("Simulated failure", system=system)
+        raise ApiException(status=HTTPStatus.SERVICE_UNAVAILABLE, reason=f"Simulated {system} failure")
+
+
+class SimulatedNSOClient:
+    """Stand-in for ``pynso.NSOClient`` with an in-memory datastore keyed by data path."""
+
+    def __init__(self) -> None:
+        self._data: dict[tuple[str, ...], Any] = {}
+        self._lock = Lock()
+
+    def create_data_value(self, data_path: Sequence[str], data: str) -> bool:
+        simulate_latency_and_failure("NSO")
+        with self._lock:
+            self._data[tuple(data_path)] = json_loads(data)
+        return True
+
+    def set_data_value(self, data_path: Sequence[str], data: str) -> bool:
+        return self.create_data_value(data_path, data)
+
+    def get_data(self, data_path: Sequence[str], datastore: Any = None, params: dict | None = None) -> Any:
+        simulate_latency_and_failure("NSO")
+        path = tuple(data_path)
+        with self._lock:
+            if path in self._data:
+                return deepcopy(self._data[path])
+            children = {key[len(path)]: value for key, value in self._data.items() if key[: len(path)] == path}
+        return deepcopy(children) if children else {}
+
+    def delete_path(self, data_path: Sequence[str]) -> bool:
+        simulate_latency_and_failure("NSO")
+        path = tuple(data_path)
+        with self._lock:
+            for key in [key for key in self._data if key[: len(path)] == path]:
+                del self._data[key]
+        return True
+
+    def call_operation(self, data_path: Sequence[str], data: dict | None = None) -> Any:
+        simulate_latency_and_failure("NSO")
+        if data_path and data_path[-1] == "check-sync":
+            return {"result": "in-sync"}
+        return {"result": "ok"}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+simulated_nso_client = SimulatedNSOClient()
+
+_responses: list[tuple[str, str, re.Pattern, Any]] = []
+
+
+def register_response(client: str, method: str, resource_path: str, response: Any) -> None:
+    """Register the response a simulated ApiClient call returns.
+
+    Args:
+        client: Class name of the ApiClient, e.g. ``CrmApiClient``.
+        method: HTTP method of the call.
+        resource_path: Regular expression matched against the (unformatted) resource path of the call.
+        response: Value to return, a callable is called with the path and query params to produce it.
+
+    """
+    _responses.append((client, method.upper(), re.compile(resource_path), response))
+
+
+def simulate_api_call(client: str, resource_path: str, method: str, path_params: Any, query_params: Any) -> Any:
+    """Stand-in for ``ApiClient.call_api`` of the swagger generated clients."""
+    simulate_latency_and_failure(client)
+    for registered_client, registered_method, pattern, response in reversed(_responses):
+        if registered_client == client and registered_method == method.upper() and pattern.fullmatch(resource_path):
+            return response(path_params, query_params) if callable(response) else deepcopy(response)
+    return None
@@ -0,0 +1,150 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Render the summary of many subscriptions at once.
+
+The summary columns of each product are registered once with :meth:`SummaryEngine.register`, which compiles them
+into a getter and a formatter per column. :meth:`SummaryEngine.render` then renders a whole batch in one pass and
+returns one :class:`SummaryTable` per product, with the values stored per column.
+
+Example::
+
+    summaries = SummaryEngine()
+    summaries.register("Node", [SummaryColumn("Name", "node.node_name"), SummaryColumn("IPv4", "node.ipv4_loopback")])
+
+    tables = summaries.render(subscription.dict() for subscription in subscriptions)
+    summary_data = {tag: table.as_summary_data() for tag, table in tables.items()}
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence
+from uuid import UUID
+
+from orchestrator.types import SummaryData
+
+Formatter = Callable[[Any], str]
+Getter = Callable[[Any], Any]
+
+
+def comma_separated(values: Iterable[Any]) -> str:
+    return ", ".join(str(value) for value in values)
+
+
+def format_value(value: Any) -> str:
+    """Format a value for a summary: nothing for None, comma separated for lists and `str()` for the rest."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return comma_separated(value)
+    return str(value)
+
+
+@dataclass(frozen=True)
+class SummaryColumn:
+    """A summary column: `label`, the dotted `path` of the value in the subscription and its `formatter`.
+
+    Path parts are looked up as keys in mappings and as attributes in other objects. A missing value is None.
+    """
+
+    label: str
+    path: str
+    formatter: Formatter = format_value
+
+
+def _getter(path: str) -> Getter:
+    parts = path.split(".")
+
+    def get(value: Any) -> Any:
+        for part in parts:
+            if value is None:
+                return None
+            value = value.get(part) if isinstance(value, Mapping) else getattr(value, part, None)
+        return value
+
+    return get
+
+
+@dataclass
+class SummaryTable:
+    """Summaries of subscriptions of one product, one list of values per column."""
+
+    labels: list[str]
+    subscription_ids: list[str] = field(default_factory=list)
+    columns: list[list[str]] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        if not self.columns:
+            self.columns = [[] for _ in self.labels]
+
+    def __len__(self) -> int:
+        return len(self.subscription_ids)
+
+    def rows(self) -> Iterator[list[str]]:
+        """Yield the summary of each subscription as a list, starting with its subscription id."""
+        return (list(row) for row in zip(self.subscription_ids, *self.columns))
+
+    def as_summary_data(self) -> SummaryData:
+        """Return the table in the format of the summary form field, one column per subscription."""
+        return {
+            "labels": self.labels,
+            "headers": self.subscription_ids,
+            "columns": [list(values) for values in zip(*self.columns)],
+        }
+
+
+class SummaryEngine:
+    def __init__(self, product_path: str = "product.tag", subscription_id_path: str = "subscription_id") -> None:
+        self._product = _getter(product_path)
+        self._subscription_id = _getter(subscription_id_path)
+        self._products: dict[str, tuple[list[str], list[tuple[Getter, Formatter]]]] = {}
+
+    def register(self, product: str, columns: Sequence[SummaryColumn]) -> None:
+        """Register the summary columns of a product, identified by the value at `product_path`."""
+        self._products[product] = (
+            [column.label for column in columns],
+            [(_getter(column.path), column.formatter) for column in columns],
+        )
+
+    def render(self, subscriptions: Iterable[Any]) -> dict[str, SummaryTable]:
+        """Render the summaries of a batch of subscriptions, skipping products without registered columns.
+
+        Args:
+            subscriptions: Subscriptions as (nested) dicts or domain models.
+
+        Returns: A summary table per product, in order of first appearance.
+
+        """
+        tables: dict[str, SummaryTable] = {}
+        appenders: dict[str, tuple[Callable[[Any], None], list[tuple[Callable[[Any], None], Getter, Formatter]]]] = {}
+        subscription_id = self._subscription_id
+
+        for subscription in subscriptions:
+            product = self._product(subscription)
+            if (appender := appenders.get(product)) is None:
+                if product not in self._products:
+                    continue
+                labels, compiled = self._products[product]
+                table = tables[product] = SummaryTable(list(labels))
+                appender = appenders[product] = (
+                    table.subscription_ids.append,
+                    [(values.append, get, formatter) for values, (get, formatter) in zip(table.columns, compiled)],
+                )
+
+            append_id, columns = appender
+            identifier = subscription_id(subscription)
+            append_id(str(identifier) if isinstance(identifier, UUID) else identifier)
+            for append, get, formatter in columns:
+                append(formatter(get(subscription)))
+        return tables
@@ -0,0 +1,153 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process wide registry of jinja2 environments.
+
+A jinja2 environment keeps the templates it compiled, so every new environment compiles its templates again. The
+registry hands out one environment per loader, all environments share a bytecode cache on disk so that workers and
+restarts skip the compilation too. Modules create their environment at import time; :func:`precompile_templates`,
+which runs when the company code is loaded, then compiles all templates of the registered environments.
+"""
+
+import os
+from collections.abc import Hashable
+from dataclasses import dataclass
+from threading import Lock
+from time import perf_counter
+from typing import Any
+
+import jinja2
+import structlog
+
+from company.settings import template_settings
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass
+class RenderStats:
+    renders: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+_render_stats: dict[str, RenderStats] = {}
+_render_stats_lock = Lock()
+
+
+def _record_render(name: str, duration: float) -> None:
+    with _render_stats_lock:
+        if (stats := _render_stats.get(name)) is None:
+            stats = _render_stats[name] = RenderStats()
+        stats.renders += 1
+        stats.total_time += duration
+        stats.max_time = max(stats.max_time, duration)
+
+    if duration > template_settings.TEMPLATE_SLOW_RENDER_SECONDS:
+        logger.warning("Slow template render", template=name, duration=duration)
+
+
+def render_stats() -> dict[str, RenderStats]:
+    """Return a copy of the render timings of this process by template name."""
+    with _render_stats_lock:
+        return {name: RenderStats(**vars(stats)) for name, stats in _render_stats.items()}
+
+
+class TimedTemplate(jinja2.Template):
+    """Template that records how long each render takes, see :func:`render_stats`."""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        start = perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            _record_render(self.name or "<string>", perf_counter() - start)
+
+
+def _loader_key(loader: jinja2.BaseLoader) -> Hashable:
+    """Return a key that is equal for loaders that load the same templates."""
+    if isinstance(loader, jinja2.FileSystemLoader):
+        return "filesystem", tuple(loader.searchpath), loader.encoding, loader.followlinks
+    if isinstance(loader, jinja2.PackageLoader):
+        return "package", loader.package_name, loader.package_path
+    if isinstance(loader, jinja2.DictLoader):
+        return "dict", tuple(sorted(loader.mapping.items()))
+    if isinstance(loader, jinja2.PrefixLoader):
+        children = tuple((prefix, _loader_key(child)) for prefix, child in sorted(loader.mapping.items()))
+        return "prefix", loader.delimiter, children
+    if isinstance(loader, jinja2.ChoiceLoader):
+        return "choice", tuple(_loader_key(child) for child in loader.loaders)
+    # Function loaders and custom loaders can not be compared, the registered environment keeps the loader alive
+    return "object", id(loader)
+
+
+_bytecode_cache: jinja2.BytecodeCache | None = None
+_environments: dict[Hashable, jinja2.Environment] = {}
+_environments_lock = Lock()
+
+
+def _get_bytecode_cache() -> jinja2.BytecodeCache | None:
+    global _bytecode_cache
+
+    if _bytecode_cache is None and template_settings.TEMPLATE_BYTECODE_CACHE:
+        if directory := template_settings.TEMPLATE_BYTECODE_CACHE_DIR:
+            os.makedirs(directory, exist_ok=True)
+        # Cache files are written to a temporary file first and then renamed, so workers can share the directory
+        _bytecode_cache = jinja2.FileSystemBytecodeCache(directory)
+    return _bytecode_cache
+
+
+def get_environment(loader: jinja2.BaseLoader) -> jinja2.Environment:
+    """Return the environment for `loader`, creating it on first use.
+
+    The environment is shared by everyone that uses an equal loader, do not change its globals or filters.
+    """
+    key = _loader_key(loader)
+    if (environment := _environments.get(key)) is not None:
+        return environment
+
+    with _environments_lock:
+        if (environment := _environments.get(key)) is None:
+            environment = _environments[key] = jinja2.Environment(
+                loader=loader,
+                autoescape=True,
+                lstrip_blocks=True,
+                trim_blocks=True,
+                undefined=jinja2.StrictUndefined,
+                bytecode_cache=_get_bytecode_cache(),
+            )
+            environment.template_class = TimedTemplate
+        return environment
+
+
+def clear_environments() -> None:
+    """Forget all environments and their compiled templates, the bytecode cache on disk is kept."""
+    with _environments_lock:
+        _environments.clear()
+
+
+def precompile_templates() -> int:
+    """Compile all templates of the registered environments and return how many were compiled."""
+    start = perf_counter()
+    compiled = 0
+    for environment in list(_environments.values()):
+        try:
+            names = environment.list_templates()
+        except TypeError:
+            continue  # The loader can not list its templates
+        for name in names:
+            environment.get_template(name)
+            compiled += 1
+
+    logger.info("Precompiled templates", templates=compiled, duration=perf_counter() - start)
+    return compiled
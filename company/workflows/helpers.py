@@ -16,14 +16,23 @@ from orchestrator.types import SubscriptionLifecycle
 from company.products.services.subscription import subscription_description
 
 
+def description_error(actual: str, desired: str) -> str | None:
+    if actual != desired:
+        return f"Subscription description is invalid. Desired: {desired}, Actual: {actual}"
+    return None
+
+
+def status_is_active_error(status: SubscriptionLifecycle | str) -> str | None:
+    if status != SubscriptionLifecycle.ACTIVE:
+        return f"Subscription status needs to be active but status is {status}"
+    return None
+
+
 def validate_subscription_description(subscription: SubscriptionModel) -> None:
-    desired_description = subscription_description(subscription)
-    if subscription.description != desired_description:
-        raise AssertionError(
-            f"Subscription description is invalid. Desired: {desired_description}, Actual: {subscription.description}"
-        )
+    if error := description_error(subscription.description, subscription_description(subscription)):
+        raise AssertionError(error)
 
 
 def validate_subscription_status_is_active(subscription: SubscriptionModel) -> None:
-    if subscription.status != SubscriptionLifecycle.ACTIVE:
-        raise AssertionError(f"Subscription status needs to be active but status is {subscription.status}")
+    if error := status_is_active_error(subscription.status):
+        raise AssertionError(error)
@@ -0,0 +1,208 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per process run cache of loaded subscription domain models.
+
+Loading a ``SubscriptionModel`` rebuilds the whole domain model from the database, and the steps the workflow wrappers
+add around the steps of a workflow (``unsync``, ``set_status``, ``resync``, see ``company.workflows.steps``) all load
+the subscription the workflow works on. Within a process run :func:`load_subscription` serves those loads from an
+identity map that is shared by consecutive steps.
+
+The map is kept up to date when a step saves changes: models that a step returns are saved by the workflow engine
+and then replace the cached model of their subscription, any other flush of the subscription tables invalidates the
+cached models it touches. Changes made with raw SQL are not detected. A map is only reused by the step directly
+following the one that created or last used it in the same worker, so a process that fails, suspends or is resumed
+(possibly elsewhere) starts with an empty map. The subscription is locked (out of sync) while a modify or terminate
+workflow runs, so other processes do not change it between the steps.
+"""
+
+import contextlib
+from contextvars import ContextVar
+from copy import deepcopy
+from itertools import chain
+from threading import Lock
+from typing import Any, Iterator, TypeVar
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from orchestrator.db import (
+    SubscriptionCustomerDescriptionTable,
+    SubscriptionInstanceRelationTable,
+    SubscriptionInstanceTable,
+    SubscriptionInstanceValueTable,
+    SubscriptionTable,
+)
+from orchestrator.domain.base import SubscriptionModel
+from orchestrator.types import State
+from orchestrator.workflow import Process, Step, StepList, make_step_function
+
+from company.utils.cache import TTLCache
+
+S = TypeVar("S", bound=SubscriptionModel)
+
+IDENTITY_MAP_TTL = 10 * 60
+
+
+def _orm_objects(value: Any) -> Iterator[Any]:
+    if isinstance(value, BaseModel):
+        if (db_model := getattr(value, "_db_model", None)) is not None:
+            yield db_model
+        for field_value in value.__dict__.values():
+            yield from _orm_objects(field_value)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _orm_objects(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _orm_objects(item)
+
+
+def copy_subscription(subscription: S) -> S:
+    """Deep copy a domain model, sharing the database objects of the subscription and its product blocks.
+
+    ``SubscriptionModel.copy(deep=True)`` would also copy the SQLAlchemy objects in ``_db_model``, which then no
+    longer belong to the session.
+    """
+    memo = {id(db_model): db_model for db_model in _orm_objects(subscription)}
+    return deepcopy(subscription, memo)
+
+
+class SubscriptionIdentityMap:
+    def __init__(self, position: int = -1) -> None:
+        self.position = position
+        self._models: dict[UUID, SubscriptionModel] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def load(self, subscription_id: UUID, model: type[S]) -> S:
+        with self._lock:
+            cached = self._models.get(subscription_id)
+        if not isinstance(cached, model):
+            cached = model.from_subscription(subscription_id)
+            with self._lock:
+                self._models[subscription_id] = cached
+        return copy_subscription(cached)  # type: ignore
+
+    def saved(self, subscription: SubscriptionModel) -> None:
+        """Replace the cached model of a subscription with a model that was just saved."""
+        with self._lock:
+            self._models[subscription.subscription_id] = copy_subscription(subscription)
+
+    def invalidate(self, subscription_id: UUID) -> None:
+        with self._lock:
+            self._models.pop(subscription_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+_current_identity_map: ContextVar[SubscriptionIdentityMap | None] = ContextVar(
+    "subscription_identity_map", default=None
+)
+_process_identity_maps: TTLCache[UUID, SubscriptionIdentityMap] = TTLCache(ttl=IDENTITY_MAP_TTL, maxsize=256)
+
+
+def load_subscription(subscription_id: UUID | str, model: type[S] = SubscriptionModel) -> S:  # type: ignore
+    """Load a subscription, from the identity map of the running process if there is one.
+
+    The returned model is a copy, changing it does not affect other steps until the step returns it and it is saved.
+
+    Args:
+        subscription_id: The subscription to load.
+        model: The domain model class to load the subscription as.
+
+    Returns: The subscription domain model.
+
+    """
+    subscription_id = UUID(str(subscription_id))
+    if (identity_map := _current_identity_map.get()) is not None:
+        return identity_map.load(subscription_id, model)
+    return model.from_subscription(subscription_id)
+
+
+@contextlib.contextmanager
+def identity_map_scope(identity_map: SubscriptionIdentityMap | None = None) -> Iterator[SubscriptionIdentityMap]:
+    """Use an identity map for all :func:`load_subscription` calls in the enclosed code."""
+    identity_map = identity_map if identity_map is not None else SubscriptionIdentityMap()
+    token = _current_identity_map.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current_identity_map.reset(token)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed(session: Session, flush_context: Any) -> None:
+    if (identity_map := _current_identity_map.get()) is None:
+        return
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (SubscriptionTable, SubscriptionInstanceTable, SubscriptionCustomerDescriptionTable)):
+            identity_map.invalidate(obj.subscription_id)
+        elif isinstance(obj, (SubscriptionInstanceValueTable, SubscriptionInstanceRelationTable)):
+            # These do not know their subscription without extra queries
+            identity_map.clear()
+            return
+
+
+@event.listens_for(Session, "after_bulk_update")
+@event.listens_for(Session, "after_bulk_delete")
+def _invalidate_bulk(*args: Any) -> None:
+    if (identity_map := _current_identity_map.get()) is not None:
+        identity_map.clear()
+
+
+def domain_models(state: Any) -> Iterator[SubscriptionModel]:
+    """Yield the domain models in a state, the ones the step decorator saves when a step returns them."""
+    if isinstance(state, SubscriptionModel):
+        yield state
+    elif isinstance(state, list):
+        for value in state:
+            yield from domain_models(value)
+    elif isinstance(state, dict):
+        for value in state.values():
+            yield from domain_models(value)
+
+
+def _with_identity_map(step: Step, position: int, last_position: int) -> Step:
+    def _step(state: State) -> Process:
+        if not (process_id := state.get("process_id")):
+            return step(state)
+
+        identity_map = _process_identity_maps.pop(process_id)
+        if identity_map is None or identity_map.position != position - 1:
+            identity_map = SubscriptionIdentityMap()
+
+        with identity_map_scope(identity_map):
+            result = step(state)
+
+        if (result.issuccess() or result.isskipped()) and position < last_position:
+            for subscription in domain_models(result.unwrap()):
+                identity_map.saved(subscription)
+            identity_map.position = position
+            _process_identity_maps.set(process_id, identity_map)
+        return result
+
+    return make_step_function(_step, step.name, step.form, step.assignee)
+
+
+def with_identity_map(steplist: StepList) -> StepList:
+    """Share a subscription identity map between the consecutive steps of a process run."""
+    last_position = len(steplist) - 1
+    return StepList(_with_identity_map(step, position, last_position) for position, step in enumerate(steplist))
@@ -0,0 +1,90 @@
+# Copyright 2019-2022 SURF.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The core ``unsync``, ``resync`` and ``set_status`` steps, loading the subscription through the identity map.
+
+They behave the same as their ``orchestrator.workflows.steps`` counterparts, but the subscription is loaded with
+:func:`company.workflows.identity_map.load_subscription` instead of from the database in every step.
+"""
+
+from copy import deepcopy
+from typing import Any, Optional
+
+import structlog
+from pydantic import ValidationError
+
+from orchestrator.domain.base import SubscriptionModel
+from orchestrator.services.subscriptions import get_subscription
+from orchestrator.types import State, SubscriptionLifecycle, UUIDstr
+from orchestrator.utils.json import to_serializable
+from orchestrator.workflow import Step, step
+
+from company.workflows.identity_map import load_subscription
+
+logger = structlog.get_logger(__name__)
+
+
+def _subscription_id(subscription: Any) -> Any:
+    """Return the subscription id of a (serialized) subscription in the state."""
+    return subscription["subscription_id"] if isinstance(subscription, dict) else subscription
+
+
+@step("Unlock subscription")
+def resync(subscription: Any) -> State:
+    """Transition a subscription to in sync."""
+    model = load_subscription(_subscription_id(subscription))
+    model.insync = True
+    return {"subscription": model}
+
+
+@step("Lock subscription")
+def unsync(subscription_id: UUIDstr, __old_subscriptions__: Optional[dict] = None) -> State:
+    """Transition a subscription to out of sync and back up its current details in `__old_subscriptions__`.
+
+    An existing backup of the subscription in the state is not overwritten, see ``orchestrator.workflows.steps.unsync``.
+    """
+    try:
+        subscription = load_subscription(subscription_id)
+    except ValidationError:
+        subscription = get_subscription(subscription_id)  # type: ignore
+
+    if __old_subscriptions__ and __old_subscriptions__.get(subscription_id):
+        logger.info(
+            "Skipping backup of subscription details because it already exists in the state",
+            subscription_id=str(subscription_id),
+        )
+        subscription_backup = __old_subscriptions__
+    else:
+        logger.info("Creating backup of subscription details in the state", subscription_id=str(subscription_id))
+        subscription_backup = __old_subscriptions__ or {}
+        if isinstance(subscription, SubscriptionModel):
+            subscription_backup[str(subscription_id)] = deepcopy(subscription.dict())
+        else:
+            subscription_backup[str(subscription_id)] = to_serializable(subscription)  # type: ignore
+
+    if not subscription.insync:
+        raise ValueError("Subscription is already out of sync, cannot continue!")
+    subscription.insync = False
+
+    return {"subscription": subscription, "__old_subscriptions__": subscription_backup}
+
+
+def set_status(status: SubscriptionLifecycle) -> Step:
+    @step(f"Set subscription to '{status}'")
+    def _set_status(subscription: Any) -> State:
+        """Set subscription to status."""
+        model = SubscriptionModel.from_other_lifecycle(load_subscription(_subscription_id(subscription)), status)
+        return {"subscription": model}
+
+    _set_status.__doc__ = f"Set subscription to '{status}'."
+    return _set_status
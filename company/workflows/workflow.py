@@ -11,17 +11,228 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from copy import deepcopy
+from time import perf_counter
+from typing import Any, Callable
 from uuid import UUID
 
+import structlog
+from opentelemetry._metrics import get_meter  # type: ignore
+from sqlalchemy import event
+
+from orchestrator.db import db, transactional
 from orchestrator.forms import FormPage
 from orchestrator.forms.validators import DisplaySubscription, contact_person_list
 from orchestrator.targets import Target
-from orchestrator.types import InputForm, InputStepFunc, SubscriptionLifecycle, UUIDstr
-from orchestrator.workflow import StepList, Workflow, done, init, make_workflow
-from orchestrator.workflows.steps import resync, set_status, store_process_subscription, unsync
+from orchestrator.types import InputForm, InputStepFunc, State, SubscriptionLifecycle, UUIDstr
+from orchestrator.utils.state import form_inject_args
+from orchestrator.workflow import (
+    Failed,
+    Process,
+    Step,
+    StepList,
+    Success,
+    Workflow,
+    done,
+    init,
+    make_step_function,
+    make_workflow,
+)
+from orchestrator.workflows.steps import store_process_subscription
 from orchestrator.workflows.utils import wrap_create_initial_input_form, wrap_modify_initial_input_form
 
+from company.db import ProcessStepTimingTable
+from company.utils.cache import TTLCache
+from company.utils.instrumentation import Measurement, measure
+from company.workflows.identity_map import domain_models, with_identity_map
+from company.workflows.steps import resync, set_status, unsync
+
+logger = structlog.get_logger(__name__)
+
+_meter = get_meter(__name__)
+# Per measured quantity of a step, the histogram it is recorded in
+_step_histograms = {
+    "wall_time": _meter.create_histogram("company.workflow.step.wall_time", "s", "Wall time of workflow steps"),
+    "cpu_time": _meter.create_histogram("company.workflow.step.cpu_time", "s", "CPU time of workflow steps"),
+    "db_queries": _meter.create_histogram(
+        "company.workflow.step.db_queries", "1", "Database queries executed by workflow steps"
+    ),
+    "external_calls": _meter.create_histogram(
+        "company.workflow.step.external_calls", "1", "Calls to external systems made by workflow steps"
+    ),
+}
+
+
+class ParallelStepError(Exception):
+    pass
+
+
+def parallel(name: str, *steps: Step, max_workers: int | None = None) -> Step:
+    """Combine independent steps into one step that runs them concurrently in a thread pool.
+
+    Every branch gets its own copy of the state and its own database session. The state changes of the branches
+    are merged in the order the steps are passed, independent of the order in which they finish. The group only
+    succeeds when all branches succeed: if one of them fails, no state changes are applied and the group fails
+    with the errors of all failed branches.
+
+    The group is all-or-nothing for the database as well. Branches may read from the database but not write to it,
+    a branch that flushes changes to its session fails. Domain models a branch returns in its state are not saved
+    by the branch, but by the group in its own transaction after all branches succeeded, so when one branch fails
+    nothing is written. External side effects of the branches that succeeded (e.g. a reservation) are not undone,
+    branches must be safe to run again when the group is retried.
+
+    Two branches that change the same state key to a different value are a programming error and fail the group.
+
+    Example::
+
+        @create_workflow("create node")
+        def create_node() -> StepList:
+            construct_node_model
+            >> parallel("Check and allocate resources", allocate_ipam, check_dns, nso_dry_run)
+            >> provision_node
+
+    Args:
+        name: The name of the combined step.
+        steps: The steps to run concurrently, these must be made with the ``step`` decorator and can not be input
+            steps.
+        max_workers: Maximum number of branches that run at the same time, defaults to all of them.
+
+    Returns: A step that can be used in a step list.
+
+    """
+    if any(step.form for step in steps):
+        raise ValueError(f"Input steps can not be part of parallel step group {name}")
+    if not all(hasattr(step, "__wrapped__") for step in steps):
+        raise ValueError(f"The steps of parallel step group {name} must be made with the step decorator")
+
+    def _run_branch(branch: Step, state: State) -> State:
+        def _reject_writes(*args: Any) -> None:
+            raise ParallelStepError(
+                f"Branch {branch.name} of parallel step group {name} tried to write to the database, "
+                "return domain models in the state instead"
+            )
+
+        log = logger.bind(parallel_group=name, branch=branch.name)
+        log.debug("Starting parallel branch")
+        start = perf_counter()
+        status = "failed"
+        try:
+            with db.database_scope():
+                event.listen(db.session, "before_flush", _reject_writes)
+                # Run the step function without its decorator, which would save the returned domain models
+                new_state = form_inject_args(branch.__wrapped__)(state)  # type: ignore
+            status = "success"
+        finally:
+            log.info("Finished parallel branch", duration=perf_counter() - start, status=status)
+        return {**state, **(new_state or {})}
+
+    def _merge(state: State, results: list[tuple[Step, State]]) -> State:
+        changes: dict[str, tuple[str, Any]] = {}
+        removed: set[str] = set()
+        for branch, new_state in results:
+            for key, value in new_state.items():
+                if key in state and state[key] == value:
+                    continue
+                if key in changes and changes[key][1] != value:
+                    raise ParallelStepError(
+                        f"Branches {changes[key][0]} and {branch.name} of parallel step group {name} "
+                        f"both changed state key {key}"
+                    )
+                changes[key] = (branch.name, value)
+            removed |= state.keys() - new_state.keys()
+        return {key: value for key, value in state.items() if key not in removed} | {
+            key: value for key, (_, value) in changes.items()
+        }
+
+    def _parallel(state: State) -> Process:
+        with ThreadPoolExecutor(max_workers=max_workers or len(steps), thread_name_prefix=name) as executor:
+            futures = [executor.submit(copy_context().run, _run_branch, branch, deepcopy(state)) for branch in steps]
+
+        results: list[tuple[Step, State]] = []
+        errors: list[str] = []
+        for branch, future in zip(steps, futures):
+            try:
+                results.append((branch, future.result()))
+            except Exception as ex:
+                errors.append(f"{branch.name}: {ex}")
+        if errors:
+            return Failed(ParallelStepError(f"Parallel step group {name} failed: {'; '.join(errors)}"))
+
+        try:
+            with transactional(db, logger.bind(parallel_group=name)):
+                new_state = _merge(state, results)
+                for subscription in domain_models(new_state):
+                    subscription.save()
+        except Exception as ex:
+            return Failed(ex)
+        return Success(new_state)
+
+    return make_step_function(_parallel, name)
+
+
+def _store_step_timing(state: State, step_name: str, result: Process, measurement: Measurement) -> None:
+    status = type(result).__name__.lower()
+    logger.info(
+        "Step timing",
+        workflow_name=state.get("workflow_name"),
+        step_name=step_name,
+        status=status,
+        wall_time=measurement.wall_time,
+        cpu_time=measurement.cpu_time,
+        db_queries=measurement.db_queries,
+        external_calls=measurement.external_calls,
+    )
+    attributes = {"workflow_name": state.get("workflow_name", ""), "step_name": step_name, "status": status}
+    for quantity, histogram in _step_histograms.items():
+        histogram.record(getattr(measurement, quantity), attributes=attributes)
+
+    if not (process_id := state.get("process_id")):
+        return
+
+    try:
+        with db.database_scope():
+            db.session.add(
+                ProcessStepTimingTable(
+                    process_id=process_id,
+                    workflow_name=state.get("workflow_name", ""),
+                    step_name=step_name,
+                    status=status,
+                    wall_time=measurement.wall_time,
+                    cpu_time=measurement.cpu_time,
+                    db_queries=measurement.db_queries,
+                    external_calls=measurement.external_calls,
+                )
+            )
+            db.session.commit()
+    except Exception:
+        # Timings are informational, they should never break a workflow
+        logger.warning("Could not store step timing", step_name=step_name, exc_info=True)
+
+
+def _instrument(step: Step) -> Step:
+    def _instrumented(state: State) -> Process:
+        with measure() as measurement:
+            result = step(state)
+        _store_step_timing(state, step.name, result, measurement)
+        return result
+
+    return make_step_function(_instrumented, step.name, step.form, step.assignee)
+
+
+def instrument_steps(steplist: StepList) -> StepList:
+    """Measure wall time, CPU time, database queries and external calls of every step in the step list.
+
+    The measurements are logged, recorded in the ``company.workflow.step.*`` OpenTelemetry histograms and stored in
+    the process_step_timing table.
+    """
+    return StepList(map(_instrument, steplist))
+
+
+def _wrap_steps(steplist: StepList) -> StepList:
+    return instrument_steps(with_identity_map(steplist))
+
 
 def create_workflow(
     description: str,
@@ -42,7 +253,7 @@ def create_workflow(
     create_initial_input_form_generator = wrap_create_initial_input_form(initial_input_form)
 
     def _create_workflow(f: Callable[[], StepList]) -> Workflow:
-        steplist = init >> f() >> set_status(status) >> resync >> done
+        steplist = _wrap_steps(init >> f() >> set_status(status) >> resync >> done)
         return make_workflow(f, description, create_initial_input_form_generator, Target.CREATE, steplist)
 
     return _create_workflow
@@ -66,7 +277,7 @@ def modify_workflow(
     wrapped_modify_initial_input_form_generator = wrap_modify_initial_input_form(initial_input_form)
 
     def _modify_workflow(f: Callable[[], StepList]) -> Workflow:
-        steplist = (
+        steplist = _wrap_steps(
             init
             >> store_process_subscription(Target.MODIFY)
             >> unsync
@@ -80,12 +291,28 @@ def modify_workflow(
     return _modify_workflow
 
 
+TERMINATE_FORM_CACHE_TTL = 60 * 60
+
+_terminate_forms: TTLCache[UUIDstr, type[FormPage]] = TTLCache(ttl=TERMINATE_FORM_CACHE_TTL, maxsize=1024)
+
+
+def _terminate_form(organisation: UUIDstr) -> type[FormPage]:
+    class TerminateForm(FormPage):
+        subscription_id: DisplaySubscription
+        contact_persons: contact_person_list(UUID(organisation)) = []  # type: ignore
+
+    return TerminateForm
+
+
 def terminate_initial_input_form_generator(subscription_id: UUIDstr, organisation: UUIDstr) -> InputForm:
+    # The form of an organisation is built once and only the subscription, the default of a field, is filled in per
+    # call. Nothing goes stale: the contact persons field only holds the organisation, the client looks up its
+    # contacts when the form is shown.
+    organisation_form = _terminate_forms.get_or_set(organisation, lambda: _terminate_form(organisation))
     temp_subscription_id = subscription_id
 
-    class TerminateForm(FormPage):
+    class TerminateForm(organisation_form):  # type: ignore
         subscription_id: DisplaySubscription = temp_subscription_id  # type: ignore
-        contact_persons: contact_person_list(UUID(organisation)) = []  # type: ignore
 
     return TerminateForm
 
@@ -108,7 +335,7 @@ def terminate_workflow(
     wrapped_terminate_initial_input_form_generator = wrap_modify_initial_input_form(initial_input_form)
 
     def _terminate_workflow(f: Callable[[], StepList]) -> Workflow:
-        steplist = (
+        steplist = _wrap_steps(
             init
             >> store_process_subscription(Target.TERMINATE)
             >> unsync
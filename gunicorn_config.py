@@ -0,0 +1,19 @@
+"""Gunicorn configuration, used by bin/server.
+
+Extends the logging configuration of nwastdlib with hooks that make preloading (``--preload``) safe: the app is
+imported once in the master and the workers are forked from it, after which each worker replaces the connection
+pools and clients it inherited.
+"""
+
+from typing import Any
+
+from nwastdlib.logging import *  # noqa: F401,F403
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    if not server.cfg.preload_app:
+        return
+
+    from company.utils.fork import reinitialise_after_fork
+
+    reinitialise_after_fork()
@@ -16,26 +16,36 @@
 from pathlib import Path
 
 import typer
-from fastapi.responses import JSONResponse
 from structlog import get_logger
 
 from orchestrator import OrchestratorCore
 from orchestrator.cli.main import app as core_cli
-from orchestrator.settings import AppSettings, app_settings
+from orchestrator.settings import AppSettings, app_settings, tracer_provider
 from settings import company_settings
 
 from company import load_company, load_company_cli
+from company.api.compression import CompressionMiddleware
+from company.api.responses import ORJSONResponse
+from company.utils.sampling import AdaptiveSampler, configure_adaptive_sampling
 
 logger = get_logger(__name__)
 
 
-class OrchestratorResponse(JSONResponse):
-    media_type = "application/json; charset=utf-8"
+class OrchestratorResponse(ORJSONResponse):
+    pass
 
 
 def init_app(orchestrator_settings: AppSettings) -> OrchestratorCore:
     app = OrchestratorCore(base_settings=orchestrator_settings, default_response_class=OrchestratorResponse)
     load_company(app)
+    if company_settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=company_settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=company_settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=company_settings.COMPRESSION_BROTLI_QUALITY,
+            zstd_level=company_settings.COMPRESSION_ZSTD_LEVEL,
+        )
     return app
 
 
@@ -47,6 +57,15 @@ logger.debug("Starting the app with the following settings", app_settings=str(ap
 app = init_app(app_settings)
 
 if app_settings.TRACING_ENABLED:
+    sampler = AdaptiveSampler(
+        company_settings.TRACE_SAMPLE_RATE,
+        company_settings.TRACE_SAMPLE_RATES,
+        min_rate=company_settings.TRACE_SAMPLE_RATE_MIN,
+        slow_threshold=company_settings.TRACE_SLOW_THRESHOLD_SECONDS,
+        error_threshold=company_settings.TRACE_ERROR_RATE_THRESHOLD,
+        target_per_second=company_settings.TRACE_TARGET_PER_SECOND,
+    )
+    configure_adaptive_sampling(tracer_provider, sampler)
     app.instrument_app()
     app.add_sentry(
         company_settings.SENTRY_DSN, company_settings.TRACE_SAMPLE_RATE, app_settings.SERVICE_NAME, app_settings.ENVIRONMENT
@@ -0,0 +1,34 @@
+"""Add GIN index on user preference preferences.
+
+Revision ID: 339e01a1c372
+Revises: 022505714cf8
+Create Date: 2026-10-19 10:12:43.218311
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '339e01a1c372'
+down_revision = '022505714cf8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Build the index without blocking writes to the table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_user_preference_preferences',
+            'user_preference',
+            ['preferences'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'preferences': 'jsonb_path_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_preference_preferences', table_name='user_preference', postgresql_concurrently=True)
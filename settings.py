@@ -5,6 +5,17 @@ class CompanySettings(BaseSettings):
     TRACING_ENABLED: bool = False
     SENTRY_DSN: str = ""
     TRACE_SAMPLE_RATE: float = 0.1
+    # Base rates by route or span name pattern, e.g. {"/api/health*": 0, "External Api Call *": 0.5}
+    TRACE_SAMPLE_RATES: dict[str, float] = {}
+    TRACE_SAMPLE_RATE_MIN: float = 0.001
+    TRACE_SLOW_THRESHOLD_SECONDS: float = 1.0
+    TRACE_ERROR_RATE_THRESHOLD: float = 0.05
+    TRACE_TARGET_PER_SECOND: float = 1.0
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
 
 
 company_settings = CompanySettings()
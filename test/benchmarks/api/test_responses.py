@@ -0,0 +1,17 @@
+import json
+
+import pytest
+from starlette.responses import JSONResponse
+
+from orchestrator.utils.json import json_dumps
+from test.helpers import subscription_dicts
+
+from company.api.responses import ORJSONResponse
+
+
+@pytest.mark.benchmark(group="json-response")
+@pytest.mark.parametrize("response_class", [JSONResponse, ORJSONResponse])
+def test_benchmark_render(benchmark, response_class):
+    # FastAPI passes content through jsonable_encoder before it is rendered
+    content = json.loads(json_dumps(subscription_dicts(10000)))
+    benchmark(response_class, content)
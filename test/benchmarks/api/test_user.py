@@ -0,0 +1,36 @@
+from http import HTTPStatus
+from itertools import count
+
+import pytest
+
+from orchestrator.utils.json import json_dumps
+
+from company.db import UserPreferenceDomain
+
+DOMAIN = UserPreferenceDomain.DASHBOARD.name
+PREFERENCES = {"onboarding": True, "columns": [f"column{i}" for i in range(20)], "filters": {"status": ["active"]}}
+
+
+def _url(user_name):
+    return f"/api/company/user/preferences/{DOMAIN}/{user_name}"
+
+
+@pytest.mark.benchmark(group="user-preference-api")
+def test_benchmark_put_preferences(benchmark, test_client):
+    users = count()
+    body = json_dumps({"preferences": PREFERENCES})
+
+    def put():
+        return test_client.put(_url(f"user{next(users) % 100}@example.com"), json=body)
+
+    assert benchmark(put).status_code == HTTPStatus.NO_CONTENT
+
+
+@pytest.mark.benchmark(group="user-preference-api")
+def test_benchmark_get_preferences(benchmark, test_client):
+    test_client.put(_url("j.doe@example.com"), json=json_dumps({"preferences": PREFERENCES}))
+
+    response = benchmark(test_client.get, _url("j.doe@example.com"))
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["preferences"] == PREFERENCES
@@ -0,0 +1,14 @@
+"""Benchmarks run against the same migrated test database as the unit tests, but without mocking outgoing HTTP.
+
+Run them with ``make benchmark``, compare with the last saved run with ``make benchmark-compare``.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from test.unit_tests.conftest import database, db_session, db_uri, fastapi_app  # noqa: F401
+
+
+@pytest.fixture(scope="session")
+def test_client(fastapi_app):
+    return TestClient(fastapi_app)
@@ -0,0 +1,142 @@
+import json
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from uuid import uuid4
+
+import pytest
+from pynso import NSOClient
+
+from company.services import nso
+from company.settings import dry_run_settings, external_service_settings
+
+SERVICE_TYPE = "sn8-l2vpn:sn8-l2vpn"
+
+
+def _endpoint(i):
+    return {
+        "subscription_id": str(uuid4()),
+        "node": f"rt{i % 20}",
+        "port": f"et-0/0/{i % 48}",
+        "vlan": [{"id": 100 + i, "vlan-range": f"{100 + i}-{110 + i}"}] if i % 2 else [],
+        "vlan-retag": {"old": i, "new": i + 1000} if i % 5 == 0 else {},
+        "mtu": 9000,
+        "description": "" if i % 3 else f"Endpoint {i}",
+        "esi": {"id": "", "type": "auto", "df-election": {"preference": "", "algorithm": []}},
+        "bgp": {"neighbors": [], "policies": {"import": [], "export": []}},
+        "monitoring": {"bfd": {"interval": 300 if i % 4 else None, "multiplier": 3}, "sflow": {}},
+    }
+
+
+def _service_payload(endpoints):
+    return {
+        SERVICE_TYPE: [
+            {
+                "service_id": str(uuid4()),
+                "customer": str(uuid4()),
+                "description": "Benchmark L2VPN",
+                "bum-filter": False,
+                "speed-policer": "",
+                "endpoint": [_endpoint(i) for i in range(endpoints)],
+                "options": {"legacy": [], "redundancy": {}, "labels": ["", ""]},
+            }
+        ]
+    }
+
+
+@pytest.mark.benchmark(group="nso-remove-empty-values")
+@pytest.mark.parametrize("endpoints", [2, 50, 500])
+def test_benchmark_remove_empty_values(benchmark, endpoints):
+    payload = _service_payload(endpoints)
+
+    result = benchmark(nso.remove_empty_values, payload)
+
+    endpoint = result[SERVICE_TYPE][0]["endpoint"][0]
+    assert "bgp" not in endpoint
+    assert endpoint["esi"] == {"type": "auto"}
+
+
+class RestconfStubHandler(BaseHTTPRequestHandler):
+    """Answers like the RESTCONF API of NSO, keeping the data that is written in memory."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, like NSO, so the connection pool of the client is used
+    disable_nagle_algorithm = True  # Otherwise every response waits for the delayed ACK of the client
+
+    def log_message(self, format, *args):
+        pass
+
+    def _path(self):
+        return unquote(self.path.split("?", 1)[0].removeprefix("/restconf/data/"))
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _respond(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/yang-data+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if (data := self.server.data.get(self._path())) is None:
+            self._respond(HTTPStatus.NOT_FOUND)
+        else:
+            self._respond(HTTPStatus.OK, data)
+
+    def do_PUT(self):
+        self.server.data[self._path()] = self._read_body()
+        self._respond(HTTPStatus.NO_CONTENT)
+
+    def do_POST(self):
+        self._read_body()
+        if self._path().endswith("/check-sync"):
+            self._respond(HTTPStatus.OK, json.dumps({"tailf-ncs:output": {"result": "in-sync"}}).encode())
+        else:
+            self._respond(HTTPStatus.CREATED)
+
+    def do_DELETE(self):
+        self.server.data.pop(self._path(), None)
+        self._respond(HTTPStatus.NO_CONTENT)
+
+
+@pytest.fixture
+def restconf_stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RestconfStubHandler)
+    server.data = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+
+    client = NSOClient("127.0.0.1", username="admin", password="admin", port=server.server_address[1], ssl=False)
+    monkeypatch.setattr(external_service_settings, "NSO_ENABLED", True)
+    monkeypatch.setattr(dry_run_settings, "DRY_RUN", False)
+    monkeypatch.setattr("company.services.nso.get_nso_client", lambda: client)
+    yield server
+    client.connection.session.close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.benchmark(group="nso-request")
+def test_benchmark_nso_update_service(benchmark, restconf_stub):
+    path = nso.create_service_path(SERVICE_TYPE, uuid4())
+    payload = nso.remove_empty_values(_service_payload(10))
+
+    benchmark(nso.update, path, payload)
+
+    assert json.loads(restconf_stub.data["/".join(path)]) == payload
+
+
+@pytest.mark.benchmark(group="nso-request")
+def test_benchmark_nso_get_service(benchmark, restconf_stub):
+    path = nso.create_service_path(SERVICE_TYPE, uuid4())
+    payload = nso.remove_empty_values(_service_payload(10))
+    nso.update(path, payload)
+
+    assert benchmark(nso.get, path) == payload
+
+
+@pytest.mark.benchmark(group="nso-request")
+def test_benchmark_nso_is_in_sync(benchmark, restconf_stub):
+    assert benchmark(nso.is_in_sync, "rt1")
@@ -0,0 +1,39 @@
+from itertools import count
+
+import pytest
+
+from orchestrator.api.models import create_or_update
+
+from company.db import UserPreferenceDomain, UserPreferenceTable
+from company.schemas import UserPreferenceSchema
+from company.services.user_preferences import upsert_user_preference, upsert_user_preferences
+
+DOMAIN = UserPreferenceDomain.DASHBOARD.name
+
+
+def _pref(user_name, **preferences):
+    return UserPreferenceSchema(user_name=user_name, domain=DOMAIN, preferences=preferences)
+
+
+@pytest.mark.benchmark(group="user-preference-write")
+def test_benchmark_create_or_update(benchmark):
+    users = count()
+    benchmark(lambda: create_or_update(UserPreferenceTable, _pref(f"user{next(users) % 100}@example.com", a=1)))
+
+
+@pytest.mark.benchmark(group="user-preference-write")
+def test_benchmark_upsert_user_preference(benchmark):
+    users = count()
+    benchmark(lambda: upsert_user_preference(_pref(f"user{next(users) % 100}@example.com", a=1)))
+
+
+@pytest.mark.benchmark(group="user-preference-import")
+def test_benchmark_create_or_update_1000_rows(benchmark):
+    prefs = [_pref(f"user{i}@example.com", index=i) for i in range(1000)]
+    benchmark.pedantic(lambda: [create_or_update(UserPreferenceTable, pref) for pref in prefs], rounds=5)
+
+
+@pytest.mark.benchmark(group="user-preference-import")
+def test_benchmark_upsert_user_preferences_1000_rows(benchmark):
+    prefs = [_pref(f"user{i}@example.com", index=i) for i in range(1000)]
+    benchmark.pedantic(lambda: upsert_user_preferences(prefs), rounds=5)
@@ -0,0 +1,33 @@
+from uuid import uuid4
+
+import pytest
+from aiocache.serializers import JsonSerializer, PickleSerializer
+
+
+def _customer(i):
+    """A customer as the CRM client returns it and the crm cache stores it."""
+    return {
+        "customer_id": str(uuid4()),
+        "name": f"Customer {i}",
+        "abbreviation": f"CUST{i}",
+        "customer_type": "Universiteit",
+        "addresses": [
+            {"street": "Moreelsepark", "number": str(i), "postal_code": "3511 EP", "city": "Utrecht", "country": "NL"}
+        ],
+        "contacts": [
+            {"name": f"Contact {c}", "email": f"contact{c}@customer{i}.nl", "phone": "+31 88 787 3000", "roles": []}
+            for c in range(5)
+        ],
+        "sub_organisations": [str(uuid4()) for _ in range(3)],
+        "active": True,
+    }
+
+
+@pytest.mark.benchmark(group="cache-serializer")
+@pytest.mark.parametrize("serializer_class", [JsonSerializer, PickleSerializer])
+@pytest.mark.parametrize("customers", [1, 500])
+def test_benchmark_serializer_round_trip(benchmark, serializer_class, customers):
+    serializer = serializer_class()
+    value = [_customer(i) for i in range(customers)]
+
+    assert benchmark(lambda: serializer.loads(serializer.dumps(value))) == value
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+from opentelemetry.trace import NoOpTracer
+
+from orchestrator.settings import app_settings
+
+from company.settings import dry_run_settings
+from company.utils import external
+from company.utils.external import AuthMixin
+
+
+class CountingSpanExporter(SpanExporter):
+    def __init__(self):
+        self.exported = 0
+
+    def export(self, spans):
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+
+class GeneratedApiClient:
+    """Stands in for a swagger-codegen ApiClient, its call itself costs (next to) nothing."""
+
+    def __init__(self):
+        self.configuration = SimpleNamespace(access_token="token")
+
+    def call_api(self, resource_path, method, path_params=None, query_params=None, header_params=None, **kwargs):
+        return {"resource_path": resource_path, "headers": header_params}
+
+
+class BenchmarkApiClient(AuthMixin, GeneratedApiClient):
+    pass
+
+
+class FixedTracer:
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def get(self):
+        return self.tracer
+
+
+@pytest.fixture
+def tracer(monkeypatch, request):
+    monkeypatch.setattr(dry_run_settings, "DRY_RUN", False)
+    monkeypatch.setattr(app_settings, "TRACING_ENABLED", request.param)
+    exporter = CountingSpanExporter()
+    if request.param:
+        provider = TracerProvider(sampler=ALWAYS_ON)
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer(__name__)
+    else:
+        tracer = NoOpTracer()
+    monkeypatch.setattr(external, "_tracer", FixedTracer(tracer))
+    return exporter
+
+
+@pytest.mark.benchmark(group="external-call-api")
+@pytest.mark.parametrize("tracer", [False, True], ids=["tracing-off", "tracing-on"], indirect=True)
+def test_benchmark_call_api(benchmark, tracer):
+    client = BenchmarkApiClient()
+
+    response = benchmark(client.call_api, "/subscriptions/{id}", "GET", {"id": "1"}, [("depth", 2)], {})
+
+    assert response["resource_path"] == "/subscriptions/{id}"
+    assert bool(tracer.exported) is app_settings.TRACING_ENABLED
@@ -0,0 +1,32 @@
+"""Test data shared by the unit tests and the benchmarks."""
+
+from datetime import datetime, timezone
+from enum import Enum
+from ipaddress import IPv4Network
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+
+class Status(str, Enum):
+    ACTIVE = "active"
+
+
+class Item(BaseModel):
+    name: str
+
+
+def subscription_dicts(n):
+    """Subscriptions as API responses contain them, with values that need custom JSON serialization."""
+    return [
+        {
+            "subscription_id": uuid4(),
+            "description": f"Subscription {i}",
+            "status": Status.ACTIVE,
+            "start_date": datetime(2022, 1, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+            "prefix": IPv4Network("10.0.0.0/24"),
+            "customer": Item(name="SURF"),
+            "insync": True,
+        }
+        for i in range(n)
+    ]
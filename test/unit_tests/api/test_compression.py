@@ -0,0 +1,92 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from company.api.api_v1.endpoints import admin
+from company.api.compression import CompressionMiddleware, compression_stats, negotiate_encoding
+from company.api.security import admin_security
+
+BODY = "subscription " * 1000
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return PlainTextResponse(BODY, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("small")
+
+    @app.get("/binary")
+    def binary():
+        return PlainTextResponse(BODY, media_type="application/octet-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([BODY, BODY]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip;q=0.5, br", "br"),
+        ("br;q=0, gzip;q=0.1", "gzip"),
+        ("*", "zstd"),
+        ("identity", None),
+        ("gzip;q=0", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding, ["zstd", "br", "gzip"]) == expected
+
+
+def test_compresses_big_responses(client):
+    saved = compression_stats.bytes_saved
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"}, stream=True)
+
+    raw = response.raw.read()
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw).decode() == BODY
+    assert compression_stats.bytes_saved - saved == len(BODY) - len(raw)
+
+
+@pytest.mark.parametrize("path,body", [("/small", "small"), ("/binary", BODY), ("/stream", BODY * 2)])
+def test_skips_small_binary_and_streaming_responses(client, path, body):
+    response = client.get(path, headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == body
+
+
+def test_skips_without_accept_encoding(client):
+    response = client.get("/big", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
+
+
+def test_admin_endpoint_exposes_compression_stats(client):
+    client.get("/big", headers={"Accept-Encoding": "gzip"})
+    admin_app = FastAPI()
+    admin_app.include_router(admin.router, prefix="/company/admin")
+    admin_app.dependency_overrides[admin_security] = lambda: None
+
+    stats = TestClient(admin_app).get("/company/admin/compression").json()
+
+    assert stats == compression_stats.snapshot()
+    assert stats["responses"] >= 1
+    assert stats["bytes_saved"] == stats["bytes_in"] - stats["bytes_out"] > 0
@@ -0,0 +1,48 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from orchestrator.utils.json import json_dumps
+from test.helpers import subscription_dicts
+
+from company.api import responses
+from company.api.responses import ORJSONResponse, StreamingJSONResponse
+
+
+def test_orjson_response_matches_json_dumps():
+    content = subscription_dicts(3)
+
+    body = ORJSONResponse(content).body
+
+    assert json.loads(body) == json.loads(json_dumps(content))
+    assert json.loads(body)[0]["start_date"] == "2022-01-01T12:30:15+00:00"
+
+
+def test_streaming_json_response(monkeypatch):
+    monkeypatch.setattr(responses, "STREAM_CHUNK_SIZE", 100)
+    content = subscription_dicts(50)
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_items():
+        return StreamingJSONResponse(iter(content))
+
+    @app.get("/async")
+    async def async_items():
+        async def items():
+            for item in content:
+                yield item
+
+        return StreamingJSONResponse(items())
+
+    @app.get("/empty")
+    def empty():
+        return StreamingJSONResponse([])
+
+    client = TestClient(app)
+    expected = json.loads(json_dumps(content))
+    assert client.get("/sync").json() == expected
+    assert client.get("/async").json() == expected
+    assert client.get("/empty").json() == []
+
@@ -0,0 +1,29 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+from oauth2_lib.fastapi import OIDCUserModel
+
+from orchestrator.settings import oauth2_settings
+
+from company.api.security import admin_security
+
+ROLE_PREFIX = "urn:mace:surfnet.nl:surfnet.nl:sab:role:"
+
+
+def test_admin_security(monkeypatch):
+    monkeypatch.setattr(oauth2_settings, "OAUTH2_ACTIVE", True)
+    admin = OIDCUserModel(eduperson_entitlement=[f"{ROLE_PREFIX}admin"])
+    user = OIDCUserModel(eduperson_entitlement=[f"{ROLE_PREFIX}Klantportaalgebruiker"])
+
+    assert admin_security(admin) is admin
+    for not_an_admin in (user, None):
+        with pytest.raises(HTTPException) as error:
+            admin_security(not_an_admin)
+        assert error.value.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_admin_security_without_oauth2(monkeypatch):
+    monkeypatch.setattr(oauth2_settings, "OAUTH2_ACTIVE", False)
+
+    assert admin_security(None) is None
@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from orchestrator.api.api_v1.endpoints import translations as core_translations
+from orchestrator.settings import app_settings
+
+from company.api.api_v1.endpoints import translations
+from company.services.translations import TranslationBundles, build_bundle
+
+
+@pytest.fixture
+def translations_dir(tmp_path, monkeypatch):
+    (tmp_path / "en-GB.json").write_text(json.dumps({"workflow": {"create_node": "Create node"}}))
+    monkeypatch.setattr(app_settings, "TRANSLATIONS_DIR", tmp_path)
+    monkeypatch.setattr(translations, "translation_bundles", TranslationBundles())
+    return tmp_path
+
+
+@pytest.fixture
+def client(translations_dir):
+    app = FastAPI()
+    app.include_router(translations.router, prefix="/translations")
+    return TestClient(app)
+
+
+def test_bundle_merges_company_translations_over_core(translations_dir):
+    bundle = build_bundle("en-GB")
+    merged = json.loads(bundle.body)
+
+    assert merged["workflow"]["create_node"] == "Create node"
+    assert "modify_note" in merged["workflow"]  # From the core translations
+    assert gzip.decompress(bundle.gzipped) == bundle.body
+
+
+def test_serves_bundle_with_etag(client):
+    response = client.get("/translations/en-GB", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert response.json()["workflow"]["create_node"] == "Create node"
+
+    not_modified = client.get("/translations/en-GB", headers={"If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_versioned_requests_are_immutable(client):
+    etag = client.get("/translations/en-GB").headers["etag"]
+
+    response = client.get("/translations/en-GB", params={"version": etag.strip('"')})
+    assert response.headers["cache-control"] == translations.IMMUTABLE
+
+
+def test_rebuilds_when_translations_change(client, translations_dir):
+    etag = client.get("/translations/en-GB").headers["etag"]
+
+    filename = translations_dir / "en-GB.json"
+    filename.write_text(json.dumps({"workflow": {"create_node": "Create a node"}}))
+    os.utime(filename, (0, 1))
+
+    response = client.get("/translations/en-GB", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["workflow"]["create_node"] == "Create a node"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,gzipped",
+    [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("*", True),
+        ("", False),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, deflate", False),
+        ("*;q=0", False),
+        ("gzip;q=1, *;q=0", True),
+    ],
+)
+def test_respects_accept_encoding_quality(client, accept_encoding, gzipped):
+    response = client.get("/translations/en-GB", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert ("content-encoding" in response.headers) is gzipped
+    assert response.json()["workflow"]["create_node"] == "Create node"
+
+
+def test_replaces_core_translations_route(translations_dir):
+    app = FastAPI()
+    app.include_router(core_translations.router, prefix="/api/translations")
+
+    translations.include_router(app, prefix="/api/translations")
+
+    assert [route.endpoint for route in app.router.routes if route.path == "/api/translations/{language}"] == [
+        translations.get_translations
+    ]
+    assert "etag" in TestClient(app).get("/api/translations/en-GB").headers
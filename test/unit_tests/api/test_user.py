@@ -43,3 +43,32 @@ def test_user_info_non_valid_json(test_client):
         "/api/user/log/fredje", data="No valid json", headers={"Content-Type": "application/json"}
     )
     assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_query_user_preferences(test_client):
+    url = f"/api/company/user/preferences/{UserPreferenceDomain.DASHBOARD.name}"
+    for i, preferences in enumerate([{"onboarding": True, "theme": "dark"}, {"onboarding": False}, {"onboarding": True}]):
+        body = {"preferences": preferences}
+        response = test_client.put(f"{url}/query{i}@example.com", json=json_dumps(body))
+        assert response.status_code == HTTPStatus.NO_CONTENT
+
+    response = test_client.get(url, params={"contains": json_dumps({"onboarding": True}), "limit": 1})
+    assert response.status_code == HTTPStatus.OK
+    first_page = response.json()
+    assert [item["user_name"] for item in first_page["items"]] == ["query0@example.com"]
+    assert first_page["next_cursor"] == "query0@example.com"
+
+    response = test_client.get(
+        url, params={"contains": json_dumps({"onboarding": True}), "limit": 1, "after": first_page["next_cursor"]}
+    )
+    second_page = response.json()
+    assert [item["user_name"] for item in second_page["items"]] == ["query2@example.com"]
+    assert second_page["next_cursor"] is None
+
+    response = test_client.get(url, params={"has_key": "theme"})
+    assert [item["user_name"] for item in response.json()["items"]] == ["query0@example.com"]
+
+
+def test_query_user_preferences_unknown_domain(test_client):
+    response = test_client.get("/api/company/user/preferences/UNKNOWN")
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+from time import monotonic
+from uuid import uuid4
+
+import pytest
+import typer
+
+from company.cli import bulk
+from company.cli.bulk import Checkpoint, RateLimiter, bulk_run
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(rate=100, burst=5)
+    start = monotonic()
+    for _ in range(15):
+        limiter.acquire()
+
+    # The burst is free, the other 10 acquisitions wait 1/100s each
+    assert 0.09 <= monotonic() - start < 0.5
+
+
+def test_checkpoint_resume(tmp_path):
+    running, completed, lost = uuid4(), uuid4(), uuid4()
+    checkpoint = Checkpoint(tmp_path / "checkpoint.json", "modify_note")
+    checkpoint.record("a", running, "running")
+    checkpoint.record("b", completed, "running")
+    checkpoint.record("c", lost, "running")
+    checkpoint.record("d", None, "not started: boom")
+
+    checkpoint = Checkpoint(tmp_path / "checkpoint.json", "modify_note")
+    in_progress = checkpoint.resume(lambda pids: {running: "running", completed: "completed"})
+
+    assert in_progress == {running: "a"}
+    assert json.loads(checkpoint.path.read_text())["results"]["c"] == {"pid": str(lost), "status": "not found"}
+    assert [checkpoint.is_done(sid, retry_failed=True) for sid in "abcde"] == [True, True, False, False, False]
+    assert [checkpoint.is_done(sid, retry_failed=False) for sid in "abcde"] == [True, True, True, True, False]
+
+
+def test_checkpoint_of_other_workflow(tmp_path):
+    Checkpoint(tmp_path / "checkpoint.json", "modify_note").record("a", None, "completed")
+
+    with pytest.raises(typer.BadParameter):
+        Checkpoint(tmp_path / "checkpoint.json", "validate_node")
+
+
+def test_bulk_run(monkeypatch, tmp_path):
+    earlier_pid = uuid4()
+    Checkpoint(tmp_path / "checkpoint.json", "modify_note").record("a", earlier_pid, "running")
+    started = {}
+
+    def start_process(workflow, user_inputs, user):
+        pid = uuid4()
+        started[pid] = user_inputs[0]["subscription_id"]
+        return pid, None
+
+    def process_statuses(pids):
+        return {pid: "failed" if started.get(pid) == "c" else "completed" for pid in pids}
+
+    monkeypatch.setattr("orchestrator.db.init_database", lambda settings: None)
+    monkeypatch.setattr("orchestrator.services.processes.start_process", start_process)
+    monkeypatch.setattr(bulk, "select_subscriptions", lambda *args: ["a", "b", "c"])
+    monkeypatch.setattr(bulk, "queue_depth", lambda: 0)
+    monkeypatch.setattr(bulk, "process_statuses", _StatusesAfterResume(process_statuses, earlier_pid))
+
+    bulk_run(
+        "modify_note",
+        product_tag=[],
+        product=[],
+        status=["active"],
+        customer_id=None,
+        subscription_id=[],
+        limit=None,
+        extra_input="[]",
+        concurrency=2,
+        rate=100.0,
+        max_queue_depth=20,
+        checkpoint=Path(tmp_path / "checkpoint.json"),
+        retry_failed=True,
+        poll_interval=0.01,
+        user="bulk-run",
+        dry_run=False,
+    )
+
+    # The process of the earlier run was still running, it is waited for instead of started again
+    assert sorted(started.values()) == ["b", "c"]
+    results = json.loads((tmp_path / "checkpoint.json").read_text())["results"]
+    assert {sid: result["status"] for sid, result in results.items()} == {
+        "a": "completed",
+        "b": "completed",
+        "c": "failed",
+    }
+
+
+class _StatusesAfterResume:
+    """The process of the earlier run is still running when the run resumes and completes afterwards."""
+
+    def __init__(self, statuses, earlier_pid):
+        self.statuses = statuses
+        self.earlier_pid = earlier_pid
+        self.calls = 0
+
+    def __call__(self, pids):
+        self.calls += 1
+        result = self.statuses(pids)
+        if self.earlier_pid in result:
+            result[self.earlier_pid] = "running" if self.calls == 1 else "completed"
+        return result
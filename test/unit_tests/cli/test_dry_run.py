@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from orchestrator.services import processes
+
+from company.cli.dry_run import workflow_executor
+
+
+def test_workflow_executor_is_restored():
+    previous = processes.get_thread_pool()
+
+    with workflow_executor(ThreadPoolExecutor(2)) as executor:
+        assert processes.get_thread_pool() is executor
+        assert processes.get_thread_pool().submit(lambda: 42).result() == 42
+
+    assert processes.get_thread_pool() is previous
+    assert executor._shutdown
@@ -0,0 +1,106 @@
+import socketserver
+import threading
+from collections import Counter
+from ipaddress import IPv4Address, IPv6Address
+
+import dns.asyncresolver
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+import pytest
+
+from company.services.dns_check import DnsCache, NodeDnsRecords, check_node_dns, node_fqdn
+from company.settings import external_service_settings
+
+ZONE = {
+    ("rt1.dev.vtb.", "A"): ["10.1.4.1"],
+    ("rt1.dev.vtb.", "AAAA"): ["fd00:0:100:1::1"],
+    ("1.4.1.10.in-addr.arpa.", "PTR"): ["rt1.dev.vtb."],
+    ("1.0.0.0.0.0.0.0.0.0.0.0.0.0.0.0.1.0.0.0.0.0.1.0.0.0.0.0.0.0.d.f.ip6.arpa.", "PTR"): ["rt1.dev.vtb."],
+    ("rt2.dev.vtb.", "A"): ["10.1.4.99"],
+}
+
+
+class StubDnsHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        query = dns.message.from_wire(data)
+        question = query.question[0]
+        name, rdtype = question.name.to_text().lower(), dns.rdatatype.to_text(question.rdtype)
+        self.server.queries[(name, rdtype)] += 1
+
+        response = dns.message.make_response(query)
+        if (name, rdtype) in ZONE:
+            response.answer.append(dns.rrset.from_text_list(name, 300, "IN", rdtype, ZONE[(name, rdtype)]))
+        elif not any(zone_name == name for zone_name, _ in ZONE):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+@pytest.fixture
+def stub_dns_server():
+    server = socketserver.ThreadingUDPServer(("127.0.0.1", 0), StubDnsHandler)
+    server.queries = Counter()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def resolver(stub_dns_server):
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.nameservers = ["127.0.0.1"]
+    resolver.port = stub_dns_server.server_address[1]
+    resolver.lifetime = 2.0
+    return resolver
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(external_service_settings, "DO_DNS_CHECKS", True)
+    monkeypatch.setattr("company.services.dns_check.dns_cache", DnsCache())
+
+
+def test_check_node_dns_reports_per_node(resolver):
+    report = check_node_dns(
+        [
+            NodeDnsRecords(node_fqdn("rt1"), IPv4Address("10.1.4.1"), IPv6Address("fd00:0:100:1::1")),
+            NodeDnsRecords(node_fqdn("rt2"), IPv4Address("10.1.4.2")),
+            NodeDnsRecords(node_fqdn("rt3"), IPv4Address("10.1.4.3")),
+        ],
+        resolver,
+    )
+
+    assert not report.ok
+    rt1, rt2, rt3 = report.results
+    assert rt1.ok
+    assert rt1.records["AAAA"] == ("fd00:0:100:1::1",)
+    assert rt2.failures == [
+        "A of rt2.dev.vtb is 10.1.4.99, expected 10.1.4.2",
+        "PTR of 10.1.4.2 is missing, expected rt2.dev.vtb.",
+    ]
+    assert rt3.failures[0] == "A of rt3.dev.vtb is missing, expected 10.1.4.3"
+    assert list(report.failures) == ["rt2.dev.vtb", "rt3.dev.vtb"]
+
+
+def test_answers_and_missing_names_are_cached(resolver, stub_dns_server):
+    nodes = [NodeDnsRecords(node_fqdn("rt1"), IPv4Address("10.1.4.1")), NodeDnsRecords(node_fqdn("rt3"))]
+    nodes += [NodeDnsRecords(node_fqdn("rt3"), IPv4Address("10.1.4.3"))] * 3
+
+    first = check_node_dns(nodes, resolver)
+    second = check_node_dns(nodes, resolver)
+
+    assert first.failures == second.failures
+    # Concurrent lookups of the same record share one query, the second check is answered from the cache
+    assert set(stub_dns_server.queries.values()) == {1}
+    assert ("rt3.dev.vtb.", "A") in stub_dns_server.queries
+
+
+def test_skipped_when_dns_checks_are_disabled(monkeypatch, resolver, stub_dns_server):
+    monkeypatch.setattr(external_service_settings, "DO_DNS_CHECKS", False)
+
+    assert check_node_dns([NodeDnsRecords(node_fqdn("rt3"), IPv4Address("10.1.4.3"))], resolver).ok
+    assert not stub_dns_server.queries
@@ -0,0 +1,92 @@
+import smtplib
+from contextlib import contextmanager
+
+from company.db.models import MailOutboxTable
+from company.services.mail_outbox import DEAD, QUEUED, SENT, build_message, dispatch_mail, enqueue_mail, recipients
+from company.settings import mail_settings
+
+
+def _mail(subject="Port delivered", to="noc@example.com"):
+    return {
+        "message": "<p>Your port is ready</p>",
+        "subject": subject,
+        "language": "en",
+        "to": [{"email": to, "name": "NOC"}],
+        "cc": [{"email": "cc@example.com", "name": "CC"}],
+        "bcc": [{"email": "bcc@example.com", "name": "BCC"}],
+    }
+
+
+class FakeConnection:
+    def __init__(self, errors):
+        self.errors = errors
+        self.sent = []
+
+    def send_message(self, message, from_addr, to_addrs):
+        if error := self.errors.get(message["Subject"]):
+            raise error
+        self.sent.append((message, to_addrs))
+
+
+class FakePool:
+    def __init__(self, errors=None):
+        self.connection_ = FakeConnection(errors or {})
+
+    @contextmanager
+    def connection(self):
+        yield self.connection_
+
+
+def test_build_message():
+    message = build_message(_mail(), "orchestrator@example.com")
+
+    assert message["To"] == "NOC <noc@example.com>"
+    assert message["Cc"] == "CC <cc@example.com>"
+    assert "Bcc" not in message
+    assert [part.get_content_type() for part in message.iter_parts()] == ["text/plain", "text/html"]
+    assert message.get_body(("plain",)).get_content().strip() == "Your port is ready"
+    assert recipients(_mail()) == ["noc@example.com", "cc@example.com", "bcc@example.com"]
+
+
+def test_dispatch_sends_in_batches():
+    ids = [enqueue_mail(_mail(subject=f"Mail {i}")) for i in range(5)]
+    pool = FakePool()
+
+    result = dispatch_mail(batch_size=2, pool=pool)
+
+    assert (result.sent, result.retried, result.dead) == (5, 0, 0)
+    assert sorted(message["Subject"] for message, _ in pool.connection_.sent) == [f"Mail {i}" for i in range(5)]
+    assert {row.status for row in MailOutboxTable.query.filter(MailOutboxTable.id.in_(ids))} == {SENT}
+    assert dispatch_mail(pool=pool).sent == 0
+
+
+def test_dispatch_retries_and_dead_letters():
+    temporary = enqueue_mail(_mail(subject="Temporary"))
+    refused = enqueue_mail(_mail(subject="Refused"))
+    pool = FakePool(
+        {
+            "Temporary": smtplib.SMTPServerDisconnected("Connection unexpectedly closed"),
+            "Refused": smtplib.SMTPRecipientsRefused({"noc@example.com": (550, b"No such user")}),
+        }
+    )
+
+    result = dispatch_mail(pool=pool)
+
+    assert (result.sent, result.retried, result.dead) == (0, 1, 1)
+    retried = MailOutboxTable.query.get(temporary)
+    assert retried.status == QUEUED
+    assert retried.attempts == 1
+    assert "SMTPServerDisconnected" in retried.last_error
+    assert MailOutboxTable.query.get(refused).status == DEAD
+    # Not due again until the backoff has passed
+    assert dispatch_mail(pool=pool).retried == 0
+
+
+def test_dispatch_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(mail_settings, "MAIL_MAX_ATTEMPTS", 1)
+    outbox_id = enqueue_mail(_mail(subject="Temporary"))
+
+    result = dispatch_mail(pool=FakePool({"Temporary": smtplib.SMTPServerDisconnected()}))
+
+    assert result.dead == 1
+    assert MailOutboxTable.query.get(outbox_id).status == DEAD
@@ -0,0 +1,119 @@
+import random
+from ipaddress import ip_network
+
+import pytest
+
+from company.services.prefix_allocation import (
+    PoolExhausted,
+    PrefixIndex,
+    PrefixInUse,
+    PrefixTree,
+    configured_pools,
+)
+
+
+def test_prefix_tree_first_free_and_is_free():
+    tree = PrefixTree(ip_network("10.1.32.0/29"))
+    tree.add(ip_network("10.1.32.0/31"))
+    tree.add(ip_network("10.1.32.4/32"))
+
+    assert tree.first_free(31) == ip_network("10.1.32.2/31")
+    assert tree.first_free(30) is None
+    assert tree.first_free(32) == ip_network("10.1.32.2/32")
+    assert tree.is_free(ip_network("10.1.32.6/31"))
+    assert not tree.is_free(ip_network("10.1.32.4/31"))
+    assert not tree.is_free(ip_network("10.1.32.1/32"))
+    assert list(tree) == [ip_network("10.1.32.0/31"), ip_network("10.1.32.4/32")]
+
+    with pytest.raises(PrefixInUse):
+        tree.add(ip_network("10.1.32.0/30"))
+    with pytest.raises(PrefixInUse):
+        tree.add(ip_network("10.1.32.1/32"))
+    with pytest.raises(ValueError):
+        tree.add(ip_network("10.1.33.0/31"))
+
+    tree.remove(ip_network("10.1.32.4/32"))
+    assert tree.first_free(30) == ip_network("10.1.32.4/30")
+
+
+def test_prefix_tree_ipv6():
+    tree = PrefixTree(ip_network("fd00:0:102::/48"))
+    first = tree.first_free(127)
+    tree.add(first)
+
+    assert first == ip_network("fd00:0:102::/127")
+    assert tree.first_free(127) == ip_network("fd00:0:102::2/127")
+    assert tree.first_free(64) == ip_network("fd00:0:102:1::/64")
+
+
+def test_prefix_tree_matches_brute_force():
+    network = ip_network("192.168.0.0/24")
+    tree = PrefixTree(network)
+    used: set = set()
+    rng = random.Random(42)
+
+    def brute_force_free(prefix):
+        return not any(prefix.overlaps(other) for other in used)
+
+    for _ in range(1000):
+        prefixlen = rng.randint(26, 32)
+        if used and rng.random() < 0.3:
+            prefix = rng.choice(sorted(used))
+            tree.remove(prefix)
+            used.remove(prefix)
+            continue
+
+        expected = next((prefix for prefix in network.subnets(new_prefix=prefixlen) if brute_force_free(prefix)), None)
+        assert tree.first_free(prefixlen) == expected
+        if expected is not None:
+            tree.add(expected)
+            used.add(expected)
+        candidate = rng.choice(list(network.subnets(new_prefix=prefixlen)))
+        assert tree.is_free(candidate) == brute_force_free(candidate)
+
+    assert list(tree) == sorted(used)
+
+
+def test_prefix_index_sync_and_reserve():
+    ipam = {ip_network("10.1.16.0/31"), ip_network("10.1.16.4/31")}
+    confirmed = []
+    index = PrefixIndex({"corelink_ipv4": ip_network("10.1.16.0/28")}, fetch=lambda network: sorted(ipam))
+
+    assert index.sync("corelink_ipv4") == 2
+    reserved = index.reserve("corelink_ipv4", 31, count=3, confirm=confirmed.append)
+
+    assert reserved == [ip_network("10.1.16.2/31"), ip_network("10.1.16.6/31"), ip_network("10.1.16.8/31")]
+    assert confirmed == [reserved]
+    assert not index.is_free("corelink_ipv4", ip_network("10.1.16.8/31"))
+
+    with pytest.raises(PoolExhausted):
+        index.reserve("corelink_ipv4", 31, count=4)
+    assert index.first_free("corelink_ipv4", 31) == ip_network("10.1.16.10/31")
+
+
+def test_prefix_index_releases_unconfirmed_reservations():
+    index = PrefixIndex({"ptp_ipv4": ip_network("10.1.32.0/30")}, fetch=lambda network: [])
+
+    def fail(prefixes):
+        raise RuntimeError("IPAM unavailable")
+
+    with pytest.raises(RuntimeError):
+        index.reserve("ptp_ipv4", 31, confirm=fail)
+    assert index.is_free("ptp_ipv4", ip_network("10.1.32.0/30"))
+
+
+def test_prefix_index_keeps_pending_reservations_on_sync():
+    index = PrefixIndex({"ptp_ipv4": ip_network("10.1.32.0/30")}, fetch=lambda network: [])
+
+    def sync_while_confirming(prefixes):
+        index.sync("ptp_ipv4")
+        assert not index.is_free("ptp_ipv4", prefixes[0])
+
+    index.reserve("ptp_ipv4", 31, confirm=sync_while_confirming)
+
+
+def test_configured_pools():
+    pools = configured_pools()
+
+    assert pools["node_ipv4"] == ip_network("10.1.4.0/22")
+    assert pools["ptp_ipv6"].version == 6
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+from uuid import UUID, uuid4
+
+from orchestrator.db import ProductTable, SubscriptionTable, db
+
+from company.services import subscription_validation
+from company.services.subscription_validation import SubscriptionRow, subscription_rows, validate_subscriptions
+
+
+def _product(name, tag):
+    product = ProductTable(name=name, description=name, product_type="Test", tag=tag, status="active")
+    db.session.add(product)
+    db.session.flush()
+    return product
+
+
+def _subscription(product, status="active", insync=True):
+    subscription = SubscriptionTable(
+        description=f"Subscription {status}",
+        status=status,
+        product_id=product.product_id,
+        customer_id=uuid4(),
+        insync=insync,
+    )
+    db.session.add(subscription)
+    db.session.flush()
+    return subscription.subscription_id
+
+
+def test_subscription_rows_keyset_batches():
+    product = _product("Test Product", "TEST")
+    other = _product("Other Product", "OTHER")
+    expected = sorted(_subscription(product) for _ in range(5))
+    _subscription(product, status="provisioning")
+    _subscription(product, status="terminated")
+    _subscription(product, insync=False)
+    _subscription(other)
+
+    batches = list(subscription_rows(["TEST"], batch_size=2))
+
+    assert [len(rows) for rows in batches] == [2, 2, 1]
+    assert [row.subscription_id for rows in batches for row in rows] == expected
+
+    batches = list(subscription_rows(["TEST"], statuses=["active", "provisioning"], batch_size=10))
+
+    assert len(batches) == 1
+    assert len(batches[0]) == 6
+
+
+class InlineExecutor(ThreadPoolExecutor):
+    """Runs the worker tasks in threads of the test process instead of spawned worker processes."""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None):
+        super().__init__(max_workers)
+
+
+def test_validate_subscriptions_aggregates_worker_results(monkeypatch):
+    ids = [UUID(int=i) for i in range(1, 6)]
+    rows = [
+        SubscriptionRow(ids[0], "Correct description", "active"),
+        SubscriptionRow(ids[1], "Wrong description", "active"),
+        SubscriptionRow(ids[2], "Broken model", "active"),
+        SubscriptionRow(ids[3], "Lost in a failed batch", "active"),
+        SubscriptionRow(ids[4], "Correct description", "disabled"),
+    ]
+    batches = []
+
+    def desired_descriptions(subscription_ids):
+        batches.append(subscription_ids)
+        if ids[3] in subscription_ids:
+            raise RuntimeError("worker died")
+        errors = {ids[2]: "ValueError()"} if ids[2] in subscription_ids else {}
+        return {i: "Correct description" for i in subscription_ids if i not in errors}, errors
+
+    monkeypatch.setattr(subscription_validation, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(subscription_validation, "subscription_rows", lambda product_tags: iter([rows[:3], rows[3:]]))
+    monkeypatch.setattr(subscription_validation, "desired_descriptions", desired_descriptions)
+
+    report = validate_subscriptions(description_batch_size=2)
+
+    assert sorted(batches) == [[ids[0], ids[1]], [ids[2]], [ids[3], ids[4]]]
+    assert report.checked == 5
+    assert not report.ok
+    assert [(failure.subscription_id, failure.check) for failure in report.failures] == [
+        (ids[1], "description"),
+        (ids[2], "description"),
+        (ids[3], "description"),
+        (ids[4], "description"),
+        (ids[4], "status"),
+    ]
+    assert "worker died" in report.failures[2].message
+    assert "ValueError()" in report.failures[1].message
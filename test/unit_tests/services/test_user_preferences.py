@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import pytest
+
+from company.db import UserPreferenceDomain, UserPreferenceTable
+from company.schemas import UserPreferenceSchema
+from company.services.user_preferences import (
+    export_user_preferences,
+    import_user_preferences,
+    upsert_user_preference,
+    upsert_user_preferences,
+)
+
+DOMAIN = UserPreferenceDomain.DASHBOARD.name
+
+
+def _pref(user_name, **preferences):
+    return UserPreferenceSchema(user_name=user_name, domain=DOMAIN, preferences=preferences)
+
+
+def test_upsert_user_preference_inserts_and_updates():
+    assert upsert_user_preference(_pref("j.doe@example.com", onboarding=True)).preferences == {"onboarding": True}
+
+    stored = upsert_user_preference(_pref("j.doe@example.com", onboarding=False))
+
+    assert stored.preferences == {"onboarding": False}
+    assert UserPreferenceTable.query.count() == 1
+    assert UserPreferenceTable.query.get((DOMAIN, "j.doe@example.com")).preferences == {"onboarding": False}
+
+
+def test_upsert_user_preferences_batches():
+    prefs = [_pref(f"user{i}@example.com", index=i) for i in range(25)]
+    # The same user twice in one batch: the last one wins
+    prefs.append(_pref("user0@example.com", index=100))
+
+    assert upsert_user_preferences(prefs, batch_size=10) == 25
+    assert UserPreferenceTable.query.count() == 25
+    assert UserPreferenceTable.query.get((DOMAIN, "user0@example.com")).preferences == {"index": 100}
+
+
+@pytest.mark.parametrize("file_format", ["ndjson", "csv"])
+def test_export_import_round_trip(file_format):
+    upsert_user_preferences([_pref("a@example.com", path="C:\\temp", quote='"'), _pref("b@example.com", a=None)])
+    exported = BytesIO()
+
+    assert export_user_preferences(exported, file_format) == 2
+
+    UserPreferenceTable.query.delete()
+    assert import_user_preferences(BytesIO(exported.getvalue()), file_format) == 2
+    assert UserPreferenceTable.query.get((DOMAIN, "a@example.com")).preferences == {"path": "C:\\temp", "quote": '"'}
+    assert UserPreferenceTable.query.get((DOMAIN, "b@example.com")).preferences == {"a": None}
+
+
+def test_import_user_preferences_updates_and_last_duplicate_wins():
+    upsert_user_preference(_pref("a@example.com", index=0))
+    ndjson = (
+        b'{"domain": "DASHBOARD", "user_name": "a@example.com", "preferences": {"index": 1}}\n'
+        b'{"domain": "DASHBOARD", "user_name": "a@example.com", "preferences": {"index": 2}}\n'
+    )
+
+    assert import_user_preferences(BytesIO(ndjson)) == 1
+    assert UserPreferenceTable.query.get((DOMAIN, "a@example.com")).preferences == {"index": 2}
+
@@ -0,0 +1,36 @@
+from unittest import mock
+
+from company.utils.cache import TTLCache
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=10)
+    with mock.patch("company.utils.cache.monotonic", return_value=100):
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+
+    with mock.patch("company.utils.cache.monotonic", return_value=110):
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_ttl_cache_get_or_set_and_evict():
+    cache = TTLCache(ttl=10)
+    factory = mock.Mock(side_effect=[1, 2])
+
+    assert cache.get_or_set(("org", "a"), factory) == 1
+    assert cache.get_or_set(("org", "a"), factory) == 1
+    assert cache.evict(lambda key: key[0] == "org") == 1
+    assert cache.get_or_set(("org", "a"), factory) == 2
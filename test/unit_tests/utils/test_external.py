@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from company.utils import external
+from company.utils.lazy import LazySingleton
+
+# Modules that must only be imported when a client is used. The OpenTelemetry instrumentation is not in here, the
+# orchestrator package (imported by company/__init__) already imports it.
+LAZY_MODULES = ["crm_client", "ims_client", "ipam_client", "jira_client", "pynso"]
+
+
+def test_clients_are_not_imported_on_import():
+    code = "import json, sys\nimport company.services.nso\nprint(json.dumps(sorted(sys.modules)))\n"
+    modules = json.loads(subprocess.run([sys.executable, "-c", code], capture_output=True, check=True).stdout)
+
+    loaded = [m for m in modules if any(m == lazy or m.startswith(f"{lazy}.") for lazy in LAZY_MODULES)]
+    assert loaded == []
+
+
+def test_lazy_singleton_creates_once_across_threads():
+    factory = mock.Mock(side_effect=lambda: object())
+    singleton = LazySingleton(factory)
+    assert not singleton.initialised
+
+    with ThreadPoolExecutor(8) as executor:
+        values = set(executor.map(lambda _: singleton.get(), range(100)))
+
+    assert len(values) == 1
+    assert factory.call_count == 1
+
+    singleton.reset()
+    assert singleton.get() not in values
+
+
+def test_nso_client_is_created_on_first_use():
+    external.reset_clients()
+    with mock.patch("pynso.NSOClient") as client:
+        assert external.nso_api_client is client.return_value
+        assert external.get_nso_client() is client.return_value
+        client.assert_called_once()
+    external.reset_clients()
@@ -0,0 +1,38 @@
+from threading import Thread
+
+from sqlalchemy import text
+
+from orchestrator.db import db
+
+from company.utils.instrumentation import count_external_call, measure
+
+
+def test_measure_counts_queries_and_external_calls():
+    with measure() as measurement:
+        db.session.execute(text("SELECT 1"))
+        db.session.execute(text("SELECT 2"))
+        count_external_call()
+
+    assert measurement.db_queries == 2
+    assert measurement.external_calls == 1
+    assert measurement.wall_time > 0
+
+
+def test_measure_does_not_count_outside_measurement():
+    with measure() as measurement:
+        pass
+
+    db.session.execute(text("SELECT 1"))
+    count_external_call()
+
+    assert measurement.db_queries == 0
+    assert measurement.external_calls == 0
+
+
+def test_measure_ignores_threads_without_context():
+    with measure() as measurement:
+        thread = Thread(target=count_external_call)
+        thread.start()
+        thread.join()
+
+    assert measurement.external_calls == 0
@@ -0,0 +1,39 @@
+import threading
+
+from company.utils.profiler import SamplingProfiler
+
+
+def busy_function(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_function, args=(stop,), name="busy")
+    thread.start()
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    while profiler._samples < 20:
+        stop.wait(0.01)
+    profile = profiler.stop()
+    stop.set()
+    thread.join()
+
+    assert profile.samples >= 20
+    busy_stacks = [line for line in profile.collapsed().splitlines() if line.startswith("busy;")]
+    assert busy_stacks
+    assert all("busy_function (" in line for line in busy_stacks)
+    assert profile.allocations is None
+
+
+def test_sampling_profiler_reports_allocations():
+    profiler = SamplingProfiler(interval=0.01, allocation_frames=1)
+    profiler.start()
+    data = [bytearray(1024) for _ in range(1000)]
+    profile = profiler.stop(top_allocations=5)
+
+    assert len(data) == 1000
+    assert 0 < len(profile.allocations) <= 5
+    assert "test_profiler.py" in profile.allocations[0].location
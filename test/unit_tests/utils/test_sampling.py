@@ -0,0 +1,64 @@
+from unittest import mock
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import Decision
+
+from company.utils import sampling
+from company.utils.sampling import AdaptiveSampler, configure_adaptive_sampling
+
+
+def _sampled_fraction(sampler, name, n=10000):
+    step = sampling.TRACE_ID_LIMIT // n
+    return sum(sampler.should_sample(None, i * step, name).decision is Decision.RECORD_AND_SAMPLE for i in range(n)) / n
+
+
+def test_base_rates_by_pattern():
+    sampler = AdaptiveSampler(0.1, {"/api/health*": 0, "External Api Call *": 0.5})
+
+    assert sampler.rate("/api/subscriptions/{subscription_id}") == 0.1
+    assert sampler.rate("/api/health/") == 0
+    assert sampler.rate("External Api Call CrmApiClient") == 0.5
+    assert _sampled_fraction(sampler, "/api/health/") == 0
+    assert 0.45 < _sampled_fraction(sampler, "External Api Call CrmApiClient") < 0.55
+
+
+def test_slow_and_failing_names_are_boosted():
+    sampler = AdaptiveSampler(0.01, slow_threshold=1.0, error_threshold=0.05, boost=10, smoothing=1)
+
+    sampler.record("/slow", 5.0, error=False)
+    sampler.record("/failing", 0.1, error=True)
+    sampler.record("/healthy", 0.1, error=False)
+
+    assert sampler.rate("/slow") == 0.1
+    assert sampler.rate("/failing") == 0.1
+    assert sampler.rate("/healthy") == 0.01
+
+
+def test_hot_names_are_throttled():
+    sampler = AdaptiveSampler(0.5, target_per_second=1, window=10, min_rate=0.001)
+
+    with mock.patch("company.utils.sampling.monotonic", return_value=0):
+        sampler.rate("/hot")
+    with mock.patch("company.utils.sampling.monotonic", return_value=5):
+        for _ in range(1000):
+            sampler.should_sample(None, 0, "/hot")
+    with mock.patch("company.utils.sampling.monotonic", return_value=10):
+        sampler.should_sample(None, 0, "/hot")
+
+    # 1001 requests in 10 seconds, 1 trace per second is wanted
+    assert sampler.rate("/hot") == 1 / 100.1
+
+
+def test_feedback_from_finished_root_spans():
+    sampler = AdaptiveSampler(1.0, slow_threshold=0.5, smoothing=1)
+    provider = TracerProvider()
+    configure_adaptive_sampling(provider, sampler)
+
+    tracer = provider.get_tracer(__name__)
+    with tracer.start_as_current_span("/root"):
+        with tracer.start_as_current_span("child"):
+            pass
+
+    stats = sampler._stats["/root"]
+    assert stats.latency < 0.5
+    assert "child" not in sampler._stats
@@ -0,0 +1,41 @@
+from unittest import mock
+
+import pytest
+
+from orchestrator.utils.errors import ApiException
+
+from company.services import nso
+from company.settings import dry_run_settings
+from company.utils.simulation import register_response, simulate_api_call, simulated_nso_client
+
+
+@pytest.fixture
+def dry_run():
+    with mock.patch.multiple(dry_run_settings, DRY_RUN=True, DRY_RUN_LATENCY_MS=0, DRY_RUN_FAILURE_RATE=0):
+        yield
+    simulated_nso_client.clear()
+
+
+def test_nso_calls_go_to_simulator(dry_run):
+    path = nso.create_service_path("service", "abc")
+    nso.create(path, {"name": "abc"})
+
+    assert nso.get(path) == {"name": "abc"}
+    assert nso.get([nso.SERVICES_ROOT_PATH]) == {'service="abc"': {"name": "abc"}}
+    assert nso.is_in_sync("node")
+
+    nso.delete(path)
+    assert nso.get(path) == {}
+
+
+def test_simulated_failure_rate(dry_run):
+    with mock.patch.object(dry_run_settings, "DRY_RUN_FAILURE_RATE", 1):
+        with pytest.raises(ApiException):
+            nso.get(["tailf-ncs:devices"])
+
+
+def test_simulate_api_call_returns_registered_response(dry_run):
+    register_response("CrmApiClient", "get", r"/organisations/.*", {"name": "SURF"})
+
+    assert simulate_api_call("CrmApiClient", "/organisations/{id}", "GET", {"id": 1}, None) == {"name": "SURF"}
+    assert simulate_api_call("CrmApiClient", "/persons", "GET", None, None) is None
@@ -0,0 +1,69 @@
+from uuid import uuid4
+
+from orchestrator.forms.network_type_validators import BFD
+
+from company.utils.helpers import BFD_SUMMARY_COLUMNS, create_bfd_summary_data
+from company.utils.summary import SummaryColumn, SummaryEngine, format_value
+
+
+def subscription(tag, **fields):
+    return {"subscription_id": uuid4(), "product": {"tag": tag}, **fields}
+
+
+def test_format_value():
+    assert format_value(None) == ""
+    assert format_value("text") == "text"
+    assert format_value([1, True, "a"]) == "1, True, a"
+    assert format_value(1.5) == "1.5"
+
+
+def test_render_groups_columns_per_product():
+    engine = SummaryEngine()
+    engine.register("Node", [SummaryColumn("Name", "node.name"), SummaryColumn("Ports", "node.ports")])
+    engine.register("SN8", [SummaryColumn("Speed", "speed", lambda speed: f"{speed} Gbit/s")])
+
+    nodes = [subscription("Node", node={"name": f"node-{i}", "ports": [i, i + 1]}) for i in range(3)]
+    port = subscription("SN8", speed=10)
+    tables = engine.render([nodes[0], port, subscription("Unknown"), *nodes[1:]])
+
+    assert list(tables) == ["Node", "SN8"]
+    node_table = tables["Node"]
+    assert len(node_table) == 3
+    assert node_table.labels == ["Name", "Ports"]
+    assert node_table.subscription_ids == [str(node["subscription_id"]) for node in nodes]
+    assert node_table.columns == [["node-0", "node-1", "node-2"], ["0, 1", "1, 2", "2, 3"]]
+    assert list(tables["SN8"].rows()) == [[str(port["subscription_id"]), "10 Gbit/s"]]
+
+
+def test_missing_values_render_empty():
+    engine = SummaryEngine()
+    engine.register("Node", [SummaryColumn("Name", "node.name")])
+
+    assert engine.render([subscription("Node")])["Node"].columns == [[""]]
+
+
+def test_as_summary_data():
+    engine = SummaryEngine()
+    engine.register("Node", [SummaryColumn("Name", "name"), SummaryColumn("Status", "status")])
+    nodes = [subscription("Node", name="a", status="active"), subscription("Node", name="b", status="initial")]
+
+    assert engine.render(nodes)["Node"].as_summary_data() == {
+        "labels": ["Name", "Status"],
+        "headers": [str(node["subscription_id"]) for node in nodes],
+        "columns": [["a", "active"], ["b", "initial"]],
+    }
+
+
+def test_bfd_summary_columns():
+    enabled = BFD(enabled=True, minimum_interval=900, multiplier=3)
+    disabled = BFD(enabled=False)
+
+    assert create_bfd_summary_data({}) == []
+    assert create_bfd_summary_data({"bfd": None}) == []
+    assert create_bfd_summary_data({"bfd": enabled}) == ["True", "900", "3"]
+    assert create_bfd_summary_data({"bfd": disabled}) == ["False", "N/A", "N/A"]
+
+    engine = SummaryEngine()
+    engine.register("IP", BFD_SUMMARY_COLUMNS)
+    table = engine.render([subscription("IP", bfd=enabled), subscription("IP", bfd=disabled)])["IP"]
+    assert table.columns == [["True", "False"], ["900", "N/A"], ["3", "N/A"]]
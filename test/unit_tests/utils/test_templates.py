@@ -0,0 +1,59 @@
+import jinja2
+import pytest
+
+from company.settings import template_environment, template_settings
+from company.utils import templates
+from company.utils.templates import TimedTemplate, clear_environments, precompile_templates, render_stats
+
+
+@pytest.fixture(autouse=True)
+def bytecode_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(template_settings, "TEMPLATE_BYTECODE_CACHE_DIR", str(tmp_path / "bytecode"))
+    monkeypatch.setattr(templates, "_bytecode_cache", None)
+    clear_environments()
+    yield tmp_path / "bytecode"
+    clear_environments()
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "mail.j2").write_text("Dear {{ name }},")
+    (tmp_path / "templates" / "payload.j2").write_text("{% for port in ports %}{{ port }}\n{% endfor %}")
+    return tmp_path / "templates"
+
+
+def test_environment_is_shared_per_loader(template_dir):
+    environment = template_environment(jinja2.FileSystemLoader(str(template_dir)))
+
+    assert template_environment(jinja2.FileSystemLoader(str(template_dir))) is environment
+    dict_environment = template_environment(jinja2.DictLoader({"a": "b"}))
+    assert template_environment(jinja2.DictLoader({"a": "b"})) is dict_environment
+    assert template_environment(jinja2.DictLoader({"a": "c"})) is not dict_environment
+    assert environment.undefined is jinja2.StrictUndefined
+    assert environment.autoescape is True
+
+
+def test_precompile_writes_bytecode_cache(template_dir, bytecode_cache):
+    environment = template_environment(jinja2.FileSystemLoader(str(template_dir)))
+
+    assert precompile_templates() == 2
+    assert len(list(bytecode_cache.iterdir())) == 2
+
+    clear_environments()
+    environment = template_environment(jinja2.FileSystemLoader(str(template_dir)))
+    assert environment.get_template("mail.j2").render(name="<Jane>") == "Dear &lt;Jane&gt;,"
+
+
+def test_render_timings(template_dir):
+    template = template_environment(jinja2.FileSystemLoader(str(template_dir))).get_template("payload.j2")
+    renders = render_stats().get("payload.j2", templates.RenderStats()).renders
+
+    assert isinstance(template, TimedTemplate)
+    assert template.render(ports=[1, 2]) == "1\n2\n"
+    with pytest.raises(jinja2.UndefinedError):
+        template.render()
+
+    stats = render_stats()["payload.j2"]
+    assert stats.renders == renders + 2
+    assert stats.max_time > 0
@@ -0,0 +1,85 @@
+from unittest import mock
+from uuid import uuid4
+
+from orchestrator.domain.base import SubscriptionModel
+from orchestrator.types import SubscriptionLifecycle
+from orchestrator.workflow import StepList, step
+
+from company.workflows.identity_map import identity_map_scope, load_subscription, with_identity_map
+from company.workflows.steps import resync, unsync
+
+
+def _subscription_model(subscription_id, insync=True):
+    return SubscriptionModel.construct(
+        subscription_id=subscription_id,
+        customer_id=uuid4(),
+        description="Subscription",
+        status=SubscriptionLifecycle.ACTIVE,
+        insync=insync,
+    )
+
+
+def test_load_subscription_without_identity_map():
+    with mock.patch.object(SubscriptionModel, "from_subscription") as from_subscription:
+        load_subscription(uuid4())
+        load_subscription(uuid4())
+
+    assert from_subscription.call_count == 2
+
+
+def test_load_subscription_with_identity_map_returns_copies():
+    subscription_id = uuid4()
+    model = _subscription_model(subscription_id)
+    with mock.patch.object(SubscriptionModel, "from_subscription", return_value=model) as loader:
+        with identity_map_scope() as identity_map:
+            first = load_subscription(subscription_id)
+            first.description = "Changed"
+            second = load_subscription(str(subscription_id))
+            assert loader.call_count == 1
+            assert first is not second
+            assert second.description == "Subscription"
+
+            identity_map.invalidate(subscription_id)
+            load_subscription(subscription_id)
+            assert loader.call_count == 2
+
+
+def test_with_identity_map_shares_map_between_consecutive_steps():
+    subscription_id = uuid4()
+
+    @step("Load")
+    def load():
+        load_subscription(subscription_id)
+
+    steplist = with_identity_map(StepList([load, load, load]))
+    state = {"process_id": uuid4()}
+
+    with mock.patch.object(
+        SubscriptionModel, "from_subscription", return_value=_subscription_model(subscription_id)
+    ) as loader:
+        steplist[0](state)
+        steplist[1](state)
+        assert loader.call_count == 1
+
+        # Resuming at another position does not reuse the map
+        steplist[0](state)
+        assert loader.call_count == 2
+
+
+def test_saved_models_replace_cached_models():
+    subscription_id = uuid4()
+    state = {"process_id": uuid4(), "subscription_id": str(subscription_id)}
+    steplist = with_identity_map(StepList([unsync, resync, resync]))
+
+    with mock.patch.object(
+        SubscriptionModel, "from_subscription", return_value=_subscription_model(subscription_id)
+    ) as loader, mock.patch.object(SubscriptionModel, "save") as save:
+        unsynced = steplist[0](state).unwrap()["subscription"]
+        assert unsynced.insync is False
+
+        # The engine stores the state as JSON between the steps
+        resynced = steplist[1](state | {"subscription": {"subscription_id": str(subscription_id)}}).unwrap()
+        assert resynced["subscription"].insync is True
+
+    assert loader.call_count == 1
+    assert save.call_count == 2
@@ -0,0 +1,157 @@
+from time import perf_counter, sleep
+from unittest import mock
+from uuid import UUID, uuid4
+
+import pytest
+
+from orchestrator.db import db
+from orchestrator.domain.base import SubscriptionModel
+from orchestrator.workflow import StepList, make_step_function, step
+
+from company.db import UserPreferenceDomain, UserPreferenceTable
+from company.workflows import workflow
+from company.workflows.workflow import (
+    ParallelStepError,
+    instrument_steps,
+    parallel,
+    terminate_initial_input_form_generator,
+)
+
+
+@step("Slow branch")
+def slow_branch():
+    sleep(0.05)
+    return {"slow": True}
+
+
+@step("Fast branch")
+def fast_branch(counter: int):
+    return {"fast": True, "counter": counter + 1}
+
+
+@step("Failing branch")
+def failing_branch():
+    raise ValueError("Branch failed")
+
+
+@step("Conflicting branch")
+def conflicting_branch(counter: int):
+    return {"counter": counter + 2}
+
+
+def test_parallel_merges_state_in_declaration_order():
+    result = parallel("Group", slow_branch, fast_branch)({"counter": 1})
+
+    assert result.issuccess()
+    assert result.unwrap() == {"counter": 2, "slow": True, "fast": True}
+    assert list(result.unwrap()) == ["counter", "slow", "fast"]
+
+
+def test_parallel_runs_branches_concurrently():
+    group = parallel("Group", *([slow_branch] * 4))
+
+    start = perf_counter()
+    result = group({})
+
+    assert result.issuccess()
+    assert perf_counter() - start < 0.15
+
+
+def test_parallel_fails_when_a_branch_fails():
+    result = parallel("Group", fast_branch, failing_branch)({"counter": 1})
+
+    assert result.isfailed()
+    assert "Failing branch: Branch failed" in str(result.unwrap())
+
+
+def test_parallel_fails_on_conflicting_changes():
+    result = parallel("Group", fast_branch, conflicting_branch)({"counter": 1})
+
+    assert result.isfailed()
+    assert isinstance(result.unwrap(), ParallelStepError)
+
+
+@step("Model branch")
+def model_branch(subscription_id: str):
+    return {"subscription": SubscriptionModel.construct(subscription_id=UUID(subscription_id), insync=False)}
+
+
+@step("Writing branch")
+def writing_branch():
+    db.session.add(UserPreferenceTable(user_name="j.doe@example.com", domain=UserPreferenceDomain.DASHBOARD))
+    db.session.flush()
+    return {"written": True}
+
+
+def test_parallel_saves_domain_models_in_one_transaction():
+    state = {"counter": 1, "subscription_id": str(uuid4())}
+
+    with mock.patch.object(SubscriptionModel, "save") as save:
+        result = parallel("Group", model_branch, fast_branch)(state)
+
+    assert result.issuccess()
+    assert save.call_count == 1
+    assert result.unwrap()["subscription"].insync is False
+
+
+def test_parallel_does_not_save_when_a_branch_fails():
+    state = {"subscription_id": str(uuid4())}
+
+    with mock.patch.object(SubscriptionModel, "save") as save:
+        result = parallel("Group", model_branch, slow_branch, failing_branch)(state)
+
+    assert result.isfailed()
+    assert save.call_count == 0
+
+
+def test_parallel_rejects_database_writes_in_branches():
+    result = parallel("Group", writing_branch, slow_branch)({})
+
+    assert result.isfailed()
+    assert "Writing branch of parallel step group Group tried to write to the database" in str(result.unwrap())
+    assert UserPreferenceTable.query.count() == 0
+
+
+def test_parallel_requires_step_decorated_steps():
+    with pytest.raises(ValueError):
+        parallel("Group", fast_branch, make_step_function(lambda state: state, "Plain step"))
+
+
+def test_instrument_steps_keeps_steps_intact():
+    steplist = instrument_steps(StepList([fast_branch, slow_branch]))
+
+    assert [step.name for step in steplist] == ["Fast branch", "Slow branch"]
+    assert steplist[0]({"counter": 1}).unwrap() == {"counter": 2, "fast": True}
+
+
+class RecordingHistogram:
+    def __init__(self):
+        self.records = []
+
+    def record(self, amount, attributes=None):
+        self.records.append((amount, attributes))
+
+
+def test_instrument_steps_records_histograms(monkeypatch):
+    histograms = {quantity: RecordingHistogram() for quantity in workflow._step_histograms}
+    monkeypatch.setattr(workflow, "_step_histograms", histograms)
+
+    instrument_steps(StepList([slow_branch]))[0]({"workflow_name": "create_node"})
+
+    attributes = {"workflow_name": "create_node", "step_name": "Slow branch", "status": "success"}
+    assert [len(histogram.records) for histogram in histograms.values()] == [1, 1, 1, 1]
+    assert histograms["wall_time"].records[0][0] >= 0.05
+    assert histograms["db_queries"].records[0] == (0, attributes)
+
+
+def test_terminate_form_is_shared_per_organisation():
+    subscription_id, organisation = str(uuid4()), str(uuid4())
+
+    form = terminate_initial_input_form_generator(subscription_id, organisation)
+    other_form = terminate_initial_input_form_generator(str(uuid4()), organisation)
+
+    assert form.__base__ is other_form.__base__
+    assert form.__fields__["subscription_id"].default == subscription_id
+    assert list(form.__fields__) == ["subscription_id", "contact_persons"]
+    assert form.__fields__["contact_persons"].outer_type_.organisation == UUID(organisation)
+    assert terminate_initial_input_form_generator(subscription_id, str(uuid4())).__base__ is not form.__base__